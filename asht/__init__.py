@@ -1 +1,3 @@
 __version__ = '0.0.0'
+
+from .treediff import diff, patch
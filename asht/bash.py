@@ -1,19 +1,26 @@
 """Bash tools."""
-from .nodes import Node
-from .visitors import DictVisitor, STDIN_DICT, STDOUT_DICT, STDERR_DICT, NodeToDict
+from .nodes import Node, StdIn, StdOut, StdErr, If, Var, EnvVar
+from .visitors import NodeVisitor, DictVisitor, STDIN_DICT, STDOUT_DICT, STDERR_DICT
+from .emitters import Emitter
+from .bashparser import parse
 
 
-class ToBashFromDict(DictVisitor):
+_BOOL_OPS = {"And": " && ", "Or": " || "}
+
+
+class ToBashFromDict(Emitter, DictVisitor):
     """Converts dict tree to Bash code."""
 
+    shell = "bash"
+
     def visit_Script(self, dct):
-        return "".join(map(self.visit, dct["Script"]["body"]))
+        yield from self._statements(dct["Script"]["body"])
 
     def visit_Comment(self, dct):
-        return "# " + dct["Comment"]["value"] + "\n"
+        self.line("# " + dct["Comment"]["value"])
 
     def visit_String(self, dct):
-        s = '"' + "".join(map(self.visit, dct["String"]["parts"])) + '"'
+        s = '"' + "".join((yield dct["String"]["parts"])) + '"'
         return s
 
     def visit_RawString(self, dct):
@@ -27,74 +34,72 @@ class ToBashFromDict(DictVisitor):
 
     def visit_Command(self, dct):
         attrs = next(iter(dct.values()))
-        s = " ".join(map(self.visit, attrs["args"]))
+        s = " ".join((yield attrs["args"]))
         if "stderr" in attrs and attrs["stderr"] != STDERR_DICT:
-            s += " 2> " + self.visit(attrs["stderr"])
+            s += " 2> " + (yield attrs["stderr"])
         if "stdout" in attrs and attrs["stdout"] != STDOUT_DICT:
-            s += " > " + self.visit(attrs["stdout"])
+            s += " > " + (yield attrs["stdout"])
         if "stdin" in attrs and attrs["stdin"] != STDIN_DICT:
-            s += " < " + self.visit(attrs["stdin"])
+            s += " < " + (yield attrs["stdin"])
         if "background" in attrs and attrs["background"]:
             s += "  &"
         return s
 
     def visit_CapturedCommand(self, dct):
-        return "$(" + self.visit_Command(dct) + ")"
+        return "$(" + (yield from self.visit_Command(dct)) + ")"
 
     def visit_And(self, dct):
-        s = self.visit(dct["And"]["lhs"]) + " && " + self.visit(dct["And"]["rhs"])
-        return s
+        return (yield from self._chain(dct, _BOOL_OPS))
 
-    def visit_Or(self, dct):
-        s = self.visit(dct["Or"]["lhs"]) + " || " + self.visit(dct["Or"]["rhs"])
-        return s
+    visit_Or = visit_And
 
     def visit_Not(self, dct):
-        return "! " + self.visit(dct["Not"]["node"])
+        return "! " + (yield dct["Not"]["node"])
 
     def visit_Statement(self, dct):
-        return self.visit(dct["Statement"]["node"]) + "\n"
+        self.line((yield dct["Statement"]["node"]))
 
     def visit_Assign(self, dct):
         attrs = dct["Assign"]
-        return attrs["name"] + "=" + self.visit(attrs["value"]) + "\n"
+        # local only works within functions, and global is the default
+        local = "local " if self._functions and attrs.get("scope") == "local" else ""
+        self.line(local + attrs["name"] + "=" + (yield attrs["value"]))
 
     def visit_Delete(self, dct):
-        return "unset " + dct["Delete"]["name"] + "\n"
+        self.line("unset " + dct["Delete"]["name"])
 
     def visit_EnvAssign(self, dct):
         attrs = dct["EnvAssign"]
-        s = "export " + attrs["name"] + "=" + self.visit(attrs["value"]) + "\n"
-        return s
+        self.line("export " + attrs["name"] + "=" + (yield attrs["value"]))
 
     def visit_EnvDelete(self, dct):
-        return "unset " + dct["EnvDelete"]["name"] + "\n"
+        self.line("unset " + dct["EnvDelete"]["name"])
 
     def visit_AliasAssign(self, dct):
         attrs = dct["AliasAssign"]
-        s = "alias " + attrs["name"] + "=" + self.visit(attrs["value"]) + "\n"
-        return s
+        self.line("alias " + attrs["name"] + "=" + (yield attrs["value"]))
 
     def visit_AliasDelete(self, dct):
-        return "unalias " + dct["AliasDelete"]["name"] + "\n"
+        self.line("unalias " + dct["AliasDelete"]["name"])
 
     def visit_Pass(self, dct):
-        return ":\n"
+        self.line(":")
 
     def visit_If(self, dct):
         attrs = dct["If"]
-        s = "if " + self.visit(attrs["test"]) + "; then\n"
-        s += "  " + "  ".join(map(self.visit, attrs["body"]))
+        line = self.line
+        line("if " + (yield attrs["test"]) + "; then")
+        yield from self._block(attrs["body"])
         orelse = attrs.get("orelse", None)
-        if not orelse:
-            s += "fi\n"
-        elif len(orelse) == 1 and next(iter(orelse[0].keys())) == "If":
-            s += "el" + self.visit_If(orelse[0])
-        else:
-            s += "else\n"
-            s += "  " + "  ".join(map(self.visit, orelse))
-            s += "fi\n"
-        return s
+        while orelse and len(orelse) == 1 and next(iter(orelse[0].keys())) == "If":
+            attrs = orelse[0]["If"]
+            line("elif " + (yield attrs["test"]) + "; then")
+            yield from self._block(attrs["body"])
+            orelse = attrs.get("orelse", None)
+        if orelse:
+            line("else")
+            yield from self._block(orelse)
+        line("fi")
 
     def visit_For(self, dct):
         attrs = dct["For"]
@@ -107,23 +112,147 @@ class ToBashFromDict(DictVisitor):
         else:
             raise ValueError("For loop must assign to a variable name (Var)"
                              "or environment variable name (EnvVar).")
-        s = "for " + target_assign + " in "
-        s += self.visit(attrs["iter"]) + "; do\n"
-        s += "  " + "  ".join(map(self.visit, attrs["body"]))
-        s += "done\n"
-        return s
+        self.line("for " + target_assign + " in " + (yield attrs["iter"]) + "; do")
+        yield from self._block(attrs["body"])
+        self.line("done")
 
     def visit_Function(self, dct):
-        s = "function " + dct["Function"]["name"] + " {\n"
-        s += "  " + "  ".join(map(self.visit, dct["Function"]["body"]))
-        s += "}\n"
+        self.line("function " + dct["Function"]["name"] + " {")
+        yield from self._function_body(dct["Function"]["body"])
+        self.line("}")
+
+
+class ToBash(Emitter, NodeVisitor):
+    """Converts node tree to Bash code directly, without an intermediate
+    dict tree. The output is identical to that of ToBashFromDict.
+    """
+
+    shell = "bash"
+
+    def visit_Script(self, node):
+        yield from self._statements(node.body)
+
+    def visit_Comment(self, node):
+        self.line("# " + node.value)
+
+    def visit_String(self, node):
+        return '"' + "".join((yield node.parts)) + '"'
+
+    def visit_RawString(self, node):
+        return node.value
+
+    def visit_Var(self, node):
+        return "$" + node.name
+
+    def visit_EnvVar(self, node):
+        return "$" + node.name
+
+    def visit_Command(self, node):
+        s = " ".join((yield node.args))
+        if not isinstance(node.stderr, StdErr):
+            s += " 2> " + (yield node.stderr)
+        if not isinstance(node.stdout, StdOut):
+            s += " > " + (yield node.stdout)
+        if not isinstance(node.stdin, StdIn):
+            s += " < " + (yield node.stdin)
+        if node.background:
+            s += "  &"
         return s
 
+    def visit_CapturedCommand(self, node):
+        return "$(" + (yield from self.visit_Command(node)) + ")"
+
+    def visit_And(self, node):
+        return (yield from self._chain(node, _BOOL_OPS))
 
-def tobash(tree):
-    """Converts a tree to Bash."""
+    visit_Or = visit_And
+
+    def visit_Not(self, node):
+        return "! " + (yield node.node)
+
+    def visit_Statement(self, node):
+        self.line((yield node.node))
+
+    def visit_Assign(self, node):
+        # local only works within functions, and global is the default
+        local = "local " if self._functions and getattr(node, "scope", None) == "local" else ""
+        self.line(local + node.name + "=" + (yield node.value))
+
+    def visit_Delete(self, node):
+        self.line("unset " + node.name)
+
+    def visit_EnvAssign(self, node):
+        self.line("export " + node.name + "=" + (yield node.value))
+
+    def visit_EnvDelete(self, node):
+        self.line("unset " + node.name)
+
+    def visit_AliasAssign(self, node):
+        self.line("alias " + node.name + "=" + (yield node.value))
+
+    def visit_AliasDelete(self, node):
+        self.line("unalias " + node.name)
+
+    def visit_Pass(self, node):
+        self.line(":")
+
+    def visit_If(self, node):
+        line = self.line
+        line("if " + (yield node.test) + "; then")
+        yield from self._block(node.body)
+        orelse = node.orelse
+        while orelse and len(orelse) == 1 and isinstance(orelse[0], If):
+            node = orelse[0]
+            line("elif " + (yield node.test) + "; then")
+            yield from self._block(node.body)
+            orelse = node.orelse
+        if orelse:
+            line("else")
+            yield from self._block(orelse)
+        line("fi")
+
+    def visit_For(self, node):
+        target = node.target
+        if isinstance(target, Var):
+            target_assign = target.name
+        elif isinstance(target, EnvVar):
+            target_assign = "$" + target.name
+        else:
+            raise ValueError("For loop must assign to a variable name (Var)"
+                             "or environment variable name (EnvVar).")
+        self.line("for " + target_assign + " in " + (yield node.iter) + "; do")
+        yield from self._block(node.body)
+        self.line("done")
+
+    def visit_Function(self, node):
+        self.line("function " + node.name + " {")
+        yield from self._function_body(node.body)
+        self.line("}")
+
+
+def tobash(tree, cache=None):
+    """Converts a tree to Bash. Node trees may be given an EmitCache."""
     if isinstance(tree, Node):
-        todict = NodeToDict()
-        tree = todict.visit(tree)
-    visitor = ToBashFromDict()
-    return visitor.visit(tree)
+        visitor = ToBash(cache=cache)
+    else:
+        visitor = ToBashFromDict(cache=cache)
+    return visitor.emit(tree)
+
+
+def iter_bash(tree, cache=None):
+    """Yields Bash code for a tree in chunks, one per top-level statement.
+    The tree may be a Script whose body is a generator. Node trees may be
+    given an EmitCache.
+    """
+    if isinstance(tree, Node):
+        visitor = ToBash(cache=cache)
+    else:
+        visitor = ToBashFromDict(cache=cache)
+    return visitor.iter(tree)
+
+
+def frombash(source, filename="<string>"):
+    """Parses Bash source into a Script node tree. See asht.bashparser for
+    the subset of Bash that is supported.
+    """
+    return parse(source, filename=filename)
@@ -0,0 +1,688 @@
+"""Parser for the subset of Bash that asht emits.
+
+The tokenizer is a loop over a few compiled regular expressions, one per
+lexical mode (unquoted, and within double quotes), and so runs in time
+linear in the length of the source. Tokens are tuples of their kind, their
+value, the offset at which they start, and whether they start a new word
+(that is, whether they follow whitespace or an operator), since adjacent
+pieces such as ``--prefix=$HOME/bin`` make up a single word. Command
+substitutions may be nested within double quotes and each other.
+
+The parser is recursive descent over the tokens, and covers what
+ToBashFromDict emits: assignments, export/unset, alias/unalias, local,
+``:``, if/elif/else, for, functions, commands with ``<``, ``>``, and ``2>``
+redirects and ``&``, ``&&``/``||``/``!``, ``$(...)``, double and single
+quoted strings, backslash escapes, and comments. Anything else, such as
+pipes, here documents, while loops, ``${name:-word}`` and other parameter
+expansions, or ``$'...'`` strings, raises a SyntaxError with the line and
+column.
+
+Bash does not say whether ``$x`` is a shell or an environment variable, so
+variables that have been exported earlier in the script are read as EnvVar
+(and unset as EnvDelete), and all others as Var.
+"""
+import re
+from bisect import bisect_right
+
+from . import nodes
+
+
+_NAME = r"[A-Za-z_][A-Za-z0-9_]*"
+_VAR = r"\$(?:\{" + _NAME + r"\}|" + _NAME + r"|[0-9@*#?$!-])"
+
+# whitespace is matched along with the token that follows it
+_UNQUOTED = re.compile(r"""
+    (?P<ws>(?:[ \t]|\\\n)*)
+    (?:
+    (?P<nl>\n)
+  | (?P<comment>\#[^\n]*)
+  | (?P<op>&&|\|\||;;|>>|2>&1|2>|&>|[;&|<>()])
+  | (?P<var>""" + _VAR + r""")
+  | (?P<cmdsub>\$\()
+  | (?P<expansion>\$[{'"])
+  | (?P<dq>")
+  | (?P<sq>'[^']*')
+  | (?P<esc>\\.)
+  | (?P<lit>[^\s"'$\\;&|<>()`]+|\$)
+  | (?P<other>.)
+  | (?P<end>\Z)
+    )
+""", re.VERBOSE)
+
+_DQUOTED = re.compile(r"""
+    (?P<dqend>")
+  | (?P<var>""" + _VAR + r""")
+  | (?P<cmdsub>\$\()
+  | (?P<esc>\\[$`"\\\n])
+  | (?P<other>`|\$\{)
+  | (?P<lit>[^"$\\`]+|[$\\])
+""", re.VERBOSE)
+
+# the characters that are special within double quotes, which are escaped
+# in the text of RawStrings that was quoted or escaped in the source
+_DQ_ESCAPES = str.maketrans({"\\": "\\\\", "$": "\\$", "`": "\\`", '"': '\\"'})
+
+_ASSIGN = re.compile(_NAME + "=")
+_IDENT = re.compile(_NAME + r"\Z")
+
+# tokens that make up words
+_PIECES = frozenset(["lit", "var", "cmdsub", "dq", "sq", "esc"])
+# operators that end a statement
+_SEPARATORS = frozenset([";", "\n"])
+_REDIRECTS = {">": "stdout", "<": "stdin", "2>": "stderr"}
+# reserved words that may not start a command, either because they are
+# only valid within an if, for, or function, or because they start compound
+# commands that are not supported
+_RESERVED = frozenset(["then", "elif", "else", "fi", "do", "done", "in", "while",
+                       "until", "case", "esac", "select", "{", "}", "[[", "]]"])
+
+
+def tokenize(source):
+    """Splits Bash source into a list of (kind, value, offset, starts_word)
+    tuples, ending with an "eof" token.
+    """
+    tokens = []
+    append = tokens.append
+    unquoted = _UNQUOTED.match
+    dquoted = _DQUOTED.match
+    pos = 0
+    n = len(source)
+    # (in double quotes, open parentheses) of the enclosing modes of the
+    # command substitutions and double quotes that are open
+    modes = []
+    in_dq = False
+    depth = 0
+    space = True
+    while pos < n:
+        if in_dq:
+            m = dquoted(source, pos)
+            kind = m.lastgroup
+            end = m.end()
+            if kind == "lit":
+                append(("lit", m.group(), pos, False))
+            elif kind == "var":
+                append(("var", m.group().strip("${}"), pos, False))
+            elif kind == "esc":
+                if source[pos + 1] != "\n":
+                    append(("lit", m.group(), pos, False))
+            elif kind == "dqend":
+                append(("dqend", '"', pos, False))
+                in_dq, depth = modes.pop()
+            elif kind == "cmdsub":
+                append(("cmdsub", "$(", pos, False))
+                modes.append((in_dq, depth))
+                in_dq = False
+                depth = 0
+                space = True
+            else:
+                append(("other", m.group(), pos, False))
+            pos = end
+            continue
+        m = unquoted(source, pos)
+        kind = m.lastgroup
+        end = m.end()
+        start = m.end("ws")
+        if start != pos:
+            space = True
+            pos = start
+        if kind == "nl":
+            append(("op", "\n", pos, True))
+            space = True
+        elif kind == "op":
+            val = m.group(kind)
+            if val == ")":
+                if not depth and modes:
+                    append(("cmdend", ")", pos, space))
+                    in_dq, depth = modes.pop()
+                    space = False
+                    pos = end
+                    continue
+                depth -= 1
+            elif val == "(":
+                depth += 1
+            append(("op", val, pos, space))
+            space = True
+        elif kind == "comment" and space:
+            append(("comment", source[pos + 1:end], pos, True))
+        elif kind == "comment":
+            # a "#" within a word does not start a comment
+            append(("lit", "#", pos, False))
+            end = pos + 1
+        elif kind == "var":
+            append(("var", m.group(kind).strip("${}"), pos, space))
+            space = False
+        elif kind == "dq":
+            append(("dq", '"', pos, space))
+            modes.append((in_dq, depth))
+            in_dq = True
+            space = False
+        elif kind == "cmdsub":
+            append(("cmdsub", "$(", pos, space))
+            modes.append((in_dq, depth))
+            depth = 0
+            space = True
+        elif kind == "sq":
+            append(("sq", source[pos + 1:end - 1], pos, space))
+            space = False
+        elif kind == "esc":
+            append(("esc", source[pos + 1], pos, space))
+            space = False
+        elif kind == "lit":
+            append(("lit", m.group(kind), pos, space))
+            space = False
+        elif kind == "other" or kind == "expansion":
+            append(("other", m.group(kind), pos, space))
+            space = False
+        pos = end
+    if in_dq or modes:
+        append(("other", "", n, True))
+    append(("eof", "", n, True))
+    return tokens
+
+
+class BashParser:
+    """Parses Bash source into a node tree.
+
+    Parameters
+    ----------
+    source : str
+    filename : str
+        The name of the source, for error messages.
+    """
+
+    def __init__(self, source, filename="<string>"):
+        self.source = source
+        self.filename = filename
+        self.tokens = tokenize(source)
+        self.i = 0
+        self.exported = set()
+        # offsets at which lines start, for line and column numbers
+        self._line_starts = [0] + [m.end() for m in re.finditer("\n", source)]
+
+    def parse(self):
+        """Returns the Script node for the source."""
+        body = self._statements(())
+        tok = self.tokens[self.i]
+        if tok[0] != "eof":
+            raise self._error("unexpected " + repr(tok[1]), tok)
+        return nodes.Script(body=body, lineno=1, column=1)
+
+    #
+    # Helpers
+    #
+
+    def _where(self, tok):
+        """Returns the line and column numbers of a token."""
+        pos = tok[2]
+        lineno = bisect_right(self._line_starts, pos)
+        return lineno, pos - self._line_starts[lineno - 1] + 1
+
+    def _error(self, msg, tok):
+        lineno, column = self._where(tok)
+        start = self._line_starts[lineno - 1]
+        end = self.source.find("\n", start)
+        line = self.source[start:] if end < 0 else self.source[start:end]
+        return SyntaxError(msg, (self.filename, lineno, column, line))
+
+    def _unexpected(self, tok):
+        """Returns the error message for an "other" token."""
+        if not tok[1]:
+            return "unexpected end of source"
+        return repr(tok[1]) + " is not supported"
+
+    def _ends_word(self, j):
+        tok = self.tokens[j]
+        return tok[3] or tok[0] not in _PIECES
+
+    def _at_word(self, word):
+        """Whether the current token is the unquoted word given."""
+        tok = self.tokens[self.i]
+        return (tok[0] == "lit" and tok[1] == word and tok[3] and
+                self._ends_word(self.i + 1))
+
+    def _expect_word(self, word):
+        self._skip_separators()
+        if not self._at_word(word):
+            tok = self.tokens[self.i]
+            raise self._error("expected " + repr(word) + ", not " + repr(tok[1]), tok)
+        self.i += 1
+
+    def _skip_separators(self):
+        tokens = self.tokens
+        i = self.i
+        while tokens[i][0] == "op" and tokens[i][1] in _SEPARATORS:
+            i += 1
+        self.i = i
+
+    def _skip_newlines(self):
+        tokens = self.tokens
+        while tokens[self.i][0] == "op" and tokens[self.i][1] == "\n":
+            self.i += 1
+
+    def _name(self):
+        """Parses a word that must be a plain name."""
+        tok = self.tokens[self.i]
+        if tok[0] != "lit" or not _IDENT.match(tok[1]) or not self._ends_word(self.i + 1):
+            raise self._error("expected a name, not " + repr(tok[1]), tok)
+        self.i += 1
+        return tok[1]
+
+    def _var(self, name, tok):
+        lineno, column = self._where(tok)
+        cls = nodes.EnvVar if name in self.exported else nodes.Var
+        return cls(name=name, lineno=lineno, column=column)
+
+    #
+    # Statements
+    #
+
+    def _statements(self, stop):
+        """Parses statements until the end of the source or of a command
+        substitution, a "}", or one of the words in stop.
+        """
+        tokens = self.tokens
+        body = []
+        while True:
+            self._skip_separators()
+            tok = tokens[self.i]
+            kind = tok[0]
+            if kind == "eof" or kind == "cmdend":
+                return body
+            if kind == "lit" and (tok[1] in stop or tok[1] == "}") and self._at_word(tok[1]):
+                return body
+            if kind == "comment":
+                self.i += 1
+                value = tok[1][1:] if tok[1].startswith(" ") else tok[1]
+                lineno, column = self._where(tok)
+                body.append(nodes.Comment(value=value, lineno=lineno, column=column))
+                continue
+            body.extend(self._statement())
+            tok = tokens[self.i]
+            kind = tok[0]
+            if not (kind == "eof" or kind == "cmdend" or kind == "comment" or
+                    (kind == "op" and tok[1] in _SEPARATORS) or
+                    (kind == "lit" and tok[1] == "}" and tok[3])):
+                raise self._error(self._unexpected(tok) if kind == "other" else
+                                  "unexpected " + repr(tok[1]), tok)
+
+    def _statement(self):
+        """Parses a statement, and returns a list of nodes, since builtins
+        such as unset may be given several names.
+        """
+        tokens = self.tokens
+        tok = tokens[self.i]
+        if tok[0] == "lit" and self._ends_word(self.i + 1):
+            word = tok[1]
+            if word == "if":
+                return [self._if()]
+            elif word == "for":
+                return [self._for()]
+            elif word == "function":
+                self.i += 1
+                return [self._function(tok)]
+            elif word == ":":
+                self.i += 1
+                lineno, column = self._where(tok)
+                return [nodes.Pass(lineno=lineno, column=column)]
+            elif word in _BUILTINS:
+                self.i += 1
+                return _BUILTINS[word](self, tok)
+            elif word in _RESERVED:
+                raise self._error(repr(word) + " is not supported here", tok)
+            nxt = tokens[self.i + 1]
+            if nxt[0] == "op" and nxt[1] == "(" and _IDENT.match(word):
+                return [self._function(tok)]
+        if tok[0] == "lit" and _ASSIGN.match(tok[1]):
+            return [self._assign(nodes.Assign, tok, scope="global")]
+        node = self._and_or()
+        tok = tokens[self.i]
+        if tok[0] == "op" and tok[1] == "&":
+            self.i += 1
+            node = self._background(node)
+        return [node]
+
+    def _assign(self, cls, tok, **kwargs):
+        """Parses a NAME=value word into an assignment node."""
+        name, _, rest = tok[1].partition("=")
+        lineno, column = self._where(tok)
+        if rest:
+            # parse the value from the rest of the word onwards
+            self.tokens[self.i] = ("lit", rest, tok[2] + len(name) + 1, False)
+            value = self._word()
+        elif self._ends_word(self.i + 1):
+            self.i += 1
+            value = nodes.String(parts=[], lineno=lineno, column=column + len(name) + 1)
+        else:
+            self.i += 1
+            value = self._word()
+        if cls is nodes.EnvAssign:
+            self.exported.add(name)
+        return cls(name=name, value=value, lineno=lineno, column=column, **kwargs)
+
+    def _export(self, tok):
+        rtn = []
+        while self.tokens[self.i][0] in _PIECES:
+            tok = self.tokens[self.i]
+            if tok[0] == "lit" and _ASSIGN.match(tok[1]):
+                rtn.append(self._assign(nodes.EnvAssign, tok))
+            else:
+                name = self._name()
+                lineno, column = self._where(tok)
+                self.exported.add(name)
+                rtn.append(nodes.EnvAssign(
+                    name=name, value=self._var(name, tok), lineno=lineno, column=column))
+        if not rtn:
+            raise self._error("expected a name to export", self.tokens[self.i])
+        return rtn
+
+    def _local(self, tok):
+        rtn = []
+        while self.tokens[self.i][0] in _PIECES:
+            tok = self.tokens[self.i]
+            if tok[0] == "lit" and _ASSIGN.match(tok[1]):
+                rtn.append(self._assign(nodes.Assign, tok, scope="local"))
+            else:
+                name = self._name()
+                lineno, column = self._where(tok)
+                rtn.append(nodes.Assign(
+                    name=name, value=nodes.String(parts=[], lineno=lineno, column=column),
+                    scope="local", lineno=lineno, column=column))
+        if not rtn:
+            raise self._error("expected a name", self.tokens[self.i])
+        return rtn
+
+    def _alias(self, tok):
+        rtn = []
+        while self.tokens[self.i][0] in _PIECES:
+            tok = self.tokens[self.i]
+            if not (tok[0] == "lit" and _ASSIGN.match(tok[1])):
+                raise self._error("expected name=value", tok)
+            rtn.append(self._assign(nodes.AliasAssign, tok))
+        if not rtn:
+            raise self._error("expected name=value", self.tokens[self.i])
+        return rtn
+
+    def _unset(self, tok):
+        rtn = []
+        if self._at_word("-v"):
+            self.i += 1
+        while self.tokens[self.i][0] in _PIECES:
+            tok = self.tokens[self.i]
+            name = self._name()
+            lineno, column = self._where(tok)
+            if name in self.exported:
+                self.exported.discard(name)
+                rtn.append(nodes.EnvDelete(name=name, lineno=lineno, column=column))
+            else:
+                rtn.append(nodes.Delete(name=name, lineno=lineno, column=column))
+        if not rtn:
+            raise self._error("expected a name to unset", self.tokens[self.i])
+        return rtn
+
+    def _unalias(self, tok):
+        rtn = []
+        while self.tokens[self.i][0] in _PIECES:
+            tok = self.tokens[self.i]
+            name = self._name()
+            lineno, column = self._where(tok)
+            rtn.append(nodes.AliasDelete(name=name, lineno=lineno, column=column))
+        if not rtn:
+            raise self._error("expected a name to unalias", self.tokens[self.i])
+        return rtn
+
+    def _if(self):
+        # elif clauses are nested Ifs in orelse, which are built as a chain
+        # rather than recursively
+        top = None
+        last = None
+        stop = ("elif", "else", "fi")
+        while True:
+            tok = self.tokens[self.i]
+            self.i += 1
+            lineno, column = self._where(tok)
+            test = self._and_or()
+            self._expect_word("then")
+            body = self._statements(stop)
+            node = nodes.If(test=test, body=body, orelse=[], lineno=lineno, column=column)
+            if last is None:
+                top = node
+            else:
+                last.orelse = [node]
+            last = node
+            if not self._at_word("elif"):
+                break
+        if self._at_word("else"):
+            self.i += 1
+            last.orelse = self._statements(("fi",))
+        self._expect_word("fi")
+        return top
+
+    def _for(self):
+        tok = self.tokens[self.i]
+        self.i += 1
+        lineno, column = self._where(tok)
+        target_tok = self.tokens[self.i]
+        if target_tok[0] == "var" and self._ends_word(self.i + 1):
+            self.i += 1
+            tlineno, tcolumn = self._where(target_tok)
+            target = nodes.EnvVar(name=target_tok[1], lineno=tlineno, column=tcolumn)
+        else:
+            name = self._name()
+            tlineno, tcolumn = self._where(target_tok)
+            target = nodes.Var(name=name, lineno=tlineno, column=tcolumn)
+        if not self._at_word("in"):
+            raise self._error("expected 'in'", self.tokens[self.i])
+        self.i += 1
+        words = []
+        while self.tokens[self.i][0] in _PIECES:
+            words.append(self._word())
+        if not words:
+            raise self._error("expected words to loop over", self.tokens[self.i])
+        if len(words) == 1:
+            it = words[0]
+        elif all(isinstance(w, nodes.RawString) for w in words):
+            it = nodes.RawString(value=" ".join(w.value for w in words),
+                                 lineno=words[0].lineno, column=words[0].column)
+        else:
+            it = nodes.Command(args=words, lineno=words[0].lineno, column=words[0].column)
+        self._expect_word("do")
+        body = self._statements(("done",))
+        self._expect_word("done")
+        return nodes.For(target=target, iter=it, body=body, lineno=lineno, column=column)
+
+    def _function(self, tok):
+        lineno, column = self._where(tok)
+        name = self._name()
+        tokens = self.tokens
+        if tokens[self.i][0] == "op" and tokens[self.i][1] == "(":
+            self.i += 1
+            if not (tokens[self.i][0] == "op" and tokens[self.i][1] == ")"):
+                raise self._error("expected ')'", tokens[self.i])
+            self.i += 1
+        self._skip_newlines()
+        if not self._at_word("{"):
+            raise self._error("expected '{'", tokens[self.i])
+        self.i += 1
+        body = self._statements(())
+        self._expect_word("}")
+        return nodes.Function(name=name, body=body, lineno=lineno, column=column)
+
+    #
+    # Expressions
+    #
+
+    def _and_or(self):
+        tokens = self.tokens
+        node = self._pipeline()
+        while True:
+            tok = tokens[self.i]
+            if tok[0] != "op" or (tok[1] != "&&" and tok[1] != "||"):
+                return node
+            self.i += 1
+            self._skip_newlines()
+            cls = nodes.And if tok[1] == "&&" else nodes.Or
+            node = cls(lhs=node, rhs=self._pipeline(),
+                       lineno=node.lineno, column=node.column)
+
+    def _pipeline(self):
+        if self._at_word("!"):
+            tok = self.tokens[self.i]
+            self.i += 1
+            lineno, column = self._where(tok)
+            return nodes.Not(node=self._pipeline(), lineno=lineno, column=column)
+        node = self._command(nodes.Command)
+        tok = self.tokens[self.i]
+        if tok[0] == "op" and tok[1] == "|":
+            raise self._error("pipes are not supported", tok)
+        return node
+
+    def _command(self, cls):
+        """Parses a simple command. Commands of a single word that is not a
+        plain literal, such as $x, are returned as that word.
+        """
+        tokens = self.tokens
+        start = tokens[self.i]
+        args = []
+        kwargs = {}
+        while True:
+            tok = tokens[self.i]
+            kind = tok[0]
+            if kind in _PIECES:
+                args.append(self._word())
+            elif kind == "op" and tok[1] in _REDIRECTS:
+                self.i += 1
+                if tokens[self.i][0] not in _PIECES:
+                    raise self._error("expected a redirect target", tokens[self.i])
+                kwargs[_REDIRECTS[tok[1]]] = self._word()
+            elif kind == "op" and tok[1] in (">>", "2>&1", "&>", ";;", "(", ")", "|"):
+                if tok[1] == "|" and args:
+                    break
+                raise self._error(repr(tok[1]) + " is not supported", tok)
+            elif kind == "other":
+                raise self._error(self._unexpected(tok), tok)
+            else:
+                break
+        if not args:
+            raise self._error("expected a command, not " + repr(start[1] or "end"), start)
+        if (cls is nodes.Command and not kwargs and len(args) == 1 and
+                not isinstance(args[0], nodes.RawString)):
+            return args[0]
+        lineno, column = self._where(start)
+        return cls(args=args, lineno=lineno, column=column, **kwargs)
+
+    def _background(self, node):
+        """Marks the last command of a statement as run in the background."""
+        if isinstance(node, nodes.BinOp):
+            node.rhs = self._background(node.rhs)
+            return node
+        if not isinstance(node, nodes.Command) or isinstance(node, nodes.CapturedCommand):
+            node = nodes.Command(args=[node], lineno=node.lineno, column=node.column)
+        node.background = True
+        return node
+
+    def _word(self):
+        """Parses the pieces of a word into a RawString, Var, EnvVar,
+        CapturedCommand, or, if it is quoted or made of several pieces, a
+        String. The emitters write the RawString parts of Strings within
+        double quotes as they are, so their text is kept as it would be
+        written within double quotes: escapes within double quotes are kept,
+        and the special characters of single quoted or backslash escaped
+        text are escaped.
+        """
+        tokens = self.tokens
+        start = tokens[self.i]
+        parts = []
+        raw = []
+        quoted = False
+        first = True
+        while True:
+            tok = tokens[self.i]
+            kind = tok[0]
+            if kind not in _PIECES or (tok[3] and not first):
+                break
+            first = False
+            self.i += 1
+            if kind == "lit":
+                raw.append(tok[1])
+            elif kind == "var":
+                if raw:
+                    parts.append(self._raw(raw, start))
+                parts.append(self._var(tok[1], tok))
+            elif kind == "cmdsub":
+                if raw:
+                    parts.append(self._raw(raw, start))
+                parts.append(self._cmdsub(tok))
+            elif kind == "sq" or kind == "esc":
+                quoted = True
+                raw.append(tok[1].translate(_DQ_ESCAPES))
+            else:
+                quoted = True
+                while True:
+                    tok = tokens[self.i]
+                    kind = tok[0]
+                    self.i += 1
+                    if kind == "dqend":
+                        break
+                    elif kind == "lit":
+                        raw.append(tok[1])
+                    elif kind == "var":
+                        if raw:
+                            parts.append(self._raw(raw, start))
+                        parts.append(self._var(tok[1], tok))
+                    elif kind == "cmdsub":
+                        if raw:
+                            parts.append(self._raw(raw, start))
+                        parts.append(self._cmdsub(tok))
+                    elif kind == "other" and tok[1]:
+                        raise self._error(self._unexpected(tok), tok)
+                    else:
+                        raise self._error("unterminated string", start)
+        if raw:
+            parts.append(self._raw(raw, start))
+        if len(parts) == 1 and not quoted:
+            return parts[0]
+        lineno, column = self._where(start)
+        return nodes.String(parts=parts, lineno=lineno, column=column)
+
+    def _raw(self, raw, tok):
+        lineno, column = self._where(tok)
+        node = nodes.RawString(value="".join(raw), lineno=lineno, column=column)
+        raw.clear()
+        return node
+
+    def _cmdsub(self, tok):
+        node = self._command(nodes.CapturedCommand)
+        end = self.tokens[self.i]
+        if end[0] != "cmdend":
+            raise self._error("expected ')' to end $(", end if end[0] != "eof" else tok)
+        self.i += 1
+        lineno, column = self._where(tok)
+        node.lineno = lineno
+        node.column = column
+        return node
+
+
+_BUILTINS = {
+    "export": BashParser._export,
+    "local": BashParser._local,
+    "alias": BashParser._alias,
+    "unset": BashParser._unset,
+    "unalias": BashParser._unalias,
+}
+
+
+def parse(source, filename="<string>"):
+    """Parses Bash source into a Script node, with the line and column
+    numbers of each node filled in.
+
+    Parameters
+    ----------
+    source : str
+    filename : str
+        The name of the source, for error messages.
+
+    Returns
+    -------
+    tree : Script
+    """
+    return BashParser(source, filename=filename).parse()
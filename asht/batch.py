@@ -0,0 +1,116 @@
+"""Translating many trees at once, in parallel"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+
+from .emitters import dumps
+
+
+class BatchStats:
+    """Throughput of a call to translate_many().
+
+    Attributes
+    ----------
+    trees : int
+        The number of trees translated.
+    outputs : int
+        The number of code strings emitted, one per tree and shell.
+    chars : int
+        The total length of the code emitted.
+    seconds : float
+        The wall time taken.
+    """
+
+    def __init__(self):
+        self.trees = 0
+        self.outputs = 0
+        self.chars = 0
+        self.seconds = 0.0
+
+    @property
+    def trees_per_second(self):
+        return self.trees / self.seconds if self.seconds else 0.0
+
+    @property
+    def chars_per_second(self):
+        return self.chars / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return "{} trees, {} outputs, {} chars in {:.3f} s: {:.0f} trees/s, {:.0f} chars/s".format(
+            self.trees, self.outputs, self.chars, self.seconds,
+            self.trees_per_second, self.chars_per_second,
+        )
+
+
+def _chunks(trees, chunksize):
+    it = iter(trees)
+    while True:
+        chunk = list(islice(it, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _translate_chunk(chunk, shells):
+    """Translates a chunk of trees in a worker process."""
+    return [tuple(dumps(tree, shell=shell) for shell in shells) for tree in chunk]
+
+
+def translate_many(trees, shells=("bash", "xonsh"), jobs=None, chunksize=None,
+                   stats=None):
+    """Translates many trees into code for one or more shells, spreading the
+    work over a pool of processes.
+
+    The trees are sent to the workers in chunks, to amortize the cost of
+    pickling and inter-process communication, and the results are returned
+    in the same order as the trees.
+
+    Parameters
+    ----------
+    trees : iterable of Node or dict trees
+    shells : str or sequence of str
+        The shell, or shells, to translate each tree into.
+    jobs : int or None
+        The number of worker processes. Defaults to the number of CPUs.
+        If 1, the trees are translated in this process.
+    chunksize : int or None
+        The number of trees sent to a worker at a time. Defaults to
+        splitting the trees into about four chunks per worker.
+    stats : BatchStats or None
+        If given, this is filled in with the throughput of the call.
+
+    Returns
+    -------
+    results : list
+        For each tree, the code as a string if shells is a single shell,
+        or a tuple of strings in the order of shells otherwise.
+    """
+    t0 = time.perf_counter()
+    single = isinstance(shells, str)
+    shells = (shells,) if single else tuple(shells)
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if chunksize is None:
+        if not hasattr(trees, "__len__"):
+            trees = list(trees)
+        chunksize = max(1, -(-len(trees) // (4 * jobs)))
+    translate = partial(_translate_chunk, shells=shells)
+    results = []
+    if jobs == 1:
+        for chunk in _chunks(trees, chunksize):
+            results.extend(translate(chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for chunk_results in pool.map(translate, _chunks(trees, chunksize)):
+                results.extend(chunk_results)
+    if single:
+        results = [codes[0] for codes in results]
+    if stats is not None:
+        stats.trees = len(results)
+        stats.outputs = len(results) * len(shells)
+        stats.chars = sum(map(len, results)) if single else sum(
+            len(code) for codes in results for code in codes)
+        stats.seconds = time.perf_counter() - t0
+    return results
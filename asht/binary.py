@@ -0,0 +1,303 @@
+"""Compact binary serialization of node trees.
+
+The format is made up of a header, a table of node classes, a table of
+deduplicated strings, and the nodes themselves::
+
+    b"ASHT" version
+    nclasses  (name nfields field...)...
+    nstrings  (length utf8-bytes)...
+    nnodes    node...
+
+All integers, including lengths, counts, and indices, are unsigned LEB128
+varints, and all names are indices into the string table. The nodes are
+written in post-order, so that each node follows its children, and may be
+rebuilt with a stack and no recursion. Each node starts with the index of
+its class shifted left by one, whose low bit is set if the line and column
+numbers follow. Then for each field of the class there is a tag, followed
+by its value, if any:
+
+    MISSING  the field is not set
+    NODE     the next child node
+    LIST n   a list of the next n child nodes
+    STR i    the string at index i
+    FALSE, TRUE, NONE
+    INT n    a non-negative integer
+"""
+import mmap
+
+from . import nodes
+from .visitors import DictToNode
+
+
+MAGIC = b"ASHT"
+VERSION = 1
+
+MISSING, NODE, LIST, STR, FALSE, TRUE, NONE, INT = range(8)
+
+# placeholder for a child node while the fields of its parent are read
+_CHILD = object()
+
+
+def _write_varint(out, n):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def dumpb(tree):
+    """Serializes a node tree, or a dict tree, to bytes.
+
+    Parameters
+    ----------
+    tree : Node or dict
+
+    Returns
+    -------
+    data : bytes
+    """
+    if not isinstance(tree, nodes.Node):
+        tree = DictToNode().visit(tree)
+    strings = {}
+    classes = {}
+    body = bytearray()
+    append = body.append
+    nnodes = 0
+
+    def string(s):
+        i = strings.get(s)
+        if i is None:
+            i = strings[s] = len(strings)
+        return i
+
+    # post-order with an explicit stack: a node is pushed twice, first to
+    # push its children and then, once they have been written, to write it
+    stack = [(tree, False)]
+    push = stack.append
+    pop = stack.pop
+    while stack:
+        node, done = pop()
+        if not done:
+            push((node, True))
+            children = []
+            for field in node.fields:
+                val = getattr(node, field, None)
+                if isinstance(val, nodes.Node):
+                    children.append(val)
+                elif isinstance(val, (list, tuple)):
+                    children.extend(val)
+            for child in reversed(children):
+                push((child, False))
+            continue
+        cls = node.__class__
+        if cls._frozen:
+            cls = cls._thawed
+        code = classes.get(cls)
+        if code is None:
+            code = classes[cls] = len(classes)
+            for name in (cls.__name__,) + cls.fields:
+                string(name)
+        if node.lineno != 1 or node.column != 1:
+            _write_varint(body, code << 1 | 1)
+            _write_varint(body, node.lineno)
+            _write_varint(body, node.column)
+        else:
+            _write_varint(body, code << 1)
+        for field in cls.fields:
+            val = getattr(node, field, nodes._MISSING)
+            if isinstance(val, str):
+                append(STR)
+                _write_varint(body, string(val))
+            elif isinstance(val, nodes.Node):
+                append(NODE)
+            elif isinstance(val, (list, tuple)):
+                append(LIST)
+                _write_varint(body, len(val))
+            elif val is nodes._MISSING:
+                append(MISSING)
+            elif val is True:
+                append(TRUE)
+            elif val is False:
+                append(FALSE)
+            elif val is None:
+                append(NONE)
+            elif isinstance(val, int) and val >= 0:
+                append(INT)
+                _write_varint(body, val)
+            else:
+                raise TypeError("cannot serialize " + cls.__name__ + "." +
+                                field + " of type " + type(val).__name__)
+        nnodes += 1
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    _write_varint(out, len(classes))
+    for cls in classes:
+        _write_varint(out, strings[cls.__name__])
+        _write_varint(out, len(cls.fields))
+        for field in cls.fields:
+            _write_varint(out, strings[field])
+    _write_varint(out, len(strings))
+    for s in strings:
+        b = s.encode("utf-8")
+        _write_varint(out, len(b))
+        out += b
+    _write_varint(out, nnodes)
+    out += body
+    return bytes(out)
+
+
+def _read_varint(data, i):
+    b = data[i]
+    i += 1
+    if b < 0x80:
+        return b, i
+    n = b & 0x7F
+    shift = 7
+    while True:
+        b = data[i]
+        i += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, i
+        shift += 7
+
+
+def loadb(data):
+    """Loads a node tree from binary data, which may be bytes, bytearray,
+    memoryview, mmap, or any other object that supports the buffer
+    protocol. The data are read in place, without being copied.
+
+    Parameters
+    ----------
+    data : bytes-like
+
+    Returns
+    -------
+    tree : Node
+    """
+    view = memoryview(data)
+    try:
+        if view.ndim != 1 or view.format not in ("B", "b", "c"):
+            with view.cast("B") as cast:
+                return _loadb(cast)
+        return _loadb(view)
+    finally:
+        # an error's traceback would otherwise keep the data exported, so
+        # that an mmap could not be closed
+        view.release()
+
+
+def _loadb(data):
+    if bytes(data[:4]) != MAGIC:
+        raise ValueError("not an asht binary tree")
+    if data[4] != VERSION:
+        raise ValueError("unsupported asht binary version: " + str(data[4]))
+    read = _read_varint
+    i = 5
+    nclasses, i = read(data, i)
+    class_refs = []
+    for _ in range(nclasses):
+        name, i = read(data, i)
+        nfields, i = read(data, i)
+        fields = []
+        for _ in range(nfields):
+            field, i = read(data, i)
+            fields.append(field)
+        class_refs.append((name, fields))
+    nstrings, i = read(data, i)
+    strings = []
+    for _ in range(nstrings):
+        n, i = read(data, i)
+        strings.append(str(data[i:i + n], "utf-8"))
+        i += n
+    classes = []
+    for name, fields in class_refs:
+        name = strings[name]
+        cls = getattr(nodes, name, None)
+        if not (isinstance(cls, type) and issubclass(cls, nodes.Node)):
+            raise ValueError("unknown node class: " + name)
+        fields = tuple(strings[f] for f in fields)
+        classes.append((cls, fields, fields == cls.fields))
+    nnodes, i = read(data, i)
+    stack = []
+    push = stack.append
+    for _ in range(nnodes):
+        code = data[i]
+        if code < 0x80:
+            i += 1
+        else:
+            code, i = read(data, i)
+        cls, fields, positional = classes[code >> 1]
+        if code & 1:
+            lineno, i = read(data, i)
+            column, i = read(data, i)
+        else:
+            lineno = column = 1
+        values = []
+        nchildren = 0
+        missing = False
+        for _ in fields:
+            tag = data[i]
+            i += 1
+            if tag == STR:
+                n = data[i]
+                if n < 0x80:
+                    i += 1
+                else:
+                    n, i = read(data, i)
+                values.append(strings[n])
+            elif tag == NODE:
+                values.append(_CHILD)
+                nchildren += 1
+            elif tag == LIST:
+                n, i = read(data, i)
+                if n:
+                    values.append((_CHILD, n))
+                    nchildren += n
+                else:
+                    values.append([])
+            elif tag == MISSING:
+                values.append(nodes._MISSING)
+                missing = True
+            elif tag == TRUE:
+                values.append(True)
+            elif tag == FALSE:
+                values.append(False)
+            elif tag == NONE:
+                values.append(None)
+            elif tag == INT:
+                n, i = read(data, i)
+                values.append(n)
+            else:
+                raise ValueError("invalid field tag: " + str(tag))
+        if nchildren:
+            children = stack[-nchildren:]
+            del stack[-nchildren:]
+            k = 0
+            for j, val in enumerate(values):
+                if val is _CHILD:
+                    values[j] = children[k]
+                    k += 1
+                elif val.__class__ is tuple:
+                    n = val[1]
+                    values[j] = children[k:k + n]
+                    k += n
+        if positional and not missing:
+            node = cls(*values, lineno=lineno, column=column)
+        else:
+            kwargs = {f: v for f, v in zip(fields, values)
+                      if v is not nodes._MISSING}
+            node = cls(lineno=lineno, column=column, **kwargs)
+        push(node)
+    if len(stack) != 1:
+        raise ValueError("malformed asht binary tree")
+    return stack[0]
+
+
+def loadb_mmap(path):
+    """Loads a node tree from a binary file by memory-mapping it, rather
+    than reading it into memory.
+    """
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return loadb(mm)
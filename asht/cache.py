@@ -0,0 +1,179 @@
+"""Caching of emitted code for repeated subtrees"""
+import weakref
+from collections import OrderedDict
+from hashlib import blake2b
+
+from .nodes import Node, _MISSING
+
+
+DEFAULT_KINDS = frozenset(["Function", "If", "For", "And", "Or", "CapturedCommand"])
+
+# digests of frozen nodes, which cannot change, are kept as long as the
+# nodes, in a table for each set of kinds that they were computed for
+_FROZEN_DIGESTS = {}
+
+
+class _Range:
+    """Marks the end of the tokens of a subtree, which are then hashed."""
+
+    __slots__ = ("node", "start")
+
+    def __init__(self, node, start):
+        self.node = node
+        self.start = start
+
+
+def subtree_digests(tree, kinds=None, digests=None):
+    """Computes the stable structural digests of a node tree and of those
+    of its subtrees whose node class names are in kinds, or of all of its
+    subtrees if kinds is None.
+
+    The tree is digested in one bottom-up pass. It is serialized in
+    pre-order into a flat list of tokens, and when the tokens of a wanted
+    subtree are complete they are hashed with BLAKE2b and replaced by the
+    digest, so every node is serialized and hashed only once however deeply
+    the wanted subtrees are nested. The digest depends only on the names of
+    the node classes and the values of the fields, and not on the identity
+    of the nodes, their line and column numbers, or the Python process.
+    It does depend on the kinds, so only digests computed for the same
+    kinds may be compared. Frozen subtrees whose digests are already known
+    are not descended into.
+
+    Parameters
+    ----------
+    tree : Node
+    kinds : set of str or None
+    digests : dict or None
+        Dict that the digests are added to, keyed by the ids of the nodes.
+
+    Returns
+    -------
+    digests : dict
+    """
+    digests = {} if digests is None else digests
+    if kinds is not None:
+        kinds = frozenset(kinds)
+    known = _FROZEN_DIGESTS.get(kinds)
+    if known is None:
+        known = _FROZEN_DIGESTS[kinds] = weakref.WeakKeyDictionary()
+    tokens = []
+    append = tokens.append
+    stack = [tree]
+    push = stack.append
+    pop = stack.pop
+    while stack:
+        item = pop()
+        cls = item.__class__
+        if cls is str:
+            append(item)
+            continue
+        if cls is _Range:
+            node = item.node
+            start = item.start
+            d = blake2b("\0".join(tokens[start:]).encode(), digest_size=16).digest()
+            # within the enclosing subtree, this one is replaced by its digest
+            del tokens[start:]
+            append("#" + d.hex())
+            digests[id(node)] = d
+            if node._frozen:
+                known[node] = d
+            continue
+        name = cls.__name__
+        if kinds is None or name in kinds or item is tree:
+            if item._frozen:
+                d = known.get(item)
+                if d is not None:
+                    digests[id(item)] = d
+                    append("#" + d.hex())
+                    continue
+            push(_Range(item, len(tokens)))
+        else:
+            push(")")
+        append("(" + name)
+        for field in reversed(item.fields):
+            val = getattr(item, field, _MISSING)
+            if isinstance(val, Node):
+                push(val)
+            elif isinstance(val, (list, tuple)):
+                for x in reversed(val):
+                    push(x if isinstance(x, Node) else "v" + repr(x))
+                push("[" + str(len(val)))
+            elif val is _MISSING:
+                push("-")
+            else:
+                push("v" + repr(val))
+    return digests
+
+
+def digest(node):
+    """Returns the stable structural digest of a node tree, as bytes."""
+    if node._frozen:
+        d = _FROZEN_DIGESTS.get(frozenset(), {}).get(node)
+        if d is not None:
+            return d
+    return subtree_digests(node, kinds=())[id(node)]
+
+
+class EmitCache:
+    """Bounded least-recently-used cache of the code emitted for subtrees,
+    keyed by the structural digest of the subtree and the shell. A cache
+    may be shared between emitters, calls, and scripts.
+
+    The digests of frozen nodes are computed once and kept, so repeated
+    frozen (and especially interned) subtrees are emitted almost for free.
+    Mutable subtrees have to be digested again on every call, which costs
+    about as much as emitting them.
+
+    Parameters
+    ----------
+    maxsize : int
+        The maximum number of subtrees to keep.
+    kinds : set of str
+        The names of the node classes whose code is cached.
+
+    Attributes
+    ----------
+    hits : int
+        The number of subtrees whose code was found in the cache.
+    misses : int
+        The number of subtrees whose code was not found in the cache.
+    """
+
+    def __init__(self, maxsize=1024, kinds=DEFAULT_KINDS):
+        self.maxsize = maxsize
+        self.kinds = frozenset(kinds)
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key):
+        """Returns the entry for a key, or None, and counts a hit or a miss."""
+        data = self._data
+        try:
+            entry = data[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        data.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        """Adds an entry, evicting the least recently used if full."""
+        data = self._data
+        data[key] = entry
+        data.move_to_end(key)
+        if len(data) > self.maxsize:
+            data.popitem(last=False)
+
+    def clear(self):
+        """Removes all entries and resets the counters."""
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
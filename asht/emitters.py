@@ -0,0 +1,408 @@
+"""Shared machinery for visitors that emit shell code"""
+import importlib
+from collections.abc import Mapping
+from types import GeneratorType
+
+from .nodes import Node, Script, track, is_dirty, clean
+from .visitors import NodeVisitor
+from .cache import subtree_digests
+
+
+EMITTERS = {}
+
+
+def _script_body(tree):
+    """Returns the body of a Script node or dict, or None for other trees."""
+    if isinstance(tree, Script):
+        return tree.body
+    if isinstance(tree, Mapping) and "Script" in tree:
+        return tree["Script"]["body"]
+    return None
+
+
+class IndentWriter:
+    """Writes lines of code at the current indentation depth.
+
+    Each line is written exactly once with its indentation prefix, so
+    the cost of writing is linear in the size of the output regardless
+    of how deeply the blocks are nested. The prefixes of the first
+    CACHED_DEPTHS depths are kept, and deeper ones are made when they are
+    needed, so that memory is not quadratic in the depth.
+    """
+
+    CACHED_DEPTHS = 64
+
+    def __init__(self, write, indent="  "):
+        """
+        Parameters
+        ----------
+        write : callable
+            Function that output chunks are passed to.
+        indent : str
+            The string to indent by for each level of depth.
+        """
+        self.write = write
+        self.indent = indent
+        self.depth = 0
+        self.prefix = ""
+        self._prefixes = [indent * i for i in range(self.CACHED_DEPTHS)]
+
+    def line(self, s):
+        """Writes a line at the current depth."""
+        self.write(self.prefix + s + "\n")
+
+    def prefix_at(self, depth):
+        """Returns the indentation prefix for a depth."""
+        if depth < self.CACHED_DEPTHS:
+            return self._prefixes[depth]
+        return self.indent * depth
+
+    def push(self):
+        """Increases the depth by one level."""
+        self.depth += 1
+        self.prefix = self.prefix_at(self.depth)
+
+    def pop(self):
+        """Decreases the depth by one level."""
+        self.depth -= 1
+        self.prefix = self.prefix_at(self.depth)
+
+
+class Emitter:
+    """Mixin for visitors that stream shell code as they go.
+
+    Statement visitors write their code line by line with ``self.line()``
+    and return None, while expression visitors return their code as a
+    string. Blocks of statements are written one level deeper by
+    ``_block()``. Lines are passed to the write callable, which defaults
+    to appending to ``self.chunks``, but may be any function that accepts
+    a string, such as ``fp.write``.
+
+    Subclasses that set the ``shell`` class attribute are registered in
+    ``EMITTERS`` so that they may be looked up by ``get_emitter()``.
+
+    Node emitters may be given an ``asht.cache.EmitCache``. The code for
+    the kinds of nodes that it lists is then looked up by the structural
+    digest of the node before the node is visited. On a hit the cached
+    lines are written out again at the current depth, and on a miss the
+    lines written while visiting the node are recorded in the cache.
+    """
+
+    shell = None
+    indent = "  "
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "shell" in cls.__dict__ and cls.shell is not None:
+            kind = "node" if issubclass(cls, NodeVisitor) else "dict"
+            EMITTERS[cls.shell, kind] = cls
+
+    def __init__(self, root=None, write=None, cache=None):
+        """
+        Parameters
+        ----------
+        root : Node, dict, or None
+        write : callable or None
+            Function that output chunks are passed to.
+        cache : EmitCache or None
+            Cache of the code for subtrees, for node emitters only.
+        """
+        self.root = root
+        self.chunks = []
+        self.writer = IndentWriter(
+            self.chunks.append if write is None else write,
+            indent=self.indent,
+        )
+        self.line = self.writer.line
+        # the number of Functions that the node being visited is within
+        self._functions = 0
+        self.cache = cache
+        if cache is not None:
+            if not isinstance(self, NodeVisitor):
+                raise TypeError("emission caches are only supported for node trees")
+            self._digests = {}
+            # (depth, line) pairs written while any node is being recorded
+            self._log = []
+            self._recording = 0
+            self.line = self._logged_line
+
+    def _logged_line(self, s):
+        writer = self.writer
+        writer.line(s)
+        if self._recording:
+            self._log.append((writer.depth, s))
+
+    def _wrap_method(self, kind, meth):
+        meth = super()._wrap_method(kind, meth)
+        if self.cache is not None and self._kind_name(kind) in self.cache.kinds:
+            meth = self._cached(meth)
+        return meth
+
+    def _cached(self, meth):
+        """Wraps a visit method so that its code is looked up in, or added
+        to, the cache.
+        """
+        cache = self.cache
+        kinds = cache.kinds
+        shell = self.shell
+        digests = self._digests
+        writer = self.writer
+
+        def visit_cached(node):
+            d = digests.get(id(node))
+            if d is None:
+                # the outermost cached node digests its nested ones as well
+                d = subtree_digests(node, kinds, digests)[id(node)]
+            # code within functions may differ, such as by declaring locals
+            key = (d, shell, self._functions > 0)
+            entry = cache.get(key)
+            if entry is not None:
+                self._replay(entry[1])
+                return entry[0]
+            start = len(self._log)
+            base = writer.depth
+            self._recording += 1
+            rtn = meth(node)
+            if rtn.__class__ is GeneratorType:
+                return self._record(rtn, key, start, base)
+            self._store(key, rtn, start, base)
+            return rtn
+
+        return visit_cached
+
+    def _record(self, gen, key, start, base):
+        rtn = yield from gen
+        self._store(key, rtn, start, base)
+        return rtn
+
+    def _store(self, key, rtn, start, base):
+        log = self._log
+        lines = tuple([(depth - base, s) for depth, s in log[start:]])
+        self._recording -= 1
+        if not self._recording:
+            log.clear()
+        self.cache.put(key, (rtn, lines))
+
+    def _replay(self, lines):
+        writer = self.writer
+        write = writer.write
+        prefix_at = writer.prefix_at
+        base = writer.depth
+        for depth, s in lines:
+            write(prefix_at(base + depth) + s + "\n")
+        if self._recording:
+            self._log.extend([(base + depth, s) for depth, s in lines])
+
+    def _visit(self, tree=None):
+        """Visits a tree, writing out the code for statements and returning
+        the code for expressions, or None for statements."""
+        try:
+            return super().visit(tree)
+        finally:
+            if self.cache is not None:
+                self._digests.clear()
+
+    def visit(self, tree=None):
+        """Returns the code for a tree as a string, as the emitters always
+        have, whether it is an expression or is made of statements. The
+        code for statements is taken from ``self.chunks``, so it is empty
+        if the emitter was given its own write callable.
+        """
+        rtn = self._visit(tree)
+        if rtn is None:
+            rtn = "".join(self.chunks)
+            self.chunks.clear()
+        return rtn
+
+    def _statements(self, stmts):
+        """Visit generator that writes out statements at the current depth.
+        Expressions in statement position are written on their own line.
+        """
+        line = self.line
+        for stmt in stmts:
+            rtn = yield stmt
+            if rtn is not None:
+                line(rtn)
+
+    def _block(self, stmts):
+        """Visit generator that writes out statements one level deeper than
+        the current depth.
+        """
+        writer = self.writer
+        writer.push()
+        yield from self._statements(stmts)
+        writer.pop()
+
+    def _chain(self, tree, ops):
+        """Visit generator that returns the code for a tree of binary
+        operators, such as a long chain of Ands and Ors.
+
+        The code of such a tree is that of its operands, in order, joined
+        by the operators, since none of the shells put them in parentheses.
+        So the operands are visited all at once, and their code is joined
+        once, rather than once per operator, which would take time
+        quadratic in the length of the chain.
+
+        Parameters
+        ----------
+        tree : Node or dict
+        ops : dict
+            Maps the names of the kinds of operators to their code.
+        """
+        kind_of = self._kind_of
+        kind_name = self._kind_name
+        operands = []
+        # the operators, and None in place of each operand
+        parts = []
+        stack = [tree]
+        while stack:
+            x = stack.pop()
+            if x.__class__ is str:
+                parts.append(x)
+                continue
+            op = ops.get(kind_name(kind_of(x)))
+            if op is None:
+                operands.append(x)
+                parts.append(None)
+                continue
+            if isinstance(x, Node):
+                lhs, rhs = x.lhs, x.rhs
+            else:
+                attrs = next(iter(x.values()))
+                lhs, rhs = attrs["lhs"], attrs["rhs"]
+            stack.append(rhs)
+            stack.append(op)
+            stack.append(lhs)
+        codes = iter((yield operands))
+        return "".join([next(codes) if p is None else p for p in parts])
+
+    def _function_body(self, stmts):
+        """Visit generator that writes out the body of a function one level
+        deeper than the current depth."""
+        self._functions += 1
+        yield from self._block(stmts)
+        self._functions -= 1
+
+    def emit(self, tree=None):
+        """Returns the code for a tree as a single string."""
+        return self.visit(tree)
+
+    def iter(self, tree=None):
+        """Yields the code for a tree in chunks, one per top-level statement
+        of a Script. The Script body may be any iterable, including a
+        generator, and is only consumed as the chunks are requested.
+        """
+        tree = self.root if tree is None else tree
+        body = _script_body(tree)
+        if body is None:
+            s = self.emit(tree)
+            if s:
+                yield s
+            return
+        chunks = self.chunks
+        self.writer.write = chunks.append
+        for stmt in body:
+            rtn = self._visit(stmt)
+            if rtn is not None:
+                self.line(rtn)
+            if chunks:
+                yield "".join(chunks)
+                chunks.clear()
+
+
+def get_emitter(tree, shell):
+    """Returns the emitter class for a tree and a shell name."""
+    kind = "node" if isinstance(tree, Node) else "dict"
+    if (shell, kind) not in EMITTERS:
+        try:
+            importlib.import_module("." + shell, __package__)
+        except ImportError:
+            pass
+    try:
+        return EMITTERS[shell, kind]
+    except KeyError:
+        raise ValueError("no emitter for shell " + repr(shell)) from None
+
+
+def iter_code(tree, shell="bash", cache=None):
+    """Yields the code for a tree in the given shell in chunks."""
+    return get_emitter(tree, shell)(cache=cache).iter(tree)
+
+
+def dump(tree, fp, shell="bash", cache=None):
+    """Writes the code for a tree in the given shell to a file object,
+    as the tree is visited.
+    """
+    rtn = get_emitter(tree, shell)(write=fp.write, cache=cache)._visit(tree)
+    if rtn is not None:
+        fp.write(rtn)
+
+
+def dumps(tree, shell="bash", cache=None):
+    """Returns the code for a tree in the given shell as a string."""
+    return get_emitter(tree, shell)(cache=cache).emit(tree)
+
+
+class Reemitter:
+    """Emits the code for a Script node tree again and again as it is
+    modified, regenerating only the top-level statements that have changed
+    since the last time, and splicing them in with the code kept for the
+    rest.
+
+    The tree is tracked in place (see asht.nodes.track()) the first time
+    that it is emitted, so that changes made to it afterwards, through its
+    fields and lists, are seen. Trees that are not Scripts are emitted
+    whole each time.
+
+    Attributes
+    ----------
+    shell : str
+    emitted : int
+        The number of statements that were regenerated by the last call.
+    """
+
+    def __init__(self, shell="bash"):
+        self.shell = shell
+        self.emitted = 0
+        self._tree = None
+        self._code = None
+        # maps the id of each top-level statement to (statement, code)
+        self._stmts = {}
+
+    def emit(self, tree):
+        """Returns the code for a tree as a single string."""
+        if not isinstance(tree, Script):
+            self.emitted = 1
+            return dumps(tree, self.shell)
+        if tree is not self._tree:
+            track(tree)
+            self._tree = tree
+            self._code = None
+            self._stmts = {}
+        elif self._code is not None and not is_dirty(tree):
+            self.emitted = 0
+            return self._code
+        emitter = get_emitter(tree, self.shell)(root=tree)
+        chunks = emitter.chunks
+        old = self._stmts
+        new = {}
+        pieces = []
+        emitted = 0
+        for stmt in tree.body:
+            i = id(stmt)
+            entry = old.get(i)
+            if entry is None or entry[0] is not stmt or is_dirty(stmt):
+                rtn = emitter._visit(stmt)
+                if rtn is not None:
+                    emitter.line(rtn)
+                code = "".join(chunks)
+                chunks.clear()
+                entry = (stmt, code)
+                emitted += 1
+            new[i] = entry
+            pieces.append(entry[1])
+        clean(tree)
+        self._stmts = new
+        self._code = code = "".join(pieces)
+        self.emitted = emitted
+        return code
@@ -1,70 +1,250 @@
-"""Bash tools."""
-from .visitors import DictVisitor, STDIN_DICT, STDOUT_DICT, STDERR_DICT
+"""Fish tools."""
+from .nodes import Node, StdIn, StdOut, StdErr, If, Var, EnvVar
+from .visitors import NodeVisitor, DictVisitor, STDIN_DICT, STDOUT_DICT, STDERR_DICT
+from .emitters import Emitter
 
-class ToFishFromDict(DictVisitor):
-    """Coverts dict tree to Fish code."""
+
+_BOOL_OPS = {"And": " && ", "Or": " || "}
+
+
+class ToFishFromDict(Emitter, DictVisitor):
+    """Converts dict tree to Fish code."""
+
+    shell = "fish"
+    indent = "    "
 
     def visit_Script(self, dct):
-        return "".join(map(self.visit, dct["Script"]["body"]))
+        yield from self._statements(dct["Script"]["body"])
 
     def visit_Comment(self, dct):
-        return "# " + dct["Comment"]["value"] + "\n"
+        self.line("# " + dct["Comment"]["value"])
 
-    def visit_String(Self, dct):
-        s = '"' + "".join(map(self.visit, dct["String"]
+    def visit_String(self, dct):
+        s = '"' + "".join((yield dct["String"]["parts"])) + '"'
+        return s
 
     def visit_RawString(self, dct):
         return dct["RawString"]["value"]
 
     def visit_Var(self, dct):
-        #TODO: Check if fish really refers to things this way
-        return dct["Var"]["name"]
+        return "$" + dct["Var"]["name"]
 
     def visit_EnvVar(self, dct):
-        return dct["EnvVar"]["nam"]
+        return "$" + dct["EnvVar"]["name"]
 
-    def visit_UniversalEnvAssign(self, dct):
-        #TODO: See how this is integrated
-        #universal variables persist over reboots
-        return "set -Ux " + dct["EnvVar"]["name"] 
+    def visit_Command(self, dct):
+        attrs = next(iter(dct.values()))
+        s = " ".join((yield attrs["args"]))
+        if "stderr" in attrs and attrs["stderr"] != STDERR_DICT:
+            s += " 2> " + (yield attrs["stderr"])
+        if "stdout" in attrs and attrs["stdout"] != STDOUT_DICT:
+            s += " > " + (yield attrs["stdout"])
+        if "stdin" in attrs and attrs["stdin"] != STDIN_DICT:
+            s += " < " + (yield attrs["stdin"])
+        if "background" in attrs and attrs["background"]:
+            s += " &"
+        return s
 
-    def visit_GlobalEnvVarAssign(self, dct):
-        #TODO: See how this is integrated in Fish
-        #Global Variabls do not persist over reboots
-        return "set -g -x " + dct["EnvVar"]["name"]
+    def visit_CapturedCommand(self, dct):
+        return "(" + (yield from self.visit_Command(dct)) + ")"
 
-    def visit_ScopedEnvVarAssign(self, dct):
-        #TODO: See how to set this within function
-        return "set -x " + dct["EnvVar"]["name"]
+    def visit_And(self, dct):
+        return (yield from self._chain(dct, _BOOL_OPS))
 
-    def visit_Command(self, dct):
-        #TODO: Research and clarify
-        pass
+    visit_Or = visit_And
 
-    def visit_And(self, dct):
-        # This really isn't and, but a compare in fish.
-        s = self.visit(dct["And"]["lhs"]) + "-a" + self.visit(dct["And"]["rhs"])
-        return s
+    def visit_Not(self, dct):
+        return "not " + (yield dct["Not"]["node"])
 
-    def visit_AndNum(self, dct):
-        # This is also just a hacky, temp solution -- compare Numbers
-        s = self.visit(dct["And"]["lhs"]) + "-eq" + self.visit(dct["And"]["rhs"])
+    def visit_Statement(self, dct):
+        self.line((yield dct["Statement"]["node"]))
 
     def visit_Assign(self, dct):
         attrs = dct["Assign"]
-        return attrs["name"] + "=" + self.visit(attrs["value"]) + "\n"
+        flag = "-l " if attrs.get("scope") == "local" else "-g "
+        self.line("set " + flag + attrs["name"] + " " + (yield attrs["value"]))
 
     def visit_Delete(self, dct):
-        return "set -e " + dct["Delete"]["name"] + "\n"
+        self.line("set -e " + dct["Delete"]["name"])
+
+    def visit_EnvAssign(self, dct):
+        attrs = dct["EnvAssign"]
+        self.line("set -gx " + attrs["name"] + " " + (yield attrs["value"]))
 
     def visit_EnvDelete(self, dct):
-        return "set -e " + dct["EnvDelete"]["name"] + "\n"
+        self.line("set -e " + dct["EnvDelete"]["name"])
+
+    def visit_AliasAssign(self, dct):
+        attrs = dct["AliasAssign"]
+        self.line("alias " + attrs["name"] + "=" + (yield attrs["value"]))
+
+    def visit_AliasDelete(self, dct):
+        self.line("functions -e " + dct["AliasDelete"]["name"])
 
     def visit_Pass(self, dct):
-        pass
+        self.line("true")
 
     def visit_If(self, dct):
-        pass
+        attrs = dct["If"]
+        line = self.line
+        line("if " + (yield attrs["test"]))
+        yield from self._block(attrs["body"])
+        orelse = attrs.get("orelse", None)
+        while orelse and len(orelse) == 1 and next(iter(orelse[0].keys())) == "If":
+            attrs = orelse[0]["If"]
+            line("else if " + (yield attrs["test"]))
+            yield from self._block(attrs["body"])
+            orelse = attrs.get("orelse", None)
+        if orelse:
+            line("else")
+            yield from self._block(orelse)
+        line("end")
+
+    def visit_For(self, dct):
+        attrs = dct["For"]
+        target = attrs["target"]
+        target_type, target_name = next(iter(target.items()))
+        if target_type == "Var":
+            target_assign = target_name["name"]
+        elif target_type == "EnvVar":
+            target_assign = target_name["name"]
+        else:
+            raise ValueError("For loop must assign to a variable name (Var)"
+                             "or environment variable name (EnvVar).")
+        self.line("for " + target_assign + " in " + (yield attrs["iter"]))
+        yield from self._block(attrs["body"])
+        self.line("end")
+
+    def visit_Function(self, dct):
+        self.line("function " + dct["Function"]["name"])
+        yield from self._block(dct["Function"]["body"])
+        self.line("end")
+
+
+class ToFish(Emitter, NodeVisitor):
+    """Converts node tree to Fish code directly, without an intermediate
+    dict tree. The output is identical to that of ToFishFromDict.
+    """
+
+    shell = "fish"
+    indent = "    "
+
+    def visit_Script(self, node):
+        yield from self._statements(node.body)
+
+    def visit_Comment(self, node):
+        self.line("# " + node.value)
+
+    def visit_String(self, node):
+        return '"' + "".join((yield node.parts)) + '"'
+
+    def visit_RawString(self, node):
+        return node.value
+
+    def visit_Var(self, node):
+        return "$" + node.name
+
+    def visit_EnvVar(self, node):
+        return "$" + node.name
+
+    def visit_Command(self, node):
+        s = " ".join((yield node.args))
+        if not isinstance(node.stderr, StdErr):
+            s += " 2> " + (yield node.stderr)
+        if not isinstance(node.stdout, StdOut):
+            s += " > " + (yield node.stdout)
+        if not isinstance(node.stdin, StdIn):
+            s += " < " + (yield node.stdin)
+        if node.background:
+            s += " &"
+        return s
 
-    def visit_For(self, dict):
-        pass
+    def visit_CapturedCommand(self, node):
+        return "(" + (yield from self.visit_Command(node)) + ")"
+
+    def visit_And(self, node):
+        return (yield from self._chain(node, _BOOL_OPS))
+
+    visit_Or = visit_And
+
+    def visit_Not(self, node):
+        return "not " + (yield node.node)
+
+    def visit_Statement(self, node):
+        self.line((yield node.node))
+
+    def visit_Assign(self, node):
+        flag = "-l " if getattr(node, "scope", None) == "local" else "-g "
+        self.line("set " + flag + node.name + " " + (yield node.value))
+
+    def visit_Delete(self, node):
+        self.line("set -e " + node.name)
+
+    def visit_EnvAssign(self, node):
+        self.line("set -gx " + node.name + " " + (yield node.value))
+
+    def visit_EnvDelete(self, node):
+        self.line("set -e " + node.name)
+
+    def visit_AliasAssign(self, node):
+        self.line("alias " + node.name + "=" + (yield node.value))
+
+    def visit_AliasDelete(self, node):
+        self.line("functions -e " + node.name)
+
+    def visit_Pass(self, node):
+        self.line("true")
+
+    def visit_If(self, node):
+        line = self.line
+        line("if " + (yield node.test))
+        yield from self._block(node.body)
+        orelse = node.orelse
+        while orelse and len(orelse) == 1 and isinstance(orelse[0], If):
+            node = orelse[0]
+            line("else if " + (yield node.test))
+            yield from self._block(node.body)
+            orelse = node.orelse
+        if orelse:
+            line("else")
+            yield from self._block(orelse)
+        line("end")
+
+    def visit_For(self, node):
+        target = node.target
+        if isinstance(target, Var):
+            target_assign = target.name
+        elif isinstance(target, EnvVar):
+            target_assign = target.name
+        else:
+            raise ValueError("For loop must assign to a variable name (Var)"
+                             "or environment variable name (EnvVar).")
+        self.line("for " + target_assign + " in " + (yield node.iter))
+        yield from self._block(node.body)
+        self.line("end")
+
+    def visit_Function(self, node):
+        self.line("function " + node.name)
+        yield from self._block(node.body)
+        self.line("end")
+
+
+def tofish(tree, cache=None):
+    """Converts a tree to Fish. Node trees may be given an EmitCache."""
+    if isinstance(tree, Node):
+        visitor = ToFish(cache=cache)
+    else:
+        visitor = ToFishFromDict(cache=cache)
+    return visitor.emit(tree)
+
+
+def iter_fish(tree, cache=None):
+    """Yields Fish code for a tree in chunks, one per top-level statement.
+    The tree may be a Script whose body is a generator. Node trees may be
+    given an EmitCache.
+    """
+    if isinstance(tree, Node):
+        visitor = ToFish(cache=cache)
+    else:
+        visitor = ToFishFromDict(cache=cache)
+    return visitor.iter(tree)
@@ -0,0 +1,353 @@
+"""Flat, array-backed representation of node trees"""
+from array import array
+from bisect import bisect_left
+
+from . import nodes
+from .visitors import DictToNode, NodeToDict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# values of the attribute table for fields that hold nodes rather than values
+NODE = -1
+LIST = -2
+
+
+class FlatTree:
+    """A node tree stored as a struct of arrays, rather than as an object
+    per node, for analysis of very large trees or corpora of scripts.
+
+    The nodes are numbered in pre-order, so that the root is node 0, every
+    node comes after its parent, and the nodes of each subtree are
+    contiguous. The fields of the nodes are kept in an attribute table with
+    a row per field that is set, in order of node. Node classes, field
+    names, and field values are kept once each, in tables, and are referred
+    to by index.
+
+    The arrays are array.array objects. When NumPy is available, the
+    queries view them as NumPy arrays, without copying, and run vectorized.
+
+    Attributes
+    ----------
+    kinds : array of H
+        The index of the class name of each node in kind_names.
+    parents : array of i
+        The index of the parent of each node, or -1 for the root.
+    first_child : array of i
+        The index of the first child of each node, or -1 if it has none.
+    next_sibling : array of i
+        The index of the next node with the same parent, or -1 if none.
+    slots : array of H
+        The index in field_names of the field of the parent that holds
+        each node.
+    linenos, columns : array of I
+        The line and column numbers of each node.
+    attr_nodes : array of i
+        The node of each row of the attribute table.
+    attr_fields : array of H
+        The index in field_names of the field of each row.
+    attr_values : array of i
+        The index in values of the value of each row, or NODE or LIST if the
+        field holds a child node or a list of them.
+    kind_names : list of str
+    field_names : list of str
+    values : list
+        The distinct values of fields, which are mostly strings.
+    """
+
+    def __init__(self, numpy=None):
+        self.kinds = array("H")
+        self.parents = array("i")
+        self.first_child = array("i")
+        self.next_sibling = array("i")
+        self.slots = array("H")
+        self.linenos = array("I")
+        self.columns = array("I")
+        self.attr_nodes = array("i")
+        self.attr_fields = array("H")
+        self.attr_values = array("i")
+        self.kind_names = []
+        self.field_names = []
+        self.values = []
+        self._kind_index = {}
+        self._field_index = {}
+        self._value_index = {}
+        self._ends = None
+        self.numpy = np is not None if numpy is None else numpy
+        if self.numpy and np is None:
+            raise ImportError("NumPy is not available")
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def _index(self, table, index, key, val):
+        i = index.get(key)
+        if i is None:
+            i = index[key] = len(table)
+            table.append(val)
+        return i
+
+    def _kind(self, name):
+        return self._index(self.kind_names, self._kind_index, name, name)
+
+    def _field(self, name):
+        return self._index(self.field_names, self._field_index, name, name)
+
+    def _value(self, val):
+        # keyed by type as well, so that True and 1 are kept apart
+        key = val if val.__class__ is str else (type(val), val)
+        return self._index(self.values, self._value_index, key, val)
+
+    @classmethod
+    def from_node(cls, tree, numpy=None):
+        """Flattens a node tree, or a dict tree.
+
+        Parameters
+        ----------
+        tree : Node or dict
+        numpy : bool or None
+            Whether to run queries with NumPy. Defaults to whether it is
+            available.
+
+        Returns
+        -------
+        flat : FlatTree
+        """
+        if not isinstance(tree, nodes.Node):
+            tree = DictToNode().visit(tree)
+        self = cls(numpy=numpy)
+        kinds = self.kinds
+        parents = self.parents
+        first_child = self.first_child
+        next_sibling = self.next_sibling
+        slots = self.slots
+        linenos = self.linenos
+        columns = self.columns
+        attr_nodes = self.attr_nodes
+        attr_fields = self.attr_fields
+        attr_values = self.attr_values
+        kind = self._kind
+        field = self._field
+        value = self._value
+        # the index of the last child added to each node, to link siblings
+        last_child = []
+        stack = [(tree, -1, 0)]
+        push = stack.append
+        pop = stack.pop
+        while stack:
+            node, parent, slot = pop()
+            i = len(kinds)
+            name = node.__class__.__name__
+            kinds.append(kind(name))
+            parents.append(parent)
+            first_child.append(-1)
+            next_sibling.append(-1)
+            slots.append(slot)
+            linenos.append(node.lineno)
+            columns.append(node.column)
+            last_child.append(-1)
+            if parent >= 0:
+                prev = last_child[parent]
+                if prev < 0:
+                    first_child[parent] = i
+                else:
+                    next_sibling[prev] = i
+                last_child[parent] = i
+            children = []
+            for f in node.fields:
+                val = getattr(node, f, nodes._MISSING)
+                if val is nodes._MISSING:
+                    continue
+                fi = field(f)
+                attr_nodes.append(i)
+                attr_fields.append(fi)
+                if isinstance(val, nodes.Node):
+                    attr_values.append(NODE)
+                    children.append((val, i, fi))
+                elif isinstance(val, (list, tuple)):
+                    attr_values.append(LIST)
+                    children.extend((x, i, fi) for x in val)
+                else:
+                    attr_values.append(value(val))
+            children.reverse()
+            stack.extend(children)
+        self._value_index = None
+        return self
+
+    @classmethod
+    def from_dict(cls, tree, numpy=None):
+        """Flattens a dict tree."""
+        return cls.from_node(DictToNode().visit(tree), numpy=numpy)
+
+    def to_node(self):
+        """Rebuilds the node tree.
+
+        Returns
+        -------
+        tree : Node
+        """
+        n = len(self.kinds)
+        if not n:
+            return None
+        kind_names = self.kind_names
+        field_names = self.field_names
+        values = self.values
+        parents = self.parents
+        slots = self.slots
+        attr_nodes = self.attr_nodes
+        attr_fields = self.attr_fields
+        attr_values = self.attr_values
+        nattrs = len(attr_nodes)
+        classes = [getattr(nodes, name) for name in kind_names]
+        # the fields of each node, filled in before the node is built
+        kwargs = [None] * n
+        built = [None] * n
+        row = 0
+        for i in range(n):
+            kw = kwargs[i] = {}
+            while row < nattrs and attr_nodes[row] == i:
+                v = attr_values[row]
+                if v == LIST:
+                    kw[field_names[attr_fields[row]]] = []
+                elif v != NODE:
+                    kw[field_names[attr_fields[row]]] = values[v]
+                row += 1
+        # children come after their parents, so build from the last node
+        # back, then put each node into its parent, in reverse
+        kinds = self.kinds
+        linenos = self.linenos
+        columns = self.columns
+        for i in range(n - 1, -1, -1):
+            kw = kwargs[i]
+            for name, val in kw.items():
+                if val.__class__ is list:
+                    val.reverse()
+            node = built[i] = classes[kinds[i]](
+                lineno=linenos[i], column=columns[i], **kw)
+            p = parents[i]
+            if p >= 0:
+                name = field_names[slots[i]]
+                pkw = kwargs[p]
+                val = pkw.get(name)
+                if val.__class__ is list:
+                    val.append(node)
+                else:
+                    pkw[name] = node
+        return built[0]
+
+    def to_dict(self):
+        """Rebuilds the tree as a dict tree."""
+        return NodeToDict().visit(self.to_node())
+
+    #
+    # Queries
+    #
+
+    def _array(self, name):
+        a = getattr(self, name)
+        return np.frombuffer(a, dtype=a.typecode) if len(a) else np.zeros(0, a.typecode)
+
+    def ends(self):
+        """Returns an array of the index just past the last node of the
+        subtree of each node, so that the subtree of node i is the range
+        from i to ends[i]."""
+        if self._ends is None:
+            n = len(self.kinds)
+            ends = array("i", range(1, n + 1))
+            parents = self.parents
+            for i in range(n - 1, 0, -1):
+                p = parents[i]
+                if ends[i] > ends[p]:
+                    ends[p] = ends[i]
+            self._ends = ends
+        return self._ends
+
+    def find(self, kind):
+        """Returns the indices of the nodes of a class, in order.
+
+        Parameters
+        ----------
+        kind : str
+            The name of the node class.
+
+        Returns
+        -------
+        indices : array of i, or a NumPy array if numpy is set
+        """
+        code = self._kind_index.get(kind)
+        if self.numpy:
+            if code is None:
+                return np.zeros(0, "q")
+            return np.flatnonzero(self._array("kinds") == code)
+        if code is None:
+            return array("i")
+        return array("i", [i for i, k in enumerate(self.kinds) if k == code])
+
+    def attr(self, kind, field):
+        """Returns the values of a field of all of the nodes of a class
+        that have it set, in order, such as the names of all of the
+        EnvAssign nodes.
+
+        Parameters
+        ----------
+        kind : str
+            The name of the node class.
+        field : str
+            The name of a field that holds a value, rather than nodes.
+
+        Returns
+        -------
+        values : list
+        """
+        code = self._kind_index.get(kind)
+        fcode = self._field_index.get(field)
+        if code is None or fcode is None:
+            return []
+        values = self.values
+        if self.numpy:
+            attr_nodes = self._array("attr_nodes")
+            mask = self._array("attr_fields") == fcode
+            mask &= self._array("kinds")[attr_nodes] == code
+            ids = self._array("attr_values")[mask]
+            if len(ids) and ids.min() < 0:
+                raise ValueError(kind + "." + field + " holds nodes")
+            return [values[i] for i in ids.tolist()]
+        kinds = self.kinds
+        rtn = []
+        for i, f, v in zip(self.attr_nodes, self.attr_fields, self.attr_values):
+            if f == fcode and kinds[i] == code:
+                if v < 0:
+                    raise ValueError(kind + "." + field + " holds nodes")
+                rtn.append(values[v])
+        return rtn
+
+    def count_within(self, kind, ancestor):
+        """Counts the nodes of a class within each node of another class,
+        such as the number of Command nodes in each Function. Nodes that
+        are within nested ancestors are counted for each of them.
+
+        Parameters
+        ----------
+        kind : str
+            The name of the class of the nodes to count.
+        ancestor : str
+            The name of the class of the nodes to count within.
+
+        Returns
+        -------
+        counts : dict
+            Maps the index of each ancestor node to its count.
+        """
+        outer = self.find(ancestor)
+        inner = self.find(kind)
+        ends = self.ends()
+        if self.numpy:
+            ends = np.frombuffer(ends, dtype="i") if len(ends) else np.zeros(0, "i")
+            lo = np.searchsorted(inner, outer, side="right")
+            hi = np.searchsorted(inner, ends[outer], side="left")
+            return dict(zip(outer.tolist(), (hi - lo).tolist()))
+        return {i: bisect_left(inner, ends[i]) - bisect_left(inner, i + 1)
+                for i in outer}
@@ -0,0 +1,262 @@
+"""Incremental loading of node trees from JSON"""
+import codecs
+import re
+from json.decoder import scanstring
+from json.scanner import NUMBER_RE
+
+from . import nodes
+from .visitors import DictToNode, _first_key
+
+
+CHUNKSIZE = 1 << 16
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# the characters of a string up to its closing quote, or to the end of the
+# text if it is incomplete, never stopping between a backslash and the
+# character that it escapes
+_STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+_LITERALS = {"t": ("true", True), "f": ("false", False), "n": ("null", None)}
+
+# parser states, for what may come next
+_VALUE, _VALUE_OR_END, _KEY, _KEY_OR_END, _COLON, _COMMA_OR_END, _DONE = range(7)
+
+# frame kinds: a node dict like {"Var": {...}}, the dict of its fields, a
+# list, and a list whose elements are yielded rather than kept
+_NODE, _FIELDS, _LIST, _STREAM = range(4)
+
+
+class _NodeBuilder(DictToNode):
+    """Builds a node from a dict tree whose children are already nodes."""
+
+    @staticmethod
+    def _kind_of(tree):
+        return "node" if isinstance(tree, nodes.Node) else _first_key(tree)
+
+    def visit_node(self, node):
+        return node
+
+
+def _error(msg, offset):
+    return ValueError(msg + " at character " + str(offset))
+
+
+def _string(buf, pos, start, eof):
+    """Decodes the string whose opening quote is at pos, searching for its
+    closing quote from start. Returns the string and the index after it,
+    or None and the index to search from once more text has been read.
+    """
+    end = _STRING_BODY.match(buf, start).end()
+    if eof or (end < len(buf) and buf[end] == '"'):
+        return scanstring(buf, pos + 1, True)
+    return None, end
+
+
+def _parse(fp, chunksize, stream):
+    """Generator that parses a JSON tree from a file object, building each
+    node as soon as its closing brace is read. If stream is true, the
+    statements of the body of a top-level Script are yielded, rather than
+    kept. Returns the tree.
+    """
+    read = fp.read
+    decoder = None
+    build = _NodeBuilder().visit
+    ws = _WHITESPACE.match
+    number = NUMBER_RE.match
+    buf = ""
+    pos = 0
+    # the offset of buf in the whole text, for error messages
+    base = 0
+    eof = False
+    more = False
+    # how far past pos an incomplete string at pos has been searched, so
+    # that a long string spanning many chunks is only searched once
+    scan = 1
+    stack = []
+    state = _VALUE
+    root = None
+    while True:
+        if more:
+            # the token at pos is incomplete, so read on
+            more = False
+            if eof:
+                raise _error("unexpected end of JSON", base + pos)
+            # a long token is read in chunks as large as its buffered part,
+            # so that it is not copied into buf once for every chunk
+            chunk = read(max(chunksize, len(buf) - pos))
+            if not chunk:
+                eof = True
+            if chunk.__class__ is bytes:
+                # a chunk may end partway through a character
+                if decoder is None:
+                    decoder = codecs.getincrementaldecoder("utf-8")()
+                chunk = decoder.decode(chunk, final=eof)
+            base += pos
+            buf = buf[pos:] + chunk
+            pos = 0
+        pos = ws(buf, pos).end()
+        if pos == len(buf):
+            if eof:
+                break
+            more = True
+            continue
+        c = buf[pos]
+        if state == _COMMA_OR_END:
+            top = stack[-1]
+            if c == ",":
+                pos += 1
+                state = _VALUE if top[0] >= _LIST else _KEY
+                continue
+            if c == "]" and top[0] >= _LIST:
+                pos += 1
+                stack.pop()
+                value = top[1]
+            elif c == "}" and top[0] < _LIST:
+                pos += 1
+                stack.pop()
+                value = top[1]
+                if top[0] == _NODE:
+                    if len(value) != 1:
+                        raise _error("node dict must have one key", base + pos)
+                    value = build(value)
+            else:
+                raise _error("expected ',' or end of container", base + pos)
+        elif state == _KEY or state == _KEY_OR_END:
+            if c == '"':
+                key, end = _string(buf, pos, pos + scan, eof)
+                if key is None:
+                    scan = end - pos
+                    more = True
+                    continue
+                pos = end
+                scan = 1
+                stack[-1][2] = key
+                state = _COLON
+                continue
+            if c == "}" and state == _KEY_OR_END:
+                pos += 1
+                top = stack.pop()
+                value = top[1]
+                if top[0] == _NODE:
+                    raise _error("node dict must have one key", base + pos)
+            else:
+                raise _error("expected a key", base + pos)
+        elif state == _COLON:
+            if c != ":":
+                raise _error("expected ':'", base + pos)
+            pos += 1
+            state = _VALUE
+            continue
+        elif state == _DONE:
+            raise _error("extra data", base + pos)
+        elif c == "{":
+            pos += 1
+            # the value of a node dict is the dict of its fields
+            kind = _FIELDS if stack and stack[-1][0] == _NODE else _NODE
+            stack.append([kind, {}, None])
+            state = _KEY_OR_END
+            continue
+        elif c == "[":
+            pos += 1
+            kind = _LIST
+            if (stream and len(stack) == 2 and stack[1][2] == "body"
+                    and stack[0][2] == "Script"):
+                kind = _STREAM
+            stack.append([kind, [], None])
+            state = _VALUE_OR_END
+            continue
+        elif c == "]" and state == _VALUE_OR_END:
+            pos += 1
+            value = stack.pop()[1]
+        elif c == '"':
+            value, end = _string(buf, pos, pos + scan, eof)
+            if value is None:
+                scan = end - pos
+                more = True
+                continue
+            pos = end
+            scan = 1
+        elif c in _LITERALS:
+            word, value = _LITERALS[c]
+            if len(buf) - pos < len(word) and not eof:
+                more = True
+                continue
+            if not buf.startswith(word, pos):
+                raise _error("invalid literal", base + pos)
+            pos += len(word)
+        else:
+            m = number(buf, pos)
+            if m is None:
+                raise _error("unexpected character " + repr(c), base + pos)
+            if m.end() == len(buf) and not eof:
+                more = True
+                continue
+            integer, frac, exp = m.groups()
+            if frac or exp:
+                value = float(integer + (frac or "") + (exp or ""))
+            else:
+                value = int(integer)
+            pos = m.end()
+        # a value is complete
+        if not stack:
+            root = value
+            state = _DONE
+            continue
+        top = stack[-1]
+        kind = top[0]
+        if kind == _STREAM:
+            yield value
+        elif kind == _LIST:
+            top[1].append(value)
+        else:
+            top[1][top[2]] = value
+        state = _COMMA_OR_END
+    if state != _DONE:
+        raise _error("unexpected end of JSON", base + pos)
+    return root
+
+
+def load(fp, chunksize=CHUNKSIZE):
+    """Loads a node tree from a JSON file, which is read in chunks. Each
+    node is built as soon as it has been read, so the JSON text and the
+    dicts of the whole tree are never in memory at once.
+
+    Parameters
+    ----------
+    fp : file-like
+        An object with a read() method, in text or binary mode.
+    chunksize : int
+        The number of characters, or bytes, to read at a time, or the
+        least number while a long string or number is being read.
+
+    Returns
+    -------
+    tree : Node
+    """
+    gen = _parse(fp, chunksize, False)
+    try:
+        next(gen)
+    except StopIteration as stop:
+        return stop.value
+
+
+def iter_statements(fp, chunksize=CHUNKSIZE):
+    """Iterates over the statements of the body of a Script in a JSON file,
+    yielding each as soon as it has been read and not keeping it, so that
+    the memory used is bounded by the largest statement rather than the
+    whole script. A tree that is not a Script is yielded whole.
+
+    Parameters
+    ----------
+    fp : file-like
+        An object with a read() method, in text or binary mode.
+    chunksize : int
+        The number of characters, or bytes, to read at a time, or the
+        least number while a long string or number is being read.
+
+    Yields
+    ------
+    node : Node
+    """
+    root = yield from _parse(fp, chunksize, True)
+    if not isinstance(root, nodes.Script):
+        yield root
@@ -1,45 +1,731 @@
 """Abstract syntax tree nodes for a generic shell"""
+import copy
+import copyreg
+import weakref
 
 LINE_COL = frozenset(["lineno", "column"])
 
-class Node:
+
+_MISSING = object()
+
+
+def _unknown_attrs(node, extra):
+    raise RuntimeError(
+        "unknown attributes of node " +
+        node.__class__.__name__ + ": " + repr(set(extra))
+    )
+
+
+def _make_init(cls):
+    """Generates an __init__() specialized to a node class, which takes the
+    fields of the class positionally or by keyword, then lineno and column
+    by keyword. Fields that have no default and are not given are left
+    unset. The __init__() of a frozen node class also converts lists to
+    tuples and computes the structural hash of the node.
+    """
+    defaults = cls._defaults
+    frozen = cls._frozen
+    params = ["_self"]
+    body = []
+    ns = {
+        "_MISSING": _MISSING,
+        "_unknown_attrs": _unknown_attrs,
+        "_setattr": object.__setattr__,
+        "_name": cls.__name__,
+    }
+    for field in cls.fields + ("lineno", "column"):
+        if field == "lineno":
+            params.append("*")
+        if field in defaults:
+            ns["_d_" + field] = defaults[field]
+            params.append(field + "=_d_" + field)
+            indent = "    "
+        else:
+            params.append(field + "=_MISSING")
+            body.append("    if " + field + " is not _MISSING:")
+            indent = "        "
+        if frozen:
+            if field in cls.fields:
+                body.append(indent + "if " + field + ".__class__ is list:")
+                body.append(indent + "    " + field + " = tuple(" + field + ")")
+            body.append(indent + "_setattr(_self, " + repr(field) + ", " + field + ")")
+        else:
+            body.append(indent + "_self." + field + " = " + field)
+    params.append("**_extra")
+    body.append("    if _extra:")
+    body.append("        _unknown_attrs(_self, _extra)")
+    if frozen:
+        body.append("    _setattr(_self, '_hash', hash((_name, " +
+                    "".join(field + ", " for field in cls.fields) + ")))")
+    src = "def __init__(" + ", ".join(params) + "):\n" + "\n".join(body) + "\n"
+    exec(src, ns)
+    init = ns["__init__"]
+    init.__qualname__ = cls.__qualname__ + ".__init__"
+    init.__module__ = cls.__module__
+    init._generated = True
+    return init
+
+
+def _eager_class(node):
+    """Returns the class of a node or, for a lazy or tracked node, the class
+    of the plain node that it stands for.
+    """
+    cls = node.__class__
+    return getattr(cls, "_eager", None) or cls
+
+
+def _reduce(node):
+    """Generic __reduce__() for nodes, which passes the fields positionally
+    when it can, and leaves off trailing ones that are unset or are the
+    defaults. Nodes of classes with their own __init__() are pickled by
+    their slots instead.
+    """
+    cls = _eager_class(node)
+    if not getattr(cls.__init__, "_generated", False):
+        state = {}
+        for klass in cls.__mro__:
+            for name in klass.__dict__.get("__slots__", ()):
+                if name != "__weakref__" and hasattr(node, name):
+                    state[name] = getattr(node, name)
+        return (copyreg.__newobj__, (cls,), (None, state))
+    fields = node.fields
+    defaults = node._defaults
+    args = [getattr(node, field, _MISSING) for field in fields]
+    while args and args[-1] is defaults.get(fields[len(args) - 1], _MISSING):
+        args.pop()
+    kwargs = None
+    if any(arg is _MISSING for arg in args):
+        kwargs = {f: v for f, v in zip(fields, args) if v is not _MISSING}
+        args = []
+    if node.lineno != 1 or node.column != 1:
+        kwargs = kwargs or {}
+        kwargs["lineno"] = node.lineno
+        kwargs["column"] = node.column
+    if kwargs is None and not node._frozen:
+        return (cls, tuple(args))
+    if node._frozen:
+        cls = node._thawed
+    return (_reduced_node, (cls, node._frozen, tuple(args), kwargs))
+
+
+def _reduced_node(cls, is_frozen, args, kwargs):
+    """Creates a node from the values given by __reduce__()."""
+    if is_frozen:
+        cls = frozen(cls)
+    return cls(*args, **(kwargs or {}))
+
+
+def _make_reduce(cls):
+    """Generates a __reduce__() specialized to a node class, which gives
+    the same result as _reduce() for nodes whose fields are all set and
+    that are at the default line and column, and falls back to _reduce()
+    otherwise.
+    """
+    fields = cls.fields
+    defaults = cls._defaults
+    names = ["_f" + str(i) for i in range(len(fields))]
+    ns = {"_reduce": _reduce, "_reduced_node": _reduced_node, "_cls": cls}
+    if cls._frozen:
+        ns["_thawed"] = cls._thawed
+        ret = "(_reduced_node, (_thawed, True, ({}), None))"
+    else:
+        ret = "(_cls, ({}))"
+    body = [
+        "def __reduce__(_self):",
+        "    if _self.lineno != 1 or _self.column != 1:",
+        "        return _reduce(_self)",
+    ]
+    if fields:
+        body.append("    try:")
+        body += ["        {} = _self.{}".format(n, f) for n, f in zip(names, fields)]
+        body += ["    except AttributeError:", "        return _reduce(_self)"]
+    for i in reversed(range(len(fields))):
+        args = "".join(n + ", " for n in names[:i + 1])
+        if fields[i] not in defaults:
+            body.append("    return " + ret.format(args))
+            break
+        ns["_d" + str(i)] = defaults[fields[i]]
+        body.append("    if {} is not _d{}:".format(names[i], i))
+        body.append("        return " + ret.format(args))
+    else:
+        body.append("    return " + ret.format(""))
+    exec("\n".join(body) + "\n", ns)
+    reduce = ns["__reduce__"]
+    reduce.__qualname__ = cls.__qualname__ + ".__reduce__"
+    reduce.__module__ = cls.__module__
+    return reduce
+
+
+class NodeMeta(type):
+    """Metaclass for nodes.
+
+    The attrs of a node class may be declared as a tuple or list, which
+    gives the order of its fields, or as a set, in which case the fields
+    inherited from the base classes come first and the rest are sorted.
+    Either way, attrs is normalized to a frozenset and the order is kept
+    in the fields tuple.
+
+    Each node class gets __slots__ for the fields that are not already
+    slotted by a base class. Class level defaults for those fields (such
+    as Command.stdin) would conflict with the slots, so they are moved into
+    the _defaults mapping, along with the defaults inherited from base
+    classes. Classes that define __slots__ themselves are not given any.
+
+    Unless a node class, or a base class, defines its own __init__(), the
+    class is given an __init__() generated for its fields. This accepts
+    the fields positionally or by keyword, and lineno and column by keyword,
+    and raises a RuntimeError for unknown attributes.
+    """
+
+    def __new__(mcls, name, bases, namespace, **kwargs):
+        root = not any(isinstance(base, NodeMeta) for base in bases)
+        defaults = {}
+        base_fields = ()
+        for base in reversed(bases):
+            defaults.update(getattr(base, "_defaults", {}))
+        for base in bases:
+            if isinstance(base, NodeMeta):
+                base_fields = base.fields
+                break
+        attrs = namespace.get("attrs")
+        if attrs is None:
+            fields = base_fields
+        elif isinstance(attrs, (tuple, list)):
+            fields = tuple(attrs)
+        else:
+            fields = tuple(x for x in base_fields if x in attrs)
+            fields += tuple(sorted(attrs - set(fields)))
+        namespace["attrs"] = frozenset(fields)
+        namespace["fields"] = fields
+        slotted = set()
+        for base in bases:
+            for klass in base.__mro__:
+                slotted.update(klass.__dict__.get("__slots__", ()))
+        own = fields + ("lineno", "column") if root else fields
+        for field in own:
+            if field in namespace:
+                defaults[field] = namespace.pop(field)
+        if "__slots__" not in namespace:
+            namespace["__slots__"] = tuple(x for x in own if x not in slotted)
+        namespace["_defaults"] = defaults
+        cls = super().__new__(mcls, name, bases, namespace, **kwargs)
+        if "__init__" not in namespace and (
+                root or getattr(cls.__init__, "_generated", False)):
+            cls.__init__ = _make_init(cls)
+            if "__reduce__" not in namespace:
+                cls.__reduce__ = _make_reduce(cls)
+        elif "__reduce__" not in namespace:
+            cls.__reduce__ = _reduce
+        return cls
+
+
+class Node(metaclass=NodeMeta):
     """Top-level node class"""
 
-    # maps attribute names to default value generators
-    attrs = frozenset()
+    # the names of the fields, in order
+    attrs = ()
     lineno = 1
     column = 1
-
-    def __init__(self, **kwargs):
-        for key, value in kwargs.items():
-            if key in self.attrs:
-                setattr(self, key, value)
-        if "lineno" in kwargs:
-            self.lineno = kwargs["lineno"]
-        if "column" in kwargs:
-            self.column = kwargs["column"]
-        if (set(kwargs.items()) - self.attrs) - LINE_COL:
-            extra = (set(kwargs.items()) - self.attrs) - LINE_COL
-            raise RuntimeError(
-                "unknown attributes of node " +
-                self.__class__.__name__ + ": " + repr(extra)
-            )
+    _frozen = False
+    _lazy = False
+    _tracked = False
+    # the class of the plain nodes that the nodes of a variant class, such as
+    # a lazy or tracked class, stand for
+    _eager = None
 
     def __eq__(self, other):
-        if type(self) is not type(other):
-            return False
-        for attr in self.attrs:
-            if getattr(self, attr) != getattr(other, attr):
+        # compare with an explicit stack, so that deep trees may be compared
+        stack = [(self, other)]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            x, y = pop()
+            if x is y:
+                continue
+            if type(x) is not type(y):
+                # lazy and tracked nodes compare equal to the plain nodes
+                # that they stand for
+                if _eager_class(x) is not _eager_class(y):
+                    return False
+            if x._frozen and x._hash != y._hash:
                 return False
+            for attr in x.attrs:
+                a = getattr(x, attr)
+                b = getattr(y, attr)
+                if isinstance(a, Node):
+                    push((a, b))
+                elif isinstance(a, (list, tuple)):
+                    if type(a) is not type(b) and not (
+                            isinstance(a, list) and isinstance(b, list)):
+                        return False
+                    if len(a) != len(b):
+                        return False
+                    for pair in zip(a, b):
+                        if isinstance(pair[0], Node):
+                            push(pair)
+                        elif pair[0] != pair[1]:
+                            return False
+                elif a != b:
+                    return False
         return True
 
     def __ne__(self, other):
         return not (self == other)
 
+    def __repr__(self):
+        """Returns the node on one line, leaving out what is beyond a few
+        hundred characters, so that the reprs of giant trees are quick."""
+        from .pretty import pformat_bounded
+
+        return pformat_bounded(self, indent=None, max_depth=6, max_items=10, max_chars=500)
+
     def __str__(self):
-        from .pretty import pformat_node
+        """Returns the node pretty formatted, leaving out what is beyond a
+        few thousand characters. Use asht.pretty.pformat() for all of it."""
+        from .pretty import pformat_bounded
+
+        return pformat_bounded(self)
+
+
+class FrozenNode(Node):
+    """Base class of the frozen variants of node classes, which are created
+    with frozen(). Frozen nodes may not be modified after they are created.
+    Their list fields are stored as tuples, and their structural hash is
+    computed once, when they are created. The line and column numbers are
+    not part of the hash, as they are not compared by ==. Frozen nodes only
+    compare equal to frozen nodes, and trees with different hashes are
+    unequal without being traversed.
+    """
+
+    _frozen = True
+    # the mutable node class that a frozen node class is a variant of
+    _thawed = Node
+
+    def __setattr__(self, name, value):
+        raise AttributeError(
+            "cannot assign to " + name + " of frozen node " +
+            self.__class__.__name__
+        )
+
+    def __delattr__(self, name):
+        raise AttributeError(
+            "cannot delete " + name + " of frozen node " +
+            self.__class__.__name__
+        )
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, FrozenNode) or self._hash != other._hash:
+            return False
+        return Node.__eq__(self, other)
 
-        return pformat_node(self)
+
+_FROZEN_CLASSES = {}
+
+
+def _freeze_small(node):
+    """Freezes a small node tree, such as a default value, recursively."""
+    args = []
+    for field in node.fields:
+        val = getattr(node, field, _MISSING)
+        if isinstance(val, Node):
+            val = _freeze_small(val)
+        elif isinstance(val, (list, tuple)):
+            val = [_freeze_small(x) if isinstance(x, Node) else x for x in val]
+        args.append(val)
+    return frozen(node.__class__)(*args, lineno=node.lineno, column=node.column)
+
+
+def frozen(cls):
+    """Returns the frozen variant of a node class. This is a subclass that
+    has the same name, so that visitors dispatch on it in the same way.
+    """
+    if cls._frozen:
+        return cls
+    cls = cls._eager or cls
+    try:
+        return _FROZEN_CLASSES[cls]
+    except KeyError:
+        pass
+    namespace = {
+        "__slots__": ("_hash", "__weakref__"),
+        "attrs": cls.fields,
+        "__module__": cls.__module__,
+        "__qualname__": "frozen(" + cls.__qualname__ + ")",
+        "__doc__": cls.__doc__,
+        "_thawed": cls,
+    }
+    for field, value in cls._defaults.items():
+        if isinstance(value, Node):
+            namespace[field] = _freeze_small(value)
+    frozen_cls = NodeMeta(cls.__name__, (FrozenNode, cls), namespace)
+    _FROZEN_CLASSES[cls] = frozen_cls
+    return frozen_cls
+
+
+class Interner:
+    """Factory for frozen nodes that shares structurally identical nodes,
+    through a table that holds them by weak reference. A node is shared
+    only if it also has the same line and column numbers. The table is
+    keyed by hash, so in the rare case that two different nodes collide,
+    the later one is simply not shared.
+
+    Parameters
+    ----------
+    table : mapping or None
+        Mapping from hashes to nodes. A new weakref.WeakValueDictionary is
+        used if not given.
+    """
+
+    def __init__(self, table=None):
+        self.table = weakref.WeakValueDictionary() if table is None else table
+
+    def __len__(self):
+        return len(self.table)
+
+    def __call__(self, cls, *args, **kwargs):
+        """Creates a frozen node of a node class, or returns the interned
+        node that is identical to it.
+        """
+        return self.intern(frozen(cls)(*args, **kwargs))
+
+    def intern(self, node):
+        """Returns the interned node that is identical to a frozen node,
+        interning the node itself if there is none. The children of the
+        node should already be interned, so that they are compared by
+        identity.
+        """
+        key = hash((node._hash, node.lineno, node.column))
+        other = self.table.setdefault(key, node)
+        if other is node:
+            return node
+        if (other.__class__ is not node.__class__ or
+                other.lineno != node.lineno or other.column != node.column):
+            return node
+        for field in node.fields:
+            a = getattr(other, field, _MISSING)
+            b = getattr(node, field, _MISSING)
+            if a is not b and a != b:
+                return node
+        return other
+
+    def freeze(self, tree):
+        """Converts a node tree into an interned, frozen node tree."""
+        from .visitors import NodeToFrozen
+
+        return NodeToFrozen(interner=self).visit(tree)
+
+
+#
+# Modification tracking
+#
+
+# Maps the ids of tracked nodes to the id of their parent, None for roots,
+# or a tuple of ids for nodes with several parents, since subtrees may be
+# shared. The ids of the tracked nodes that have been modified since they
+# were last cleaned are kept in _DIRTY. Ids are kept rather than nodes, so
+# that tracked trees are still freed, and the entries of nodes are removed
+# when they are untracked or freed, so that they are not confused with new
+# nodes that get the same ids. The ids of parents that have since been freed
+# are left with their children, which at worst marks an unrelated node as
+# modified, should one get the same id.
+_PARENTS = {}
+_DIRTY = set()
+
+
+def _forget(i):
+    """Removes the entries of the tracked node with id i."""
+    _PARENTS.pop(i, None)
+    _DIRTY.discard(i)
+
+
+def _touch(node):
+    """Marks a tracked node, and its ancestors along every path, as
+    modified. The ancestors of a modified node are always modified too, so
+    this stops at those that already are.
+    """
+    parents = _PARENTS
+    dirty = _DIRTY
+    stack = [id(node)]
+    pop = stack.pop
+    while stack:
+        i = pop()
+        if i in dirty or i not in parents:
+            continue
+        dirty.add(i)
+        up = parents[i]
+        if up.__class__ is tuple:
+            stack.extend(up)
+        elif up is not None:
+            stack.append(up)
+
+
+def _adopt(parent, field, value):
+    """Tracks a value that is being set as a field of a tracked node, and
+    returns what should be stored, which for a list is a TrackedList, and
+    for the shared default of the field is a copy of it.
+    """
+    if isinstance(value, Node):
+        if value is parent._defaults.get(field, _MISSING):
+            value = copy.copy(value)
+        track(value, parent=parent)
+    elif isinstance(value, list):
+        value = TrackedList(value, parent)
+        for x in value:
+            if isinstance(x, Node):
+                track(x, parent=parent)
+    return value
+
+
+class TrackedList(list):
+    """List of child nodes of a tracked node, which marks the node as
+    modified when it is changed, and tracks the nodes added to it.
+    """
+
+    __slots__ = ("owner",)
+
+    def __init__(self, iterable=(), owner=None):
+        super().__init__(iterable)
+        self.owner = owner
+
+    def __reduce_ex__(self, protocol):
+        return (list, (list(self),))
+
+    def _changed(self, added=()):
+        owner = self.owner
+        if owner is not None:
+            for x in added:
+                if isinstance(x, Node):
+                    track(x, parent=owner)
+            _touch(owner)
+
+    def append(self, x):
+        super().append(x)
+        self._changed((x,))
+
+    def extend(self, xs):
+        n = len(self)
+        super().extend(xs)
+        self._changed(self[n:])
+
+    def insert(self, i, x):
+        super().insert(i, x)
+        self._changed((x,))
+
+    def __setitem__(self, i, x):
+        super().__setitem__(i, x)
+        self._changed(x if isinstance(i, slice) else (x,))
+
+    def __iadd__(self, xs):
+        self.extend(xs)
+        return self
+
+    def __imul__(self, n):
+        super().__imul__(n)
+        self._changed()
+        return self
+
+    def pop(self, i=-1):
+        x = super().pop(i)
+        self._changed()
+        return x
+
+    def remove(self, x):
+        super().remove(x)
+        self._changed()
+
+    def __delitem__(self, i):
+        super().__delitem__(i)
+        self._changed()
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._changed()
+
+    def reverse(self):
+        super().reverse()
+        self._changed()
+
+
+class TrackedNode(Node):
+    """Base class of the tracked variants of node classes, which are created
+    with tracked() and given to the nodes of a tree by track(). Setting or
+    deleting a field of a tracked node marks it and all of its ancestors as
+    modified, until they are cleaned with clean(). List fields are held as
+    TrackedLists, which do the same when they are changed in place, and
+    nodes that are added to a tracked tree are tracked in turn.
+
+    A tracked class has the same name and layout as the class it is a
+    variant of, so that nodes may be switched between the two in place.
+    So their parents, and whether they are modified, are kept in tables
+    keyed by id, from which they remove themselves when they are freed.
+    Tracked nodes compare equal to plain nodes.
+    """
+
+    _tracked = True
+    _eager = Node
+
+    def __setattr__(self, name, value):
+        if name in self.attrs:
+            value = _adopt(self, name, value)
+            object.__setattr__(self, name, value)
+            _touch(self)
+        else:
+            object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        object.__delattr__(self, name)
+        if name in self.attrs:
+            _touch(self)
+
+    def __del__(self, _forget=_forget):
+        _forget(id(self))
+
+
+_TRACKED_CLASSES = {}
+
+
+def tracked(cls):
+    """Returns the tracked variant of a node class."""
+    if cls._tracked:
+        return cls
+    if cls._frozen or cls._lazy:
+        raise TypeError("cannot track " + cls.__qualname__ + " nodes")
+    try:
+        return _TRACKED_CLASSES[cls]
+    except KeyError:
+        pass
+    namespace = {
+        "__slots__": (),
+        "attrs": cls.fields,
+        "__module__": cls.__module__,
+        "__qualname__": "tracked(" + cls.__qualname__ + ")",
+        "__doc__": cls.__doc__,
+        "__reduce__": _reduce,
+        "_eager": cls,
+    }
+    tracked_cls = NodeMeta(cls.__name__, (TrackedNode, cls), namespace)
+    _TRACKED_CLASSES[cls] = tracked_cls
+    return tracked_cls
+
+
+def track(tree, parent=None):
+    """Tracks the modification of a node tree in place, by switching its
+    nodes to their tracked classes and its lists to TrackedLists. Frozen
+    subtrees are left as they are, since they cannot be modified, and the
+    shared defaults of fields, such as those of Command.stdin, are replaced
+    by copies, which are tracked instead.
+
+    Parameters
+    ----------
+    tree : Node
+    parent : Node or None
+        The tracked node that tree is a child of, if any.
+
+    Returns
+    -------
+    tree : Node
+    """
+    stack = [(tree, parent)]
+    push = stack.append
+    pop = stack.pop
+    setattr = object.__setattr__
+    parents = _PARENTS
+    while stack:
+        node, parent = pop()
+        if node._frozen:
+            continue
+        i = id(node)
+        up = None if parent is None else id(parent)
+        if not node._tracked or i not in parents:
+            node.__class__ = tracked(node.__class__)
+            parents[i] = up
+        elif up is not None:
+            # a node that is already tracked gets another parent
+            old = parents[i]
+            if old is None:
+                parents[i] = up
+            elif old.__class__ is tuple:
+                if up not in old:
+                    parents[i] = old + (up,)
+            elif old != up:
+                parents[i] = (old, up)
+        defaults = node._defaults
+        for field in node.fields:
+            val = getattr(node, field, _MISSING)
+            if isinstance(val, Node):
+                if val is defaults.get(field, _MISSING):
+                    val = copy.copy(val)
+                    setattr(node, field, val)
+                push((val, node))
+            elif isinstance(val, (list, tuple)):
+                if val.__class__ is list:
+                    val = TrackedList(val, node)
+                    setattr(node, field, val)
+                elif val.__class__ is TrackedList:
+                    val.owner = node
+                for x in val:
+                    if isinstance(x, Node):
+                        push((x, node))
+    return tree
+
+
+def untrack(tree):
+    """Stops tracking a node tree, switching its nodes and lists back to
+    plain ones in place.
+    """
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if not node._tracked:
+            continue
+        _forget(id(node))
+        node.__class__ = node._eager
+        for field in node.fields:
+            val = getattr(node, field, _MISSING)
+            if isinstance(val, Node):
+                stack.append(val)
+            elif isinstance(val, (list, tuple)):
+                if val.__class__ is TrackedList:
+                    val = list(val)
+                    setattr(node, field, val)
+                stack.extend(x for x in val if isinstance(x, Node))
+    return tree
+
+
+def is_dirty(node):
+    """Returns whether a tracked node has been modified since it was last
+    cleaned. Untracked nodes are never dirty.
+    """
+    return node._tracked and id(node) in _DIRTY
+
+
+def clean(tree):
+    """Marks a tracked node, and all of its descendants, as unmodified.
+    Only the modified part of the tree is visited.
+    """
+    dirty = _DIRTY
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        i = id(node)
+        if not (node._tracked and i in dirty):
+            continue
+        dirty.discard(i)
+        for field in node.fields:
+            val = getattr(node, field, _MISSING)
+            if isinstance(val, Node):
+                stack.append(val)
+            elif isinstance(val, (list, tuple)):
+                stack.extend(x for x in val if isinstance(x, Node))
 
 
 class Script(Node):
@@ -50,7 +736,7 @@ class Script(Node):
     body : list of statements
         Statements that make up the script
     """
-    attrs = frozenset(["body"])
+    attrs = ("body",)
 
 
 class Comment(Node):
@@ -61,7 +747,7 @@ class Comment(Node):
     value : str
         The contents of the comment
     """
-    attrs = frozenset(["value"])
+    attrs = ("value",)
 
 
 class String(Node):
@@ -72,7 +758,7 @@ class String(Node):
     parts : list of nodes
         Expressions that resolve the substring.
     """
-    attrs = frozenset(["parts"])
+    attrs = ("parts",)
 
 
 class RawString(Node):
@@ -83,7 +769,7 @@ class RawString(Node):
     value : str
         A literal string value
     """
-    attrs = frozenset(["value"])
+    attrs = ("value",)
 
 
 class Var(Node):
@@ -94,7 +780,7 @@ class Var(Node):
     name : str
         The name of a variable to look up.
     """
-    attrs = frozenset(["name"])
+    attrs = ("name",)
 
 
 class EnvVar(Node):
@@ -105,7 +791,7 @@ class EnvVar(Node):
     name : str
         The name of an environment variable to look up.
     """
-    attrs = frozenset(["name"])
+    attrs = ("name",)
 
 
 class StdIn(Node):
@@ -136,13 +822,13 @@ class Command(Node):
     background : bool
         A flag for whether the command should be run in the background
     """
-    attrs = frozenset([
+    attrs = (
         "args",
         "stdin",
         "stdout",
         "stderr",
         "background",
-    ])
+    )
     stdin = StdIn()
     stdout = StdOut()
     stderr = StdErr()
@@ -169,7 +855,7 @@ class CapturedCommand(Command):
 
 class BinOp(Node):
     """Generic binary operator between two nodes"""
-    attrs = frozenset(["lhs", "rhs"])
+    attrs = ("lhs", "rhs")
 
 
 class And(BinOp):
@@ -203,7 +889,7 @@ class Not(Node):
     node : node
         The node to negate
     """
-    attrs = frozenset(["node"])
+    attrs = ("node",)
 
 #
 # Statements
@@ -217,7 +903,7 @@ class Statement(Node):
     node : non-statement Node
         The node to evaluate on a line
     """
-    attrs = frozenset(["node"])
+    attrs = ("node",)
 
 
 class Assign(Statement):
@@ -232,7 +918,7 @@ class Assign(Statement):
     scope : "local" or "global"
         A string flag indicating the scope of this variable.
     """
-    attrs = frozenset(["name", "value", "scope"])
+    attrs = ("name", "value", "scope")
 
 
 class Delete(Statement):
@@ -243,7 +929,7 @@ class Delete(Statement):
     name : str
         The name of the variable
     """
-    attrs = frozenset(["name"])
+    attrs = ("name",)
 
 
 class EnvAssign(Statement):
@@ -256,7 +942,7 @@ class EnvAssign(Statement):
     value : non-statement Node
         The value to assign to name
     """
-    attrs = frozenset(["name", "value"])
+    attrs = ("name", "value")
 
 
 class EnvDelete(Statement):
@@ -267,7 +953,7 @@ class EnvDelete(Statement):
     name : str
         The name of the variable
     """
-    attrs = frozenset(["name"])
+    attrs = ("name",)
 
 
 class AliasAssign(Statement):
@@ -280,7 +966,7 @@ class AliasAssign(Statement):
     value : non-statement Node
         The value of the alias to give to the name
     """
-    attrs = frozenset(["name", "value"])
+    attrs = ("name", "value")
 
 
 class AliasDelete(Statement):
@@ -291,11 +977,12 @@ class AliasDelete(Statement):
     name : str
         The name of the alias
     """
-    attrs = frozenset(["name"])
+    attrs = ("name",)
 
 
 class Pass(Statement):
     """Non-executing statement that is a syntatic placeholder."""
+    attrs = ()
 
 
 class If(Statement):
@@ -310,7 +997,7 @@ class If(Statement):
     orelse : iterable of Nodes
         The block that executes when the test resolves as false.
     """
-    attrs = frozenset(["test", "body", "orelse"])
+    attrs = ("test", "body", "orelse")
 
 
 class For(Statement):
@@ -325,7 +1012,7 @@ class For(Statement):
     body : iterable of Nodes
         The block that executes when looping
     """
-    attrs = frozenset(["target", "iter", "body"])
+    attrs = ("target", "iter", "body")
 
 
 class Function(Statement):
@@ -349,4 +1036,4 @@ class Function(Statement):
       will need to keep track of which functions have been
       defined.
     """
-    attrs = frozenset(["name", "body"])
+    attrs = ("name", "body")
@@ -0,0 +1,794 @@
+"""Optimization passes over node trees, which run before any backend"""
+import re
+
+from . import nodes
+from .treediff import _codes
+from .visitors import NodeVisitor
+
+
+class OptimizeReport:
+    """What an optimization pass removed from a tree.
+
+    Attributes
+    ----------
+    removed : dict
+        Maps the names of node classes to the number of nodes of each that
+        were removed, including the nodes within removed subtrees.
+    rewrites : dict
+        Maps the name of each rewrite rule to the number of times that it
+        was applied.
+    """
+
+    def __init__(self):
+        self.removed = {}
+        self.rewrites = {}
+
+    @property
+    def total(self):
+        """The total number of nodes removed."""
+        return sum(self.removed.values())
+
+    def _count(self, name, n=1):
+        self.removed[name] = self.removed.get(name, 0) + n
+
+    def _remove(self, node):
+        """Counts the nodes of a removed subtree. The default values of the
+        fields of a node, such as the StdIn of a Command, are shared by all
+        of the nodes of its class, and are not counted."""
+        stack = [node]
+        while stack:
+            x = stack.pop()
+            self._count(x.__class__.__name__)
+            defaults = x._defaults
+            for field in x.fields:
+                val = getattr(x, field, nodes._MISSING)
+                if isinstance(val, nodes.Node):
+                    if val is not defaults.get(field, nodes._MISSING):
+                        stack.append(val)
+                elif isinstance(val, (list, tuple)):
+                    stack.extend(y for y in val if isinstance(y, nodes.Node))
+
+    def _rewrite(self, rule):
+        self.rewrites[rule] = self.rewrites.get(rule, 0) + 1
+
+    def __str__(self):
+        lines = ["{} nodes removed".format(self.total)]
+        for name, n in sorted(self.removed.items()):
+            lines.append("  {}: {}".format(name, n))
+        for rule, n in sorted(self.rewrites.items()):
+            lines.append("  {} x{}".format(rule, n))
+        return "\n".join(lines)
+
+
+def _plain_class(node):
+    """Returns the plain class of a node, which may be frozen, lazy, or
+    tracked."""
+    cls = nodes._eager_class(node)
+    return cls._thawed if cls._frozen else cls
+
+
+def _walk(node):
+    """Yields the nodes of a subtree, if any."""
+    stack = [] if node is None else [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        for field in node.fields:
+            val = getattr(node, field, nodes._MISSING)
+            if isinstance(val, nodes.Node):
+                stack.append(val)
+            elif isinstance(val, (list, tuple)):
+                stack.extend(x for x in val if isinstance(x, nodes.Node))
+
+
+def _has_command(node):
+    """Returns whether a subtree runs any command, which may have side
+    effects, or read the environment."""
+    return any(isinstance(x, nodes.Command) for x in _walk(node))
+
+
+def _reads(node, name):
+    """Returns whether a subtree may read the variable of a name."""
+    for x in _walk(node):
+        if isinstance(x, nodes.Command):
+            return True
+        if isinstance(x, (nodes.Var, nodes.EnvVar)) and x.name == name:
+            return True
+    return False
+
+
+def _is_command_expr(node):
+    """Returns whether a test may be run as a statement by itself, which is
+    so if it is made of commands, joined by And, Or, and Not."""
+    stack = [node]
+    while stack:
+        x = stack.pop()
+        if isinstance(x, nodes.BinOp):
+            stack.append(x.lhs)
+            stack.append(x.rhs)
+        elif isinstance(x, nodes.Not):
+            stack.append(x.node)
+        elif x.__class__ is not nodes.Command:
+            return False
+    return True
+
+
+def _is_empty(body):
+    """Returns whether a block is missing, or does nothing."""
+    return not body or all(isinstance(x, nodes.Pass) for x in body)
+
+
+def _fill(body, node):
+    """Gives a Pass to a block of a node that is empty, or has only
+    comments left, since Bash does not allow blocks without statements."""
+    if body is not None and all(isinstance(x, nodes.Comment) for x in body):
+        body.append(nodes.Pass(lineno=node.lineno, column=node.column))
+
+
+class _Copier(NodeVisitor):
+    """Makes a plain copy of a node tree, in which the blocks of statements
+    may be rewritten by _block()."""
+
+    def _copy(self, node):
+        """Visit generator that copies a node with its visited children,
+        and returns the copy. Children that are visited to None are left
+        out of lists. Fields that have their default values are left to
+        default in the copy."""
+        kwargs = {}
+        defaults = node._defaults
+        for field in node.fields:
+            val = getattr(node, field, nodes._MISSING)
+            # the shared default nodes, such as the StdIn of a Command, are
+            # kept, rather than copied
+            if val is nodes._MISSING or val is defaults.get(field, nodes._MISSING):
+                continue
+            if isinstance(val, nodes.Node):
+                val = yield val
+            elif isinstance(val, (list, tuple)):
+                val = [x for x in (yield val) if x is not None]
+                if field == "body" or field == "orelse":
+                    val = self._block(val, isinstance(node, nodes.Script))
+            kwargs[field] = val
+        return _plain_class(node)(lineno=node.lineno, column=node.column, **kwargs)
+
+    visit_default = _copy
+
+    def _block(self, stmts, top):
+        """Returns the rewritten statements of a block, or of the top level
+        of a Script, if top is true."""
+        return stmts
+
+
+class PeepholeOptimizer(_Copier):
+    """Makes an optimized copy of a node tree, by applying local rewrites
+    that do not change what a script does:
+
+    * adjacent RawString parts of a String are merged;
+    * Pass statements are dropped from blocks that have other statements
+      to run, and from the top level of Scripts;
+    * Not(Not(x)) is folded into x, which has the same truth value;
+    * an EnvAssign that is immediately followed by another EnvAssign of the
+      same name, or by an EnvDelete of it, is dropped, unless either of
+      them runs a command, or the next one reads the variable;
+    * an else branch that does nothing is dropped, an If whose body does
+      nothing is turned around into an If of the negated test, with the
+      else branch as its body, and an If whose branches both do nothing is
+      dropped, or replaced by its test if that runs commands;
+    * the body of a For or Function whose statements were all removed is
+      given a Pass, since Bash does not allow empty blocks.
+
+    The nodes of the copy are plain nodes, even if those of the tree are
+    frozen, lazy, or tracked.
+
+    Parameters
+    ----------
+    root : Node or None
+    report : OptimizeReport or None
+        The report to add the removed nodes to.
+    """
+
+    def __init__(self, root=None, report=None):
+        self.root = root
+        self.report = OptimizeReport() if report is None else report
+
+    def _block(self, stmts, top):
+        report = self.report
+        has_work = top or any(
+            not isinstance(x, (nodes.Pass, nodes.Comment)) for x in stmts)
+        rtn = []
+        for stmt in stmts:
+            if isinstance(stmt, nodes.Pass):
+                if has_work or (rtn and isinstance(rtn[-1], nodes.Pass)):
+                    report._remove(stmt)
+                    report._rewrite("redundant Pass")
+                    continue
+            elif isinstance(stmt, (nodes.EnvAssign, nodes.EnvDelete)) and rtn:
+                prev = rtn[-1]
+                if (isinstance(prev, nodes.EnvAssign) and prev.name == stmt.name
+                        and not _has_command(getattr(prev, "value", None))
+                        and not (isinstance(stmt, nodes.EnvAssign)
+                                 and _reads(stmt.value, stmt.name))):
+                    rtn.pop()
+                    report._remove(prev)
+                    report._rewrite("overwritten EnvAssign")
+            rtn.append(stmt)
+        return rtn
+
+    def visit_String(self, node):
+        string = yield from self._copy(node)
+        parts = getattr(string, "parts", ())
+        merged = []
+        for part in parts:
+            if (isinstance(part, nodes.RawString) and merged
+                    and isinstance(merged[-1], nodes.RawString)):
+                prev = merged[-1]
+                merged[-1] = nodes.RawString(
+                    prev.value + part.value, lineno=prev.lineno, column=prev.column)
+                self.report._remove(part)
+                self.report._rewrite("merged RawString")
+            else:
+                merged.append(part)
+        if len(merged) != len(parts):
+            string.parts = merged
+        return string
+
+    def _filled(self, node):
+        """Visit generator that copies a node with a body that must have a
+        statement to run, which is given a Pass if its statements were all
+        removed."""
+        copy = yield from self._copy(node)
+        _fill(getattr(copy, "body", None), copy)
+        return copy
+
+    visit_For = visit_Function = _filled
+
+    def visit_Not(self, node):
+        not_ = yield from self._copy(node)
+        inner = not_.node
+        if isinstance(inner, nodes.Not):
+            self.report._count("Not", 2)
+            self.report._rewrite("double Not")
+            return inner.node
+        return not_
+
+    def visit_If(self, node):
+        if_ = yield from self._copy(node)
+        report = self.report
+        orelse = getattr(if_, "orelse", None)
+        if orelse and _is_empty(orelse):
+            for stmt in orelse:
+                report._remove(stmt)
+            if_.orelse = orelse = []
+            report._rewrite("empty else")
+        body = getattr(if_, "body", None)
+        if not _is_empty(body):
+            _fill(body, if_)
+            if orelse:
+                _fill(orelse, if_)
+            return if_
+        test = if_.test
+        if orelse:
+            # if x; then :; else y; fi is if ! x; then y; fi
+            for stmt in body or ():
+                report._remove(stmt)
+            if isinstance(test, nodes.Not):
+                report._count("Not")
+                test = test.node
+            else:
+                test = nodes.Not(test, lineno=test.lineno, column=test.column)
+            report._rewrite("empty If body")
+            return nodes.If(test, orelse, [], lineno=if_.lineno, column=if_.column)
+        if not _has_command(test):
+            report._remove(if_)
+            report._rewrite("empty If")
+            return None
+        if _is_command_expr(test):
+            # the test is kept, as a statement
+            report._count("If")
+            for stmt in body or ():
+                report._remove(stmt)
+            report._rewrite("empty If")
+            return nodes.Statement(test, lineno=if_.lineno, column=if_.column)
+        return if_
+
+
+def peephole(tree, report=None):
+    """Returns an optimized copy of a node tree. See PeepholeOptimizer.
+
+    Parameters
+    ----------
+    tree : Node
+    report : OptimizeReport or None
+        The report to add the removed nodes to, if any.
+
+    Returns
+    -------
+    tree : Node or None
+        None if the whole tree was removed.
+    """
+    return PeepholeOptimizer(report=report).visit(tree)
+
+
+#
+# Hoisting of captured commands
+#
+
+# the names read by, or written by, a statement that may write any variable
+_ANY = None
+
+_WRITERS = (nodes.Assign, nodes.Delete, nodes.EnvAssign, nodes.EnvDelete)
+
+
+def _command_name(node):
+    """Returns the name of the command run by a Command node, if it is
+    given literally."""
+    args = getattr(node, "args", None)
+    if not args:
+        return None
+    first = args[0]
+    if isinstance(first, nodes.RawString):
+        return first.value
+    if isinstance(first, nodes.String) and all(
+            isinstance(p, nodes.RawString) for p in first.parts):
+        return "".join(p.value for p in first.parts)
+    return None
+
+
+def _plain_command(node, pure):
+    """Returns whether a single Command is an allowed CapturedCommand that
+    is run plainly, with no redirection and not in the background."""
+    return (isinstance(node, nodes.CapturedCommand)
+            and _command_name(node) in pure
+            and isinstance(node.stdin, nodes.StdIn)
+            and isinstance(node.stdout, nodes.StdOut)
+            and isinstance(node.stderr, nodes.StdErr)
+            and not node.background)
+
+
+def _children(node, skip_functions=True):
+    """Yields (child, field, index) for the children of a node, where index
+    is None for a child that is not in a list. The bodies of Functions,
+    which do not run where they are defined, are skipped."""
+    if skip_functions and isinstance(node, nodes.Function):
+        return
+    for field in node.fields:
+        val = getattr(node, field, nodes._MISSING)
+        if isinstance(val, nodes.Node):
+            yield val, field, None
+        elif isinstance(val, (list, tuple)):
+            for i, x in enumerate(val):
+                if isinstance(x, nodes.Node):
+                    yield x, field, i
+
+
+def _writes(stmt, pure):
+    """Returns the set of the names of the variables that a statement may
+    write, or _ANY if it runs a command that is not allowed, which may do
+    anything."""
+    names = set()
+    stack = [stmt]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, nodes.Command) and not _plain_command(node, pure):
+            return _ANY
+        if isinstance(node, _WRITERS):
+            names.add(node.name)
+        elif isinstance(node, nodes.For) and isinstance(
+                node.target, (nodes.Var, nodes.EnvVar)):
+            names.add(node.target.name)
+        stack.extend(x for x, _, _ in _children(node))
+    return names
+
+
+def _conflicts(reads, writes):
+    if writes is _ANY:
+        return bool(reads)
+    return not reads.isdisjoint(writes)
+
+
+class _Occurrence:
+    """A pure CapturedCommand in a tree, and where it is."""
+
+    __slots__ = ("node", "parent", "field", "index", "key", "reads")
+
+    def __init__(self, node, parent, field, index, key, reads):
+        self.node = node
+        self.parent = parent
+        self.field = field
+        self.index = index
+        self.key = key
+        self.reads = reads
+
+    def replace(self, new):
+        if self.index is None:
+            setattr(self.parent, self.field, new)
+        else:
+            getattr(self.parent, self.field)[self.index] = new
+
+
+class _Hoister:
+    """Hoists the pure CapturedCommands of a plain node tree in place."""
+
+    def __init__(self, tree, pure, report, prefix):
+        self.pure = pure
+        self.report = report
+        # numbers the commands, so that identical ones share a key
+        self.table = {}
+        self.prefix = prefix
+        self.used = set()
+        for node in _walk(tree):
+            for attr in ("name", "target"):
+                val = getattr(node, attr, None)
+                if isinstance(val, str):
+                    self.used.add(val)
+            if isinstance(node, (nodes.Var, nodes.EnvVar)):
+                self.used.add(node.name)
+        self.count = 0
+        # the names of the variables that hold the values of Assigns that
+        # have been hoisted, by the ids of the Assigns
+        self.hoisted = {}
+
+    def _name(self):
+        while True:
+            name = self.prefix + str(self.count)
+            self.count += 1
+            if name not in self.used:
+                return name
+
+    def renumber(self, tree):
+        """Renames the variables that have been added so that they are
+        numbered in the order that they are assigned in the tree, rather
+        than in the order that they were hoisted."""
+        names = set(self.hoisted.values())
+        if not names:
+            return
+        assigns = []
+        uses = []
+        # in pre-order, which is the order of the source
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, nodes.Assign) and id(node) in self.hoisted:
+                assigns.append(node)
+            elif isinstance(node, nodes.Var) and node.name in names:
+                uses.append(node)
+            stack.extend(reversed([x for x, _, _ in _children(node, skip_functions=False)]))
+        # the names are those that were made, in another order, so none of
+        # them clashes with a name in the tree
+        if len(assigns) != len(names):
+            return
+        ordered = sorted(names, key=lambda name: int(name[len(self.prefix):]))
+        renames = {a.name: name for a, name in zip(assigns, ordered)}
+        for node in assigns + uses:
+            node.name = renames[node.name]
+
+    def _pure(self, node):
+        pure = self.pure
+        return _plain_command(node, pure) and all(
+            _plain_command(x, pure) for x in _walk(node)
+            if isinstance(x, nodes.Command))
+
+    def occurrences(self, stmt):
+        """Returns the outermost pure CapturedCommands run by a statement,
+        outside of the bodies of Functions."""
+        rtn = []
+        stack = [(stmt, None, None, None)]
+        while stack:
+            node, parent, field, index = stack.pop()
+            if isinstance(node, nodes.CapturedCommand) and self._pure(node):
+                reads = {x.name for x in _walk(node)
+                         if isinstance(x, (nodes.Var, nodes.EnvVar))}
+                key = _codes(node, self.table)[id(node)]
+                rtn.append(_Occurrence(node, parent, field, index, key, reads))
+                continue
+            for x, f, i in _children(node):
+                stack.append((x, node, f, i))
+        rtn.reverse()
+        return rtn
+
+    def _assign(self, occ, scope):
+        name = self._name()
+        assign = nodes.Assign(name, occ.node, scope,
+                              lineno=occ.node.lineno, column=occ.node.column)
+        self.hoisted[id(assign)] = name
+        return assign, name
+
+    def _share(self, occs, name, rule, first=True):
+        """Replaces the occurrences of a command with a variable, or all but
+        the first, if first is false. The first is kept, as the value of
+        the variable, and the rest are removed."""
+        for k, occ in enumerate(occs):
+            if k or first:
+                occ.replace(nodes.Var(name, lineno=occ.node.lineno,
+                                      column=occ.node.column))
+            if k:
+                self.report._remove(occ.node)
+        self.report._rewrite(rule)
+
+    def block(self, stmts, scope):
+        """Hoists the captured commands of a list of statements."""
+        self._loops(stmts, scope)
+        self._common(stmts, scope)
+
+    def _loops(self, stmts, scope):
+        """Hoists the commands in For bodies that do not depend on the loop
+        out of the loops, before them."""
+        inserts = []
+        for i, stmt in enumerate(stmts):
+            if not isinstance(stmt, nodes.For):
+                continue
+            writes = set()
+            for x in getattr(stmt, "body", ()):
+                w = _writes(x, self.pure)
+                if w is _ANY:
+                    writes = _ANY
+                    break
+                writes |= w
+            if writes is not _ANY and isinstance(stmt.target, (nodes.Var, nodes.EnvVar)):
+                writes.add(stmt.target.name)
+            groups = {}
+            for x in getattr(stmt, "body", ()):
+                for occ in self.occurrences(x):
+                    if not _conflicts(occ.reads, writes):
+                        groups.setdefault(occ.key, []).append(occ)
+            for occs in groups.values():
+                assign, name = self._assign(occs[0], scope)
+                inserts.append((i, assign))
+                self._share(occs, name, "loop-invariant CapturedCommand")
+        for i, assign in reversed(inserts):
+            stmts.insert(i, assign)
+
+    def _common(self, stmts, scope):
+        """Runs each command that is run more than once, with nothing that
+        may change its arguments in between, once before the first time,
+        and shares its output."""
+        inserts = []
+        # the occurrences of each command since it could last have changed,
+        # and the index of the statement of the first of them
+        groups = {}
+
+        def close(key):
+            first, occs = groups.pop(key)
+            if len(occs) < 2:
+                return
+            name = self.hoisted.get(id(occs[0].parent))
+            if name is not None and occs[0].field == "value":
+                # the first is already the value of a hoisted Assign
+                self._share(occs, name, "common CapturedCommand", first=False)
+                return
+            assign, name = self._assign(occs[0], scope)
+            inserts.append((first, assign))
+            self._share(occs, name, "common CapturedCommand")
+
+        for i, stmt in enumerate(stmts):
+            writes = _writes(stmt, self.pure)
+            compound = isinstance(stmt, (nodes.If, nodes.For))
+            for occ in self.occurrences(stmt):
+                if compound and _conflicts(occ.reads, writes):
+                    # it may run after a write within the statement
+                    continue
+                group = groups.get(occ.key)
+                if group is None:
+                    groups[occ.key] = (i, [occ])
+                else:
+                    group[1].append(occ)
+            if writes is _ANY or writes:
+                for key in [k for k, (_, occs) in groups.items()
+                            if _conflicts(occs[0].reads, writes)]:
+                    close(key)
+        for key in list(groups):
+            close(key)
+        for i, assign in sorted(inserts, key=lambda x: x[0], reverse=True):
+            stmts.insert(i, assign)
+
+
+def hoist_commands(tree, pure, report=None, prefix="_asht_cc"):
+    """Returns a copy of a node tree in which pure CapturedCommands, each
+    of which runs in a subshell, are run fewer times:
+
+    * a command that is run more than once in a block, with nothing that
+      may change its output in between, is run once, into a variable, by
+      an Assign before the statement where it is first run, and the
+      variable is used instead;
+    * a command in the body of a For loop that does not depend on the loop
+      is run once, into a variable, by an Assign before the loop.
+
+    The commands that are pure are given by name. They must have no side
+    effects, and their output must depend only on their arguments, so
+    that they may be run earlier, and fewer times, than they were. Only
+    CapturedCommands that run an allowed command, with no redirection,
+    and whose arguments run only allowed commands, are hoisted. A command
+    is not run in place of one whose arguments read a variable that may
+    have been written in between, and any other command that is run may
+    write any variable. A hoisted command may be run where the original
+    would not have been, such as before a loop that runs no times.
+
+    Parameters
+    ----------
+    tree : Node
+    pure : iterable of str
+        The names of the commands that are pure.
+    report : OptimizeReport or None
+        The report to add the removed nodes and the rewrites to.
+    prefix : str
+        The prefix of the names of the variables that are added, which are
+        numbered so as not to clash with any name in the tree.
+
+    Returns
+    -------
+    tree : Node
+    """
+    report = OptimizeReport() if report is None else report
+    tree = _Copier().visit(tree)
+    hoister = _Hoister(tree, frozenset(pure), report, prefix)
+    # outer blocks first, so that commands are hoisted as far as they go
+    stack = [(tree, "global")]
+    while stack:
+        node, scope = stack.pop()
+        if isinstance(node, nodes.Function):
+            scope = "local"
+        for field in ("body", "orelse"):
+            stmts = getattr(node, field, None)
+            if isinstance(stmts, list):
+                hoister.block(stmts, scope)
+        stack.extend((x, scope) for x, _, _ in _children(node, skip_functions=False))
+    hoister.renumber(tree)
+    return tree
+
+
+#
+# Dead code elimination
+#
+
+# names of the words in literal strings, which may be references to
+# variables, such as "$x" or "${x}", or calls of functions, such as in
+# aliases, traps, and eval'd code
+_IDENTIFIERS = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_WORD_SEPARATORS = re.compile(r"""[\s;|&()<>`"'$={}]+""")
+
+# commands that may run code that cannot be seen, which may use anything
+_OPAQUE_COMMANDS = frozenset(["source", ".", "eval"])
+
+# the variables that the shell itself reads, such as to show its prompt or
+# split words, and the functions that it calls by name, which are used even
+# if nothing in a script reads them
+SHELL_NAMES = frozenset([
+    "BASH_ENV", "BASHOPTS", "CDPATH", "COLUMNS", "ENV", "EXECIGNORE", "FCEDIT",
+    "FIGNORE", "FUNCNEST", "GLOBIGNORE", "HISTCONTROL", "HISTFILE", "HISTFILESIZE",
+    "HISTIGNORE", "HISTSIZE", "HISTTIMEFORMAT", "HOME", "HOSTFILE", "IFS",
+    "IGNOREEOF", "INPUTRC", "LANG", "LC_ALL", "LC_COLLATE", "LC_CTYPE",
+    "LC_MESSAGES", "LC_NUMERIC", "LC_TIME", "LINES", "MAIL", "MAILCHECK",
+    "MAILPATH", "OLDPWD", "OPTERR", "OPTIND", "PATH", "POSIXLY_CORRECT",
+    "PROMPT_COMMAND", "PROMPT_DIRTRIM", "PS0", "PS1", "PS2", "PS3", "PS4", "PWD",
+    "SHELLOPTS", "TERM", "TIMEFORMAT", "TMOUT", "TMPDIR",
+    "command_not_found_handle",
+])
+
+
+def _words(value):
+    names = set(_IDENTIFIERS.findall(value))
+    names.update(_WORD_SEPARATORS.split(value))
+    return names
+
+
+def _definition(node):
+    """Returns the name that a node defines, if it is a definition that
+    may be removed: a Function, or an Assign whose value runs no command."""
+    if isinstance(node, nodes.Function):
+        return node.name
+    if isinstance(node, nodes.Assign) and not _has_command(getattr(node, "value", None)):
+        return node.name
+    return None
+
+
+def remove_dead_code(tree, keep=(), report=None):
+    """Returns a copy of a node tree without the Functions and Assigns that
+    are never used.
+
+    The uses of each name are found by a use-def analysis: a Var or EnvVar
+    uses the variable of its name, and any word of a RawString, such as a
+    command name or an argument of one, uses the function and the variable
+    of its name. A use within a Function, or within the value of an Assign,
+    only counts if that definition is itself used, so that definitions that
+    are only used by unused definitions are removed too. Deletes are not
+    uses.
+
+    The variables that the shell reads itself, such as PS1, IFS, and PATH,
+    and the functions that it calls, which are listed in SHELL_NAMES, are
+    always used, as are the names in their values, such as that of a
+    function run by PROMPT_COMMAND. Assigns whose values run commands are
+    kept, for the sake of the commands. If the tree runs a command named by
+    a variable, every Function is kept, and if it sources a file or evals
+    code, nothing is removed. Blocks that are emptied are given a Pass.
+
+    Parameters
+    ----------
+    tree : Node
+    keep : iterable of str
+        Names that are used from outside of the script, and whose
+        definitions are kept. These include the variables that may already
+        be exported by the environment that the script runs in, since
+        assigning them changes the environment of the commands run later.
+    report : OptimizeReport or None
+        The report to add the removed nodes and the rewrites to.
+
+    Returns
+    -------
+    tree : Node
+    """
+    report = OptimizeReport() if report is None else report
+    tree = _Copier().visit(tree)
+    # the names used by the code outside of definitions, keyed by None, and
+    # by the code of each definition, keyed by its id
+    uses = {None: set()}
+    # the definitions of each name, as (definition, block) pairs
+    defs = {}
+    # the id of the innermost definition that each definition is within
+    owners = {}
+    blocks = {}
+    dynamic = False
+    stack = [(tree, None, None)]
+    while stack:
+        node, owner, block = stack.pop()
+        if node is not tree:
+            name = _definition(node)
+            if name is not None:
+                defs.setdefault(name, []).append((node, block))
+                owners[id(node)] = owner
+                owner = id(node)
+                uses[owner] = set()
+        used = uses[owner]
+        if isinstance(node, (nodes.Var, nodes.EnvVar)):
+            used.add(node.name)
+        elif isinstance(node, nodes.RawString):
+            used.update(_words(node.value))
+        elif isinstance(node, nodes.Command):
+            cmd = _command_name(node)
+            if cmd is None:
+                dynamic = True
+            elif cmd in _OPAQUE_COMMANDS:
+                return tree
+        for field in node.fields:
+            val = getattr(node, field, nodes._MISSING)
+            if isinstance(val, nodes.Node):
+                stack.append((val, owner, None))
+            elif isinstance(val, list):
+                if field == "body" or field == "orelse":
+                    blocks[id(val)] = (val, isinstance(node, nodes.Script))
+                stack.extend((x, owner, val) for x in val if isinstance(x, nodes.Node))
+    # the names that are used, and the names used by their definitions
+    live = set(keep) | SHELL_NAMES | uses[None]
+    todo = list(live)
+    while todo:
+        for d, _ in defs.get(todo.pop(), ()):
+            for name in uses[id(d)]:
+                if name not in live:
+                    live.add(name)
+                    todo.append(name)
+    dead = set()
+    for name, ds in defs.items():
+        if name in live:
+            continue
+        for d, _ in ds:
+            if dynamic and isinstance(d, nodes.Function):
+                continue
+            dead.add(id(d))
+    emptied = {}
+    for name, ds in defs.items():
+        for d, block in ds:
+            if id(d) not in dead or block is None:
+                continue
+            emptied[id(block)] = block
+            # the nodes within a removed definition are counted with it
+            owner = owners[id(d)]
+            while owner is not None and owner not in dead:
+                owner = owners[owner]
+            if owner is None:
+                report._remove(d)
+                report._rewrite("unused " + d.__class__.__name__)
+    for block in emptied.values():
+        block[:] = [x for x in block if id(x) not in dead]
+        top = blocks.get(id(block), (None, True))[1]
+        if not top and all(isinstance(x, nodes.Comment) for x in block):
+            block.append(nodes.Pass())
+    return tree
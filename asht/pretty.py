@@ -1,46 +1,283 @@
 """Pretty printers and formatters"""
+import io
 import pprint as pypprint
-from collections.abc import Sequence, Mapping
+import sys
+from collections.abc import Mapping
 
-from .visitors import Node, NodeVisitor
+from .nodes import Node, _MISSING
+from .visitors import NodeVisitor
 
 
 class NodePrettyFormatter(NodeVisitor):
-    """Beautifully formatt a node tree"""
+    """Beautifully formats a node tree, one line per node, field, or list
+    bracket, such as::
 
-    def __init__(self, root=None, indent=" "):
+        If(
+         test=Var(
+          name='x'
+         ),
+         body=[
+          Pass()
+         ],
+         orelse=[]
+        )
+
+    Fields are written in the order of the fields of their node class, and
+    those that are not set are left out. The output is passed to the write
+    callable as it is made, indented by the depth that the traversal is
+    at, so formatting takes time linear in the size of the output, which
+    for trees of bounded depth, or with an empty indent, is linear in the
+    size of the tree. Besides what the write callable keeps, memory is
+    linear in the depth of the tree. The last line does not end with a
+    newline.
+
+    If the indent is None, the tree is formatted on a single line instead,
+    such as ``If(test=Var(name='x'), body=[Pass()], orelse=[])``.
+    """
+
+    def __init__(self, root=None, indent=" ", write=None):
+        """
+        Parameters
+        ----------
+        root : Node or None
+        indent : str or None
+            The string to indent by for each level of depth, or None to
+            format the tree on a single line.
+        write : callable or None
+            Function that output chunks are passed to, which defaults to
+            appending to ``self.chunks``.
+        """
         self.root = root
         self.indent = indent
-        self._nlindent = "\n" + indent
-        self._comma_nlindent = ",\n" + indent
+        self.chunks = []
+        self.write = self.chunks.append if write is None else write
+        if indent is None:
+            self._step = self._nl = ""
+            self._comma = ", "
+        else:
+            self._step = indent
+            self._nl = "\n"
+            self._comma = ","
+        self._depth = 0
+        # the newline and indentation that the lines at the current depth
+        # start with, and that which the next opening line starts with,
+        # which is the same except for the first line of the output
+        self._newline = self._nl
+        self._prefix = ""
+        # the comma that goes before the next line if it is of a sibling of
+        # the last node or field, which is written once it is known, since
+        # the last one of a list or node has none
+        self._sep = ""
+        # what goes before the name of the node that is visited next, which
+        # is set by its parent before it is yielded, and cleared once used
+        self._head = ""
+
+    def _push(self):
+        # the prefix is made anew, rather than kept for each depth, so that
+        # deep trees do not need memory quadratic in their depth
+        self._depth += 1
+        self._newline = self._prefix = self._nl + self._step * self._depth
+
+    def _pop(self):
+        self._depth -= 1
+        self._newline = self._prefix = self._nl + self._step * self._depth
+
+    def visit(self, node=None):
+        self._depth = 0
+        self._newline = self._nl
+        self._prefix = self._sep = self._head = ""
+        return super().visit(node)
 
     def visit_default(self, node):
-        s = node.__class__.__name__ + "("
-        if not len(node.attrs):
-            return s + ")"
-        attr_lines = []
-        for attr in node.attrs:
-            val = getattr(node, attr)
+        vals = []
+        nested = False
+        for field in node.fields:
+            val = getattr(node, field, _MISSING)
+            if val is _MISSING:
+                continue
+            if isinstance(val, Node) or (isinstance(val, (list, tuple)) and val):
+                nested = True
+            vals.append((field, val))
+        name = node.__class__.__name__
+        if nested:
+            return self._visit_nested(name, vals)
+        self._visit_leaf(name, vals)
+
+    def _visit_leaf(self, name, vals):
+        # a node without children is written all at once
+        parts = [self._sep, self._prefix, self._head, name, "("]
+        if vals:
+            newline = self._newline
+            inner = newline + self._step
+            for field, val in vals:
+                parts.append(inner)
+                parts.append(field)
+                parts.append("=[]" if isinstance(val, (list, tuple)) else "=" + repr(val))
+                inner = self._comma + inner
+            parts.append(newline)
+        parts.append(")")
+        self.write("".join(parts))
+        self._sep = self._comma
+        self._head = ""
+
+    def _visit_nested(self, name, vals):
+        write = self.write
+        write(self._sep + self._prefix + self._head + name + "(")
+        self._sep = self._head = ""
+        self._push()
+        for field, val in vals:
             if isinstance(val, Node):
-                attr_lines.append(attr + "=" + self.visit(val).replace("\n", self._nlindent))
-            elif isinstance(val, Sequence):
-                attr_lines.append(attr + "=[\n")
-                elems = [self.visit(x).replace("\n", self._nlindent) for x in val]
-                attr_lines.append(self._comma_nlindent.join(elems))
-                attr_lines.append("\n]")
+                self._head = field + "="
+                yield val
+            elif isinstance(val, (list, tuple)):
+                # lines are not kept in locals, which the generator holds
+                # on to while its children are visited, since they are as
+                # long as the depth
+                if not val:
+                    write(self._sep + self._prefix + field + "=[]")
+                    self._sep = self._comma
+                    continue
+                write(self._sep + self._prefix + field + "=[")
+                self._sep = ""
+                self._push()
+                if all(isinstance(x, Node) for x in val):
+                    yield val
+                else:
+                    for x in val:
+                        if isinstance(x, Node):
+                            yield x
+                        else:
+                            write(self._sep + self._prefix + repr(x))
+                            self._sep = self._comma
+                self._pop()
+                write(self._newline + "]")
+                self._sep = self._comma
             else:
-                # must be basic Python type
-                attr_lines.append(attr + "=" + repr(val))
-        s += "\n" + self._comma_nlindent.join(attr_lines)
-        s += "\n)"
-        return s
+                write(self._sep + self._prefix + field + "=" + repr(val))
+                self._sep = self._comma
+        self._pop()
+        write(self._newline + ")")
+        self._sep = self._comma
+
+
+class _Truncated(Exception):
+    """Raised when the output of a BoundedFormatter is used up."""
+
+
+class _More:
+    """Stands in for the items that are left out of a list."""
+
+    __slots__ = ("n",)
+
+    def __init__(self, n):
+        self.n = n
+
+    def __repr__(self):
+        return "...<{} more>".format(self.n)
+
+
+class BoundedFormatter(NodePrettyFormatter):
+    """Formats at most a part of a node tree, in the same way as
+    NodePrettyFormatter, so that even giant trees are formatted quickly and
+    briefly, as by ``repr()`` and ``str()`` of nodes.
+
+    Nodes deeper than max_depth are written as ``Name(...)``, lists are cut
+    to their first max_items items, followed by ``...<n more>``, and the
+    traversal is stopped as soon as max_chars characters have been written,
+    with ``...`` written after them. Only the nodes that are written are
+    visited, so the time taken is bounded by the limits, rather than by the
+    size of the tree.
+    """
+
+    def __init__(self, root=None, indent=" ", write=None, max_depth=8, max_items=20,
+                 max_chars=4000):
+        """
+        Parameters
+        ----------
+        root : Node or None
+        indent : str or None
+        write : callable or None
+        max_depth : int
+            The depth of the nodes below which their fields are left out.
+        max_items : int
+            The number of items of each list that are written.
+        max_chars : int
+            The number of characters after which the output is cut off.
+        """
+        super().__init__(root=root, indent=indent, write=write)
+        self.max_depth = max_depth
+        self.max_items = max_items
+        self.max_chars = max_chars
+        self._out = self.write
+        self.write = self._write_bounded
+        self._written = 0
+        self._level = 0
+
+    def _write_bounded(self, s):
+        left = self.max_chars - self._written
+        if len(s) > left:
+            self._out(s[:left])
+            self._written = self.max_chars
+            raise _Truncated()
+        self._written += len(s)
+        self._out(s)
+
+    def visit(self, node=None):
+        self._written = self._level = 0
+        try:
+            super().visit(node)
+        except _Truncated:
+            self._out("...")
+
+    def visit_default(self, node):
+        name = node.__class__.__name__
+        if self._level >= self.max_depth:
+            self.write(self._sep + self._prefix + self._head + name + "(...)")
+            self._sep = self._comma
+            self._head = ""
+            return
+        max_items = self.max_items
+        max_chars = self.max_chars
+        vals = []
+        nested = False
+        for field in node.fields:
+            val = getattr(node, field, _MISSING)
+            if val is _MISSING:
+                continue
+            if isinstance(val, Node):
+                nested = True
+            elif isinstance(val, (list, tuple)):
+                if len(val) > max_items:
+                    val = list(val[:max_items]) + [_More(len(val) - max_items)]
+                nested = nested or bool(val)
+            elif isinstance(val, str) and len(val) > max_chars:
+                # the rest of the string would be cut off anyway
+                val = val[:max_chars]
+            vals.append((field, val))
+        if nested:
+            return self._visit_nested(name, vals)
+        self._visit_leaf(name, vals)
+
+    def _visit_nested(self, name, vals):
+        self._level += 1
+        yield from super()._visit_nested(name, vals)
+        self._level -= 1
+
+
+def pformat_bounded(node, indent=" ", **kwargs):
+    """Formats at most a part of a node tree into a pretty string, with a
+    BoundedFormatter, which is given the keyword arguments."""
+    out = io.StringIO()
+    BoundedFormatter(indent=indent, write=out.write, **kwargs).visit(node)
+    return out.getvalue()
 
 
 def pformat_node(node, indent=" "):
     """Formats a node tree into a pretty string"""
-    f = NodePrettyFormatter(indent=indent)
-    s = f.visit(node)
-    return s
+    # a StringIO holds the output more compactly than a list of lines
+    out = io.StringIO()
+    NodePrettyFormatter(indent=indent, write=out.write).visit(node)
+    return out.getvalue()
 
 
 def pformat(tree, **kwargs):
@@ -55,5 +292,14 @@ def pformat(tree, **kwargs):
 
 
 def pprint(tree, sep=' ', end='\n', file=None, flush=False, **kwargs):
-    """Pretty prints a tree."""
-    print(pformat(tree, **kwarg), sep=sep, end=end, file=file, flush=flush)
+    """Pretty prints a tree. Node trees are written out to the file as
+    they are formatted, rather than formatted into a string first.
+    """
+    if not isinstance(tree, Node):
+        print(pformat(tree, **kwargs), sep=sep, end=end, file=file, flush=flush)
+        return
+    file = sys.stdout if file is None else file
+    NodePrettyFormatter(write=file.write, **kwargs).visit(tree)
+    file.write(end)
+    if flush:
+        file.flush()
@@ -0,0 +1,244 @@
+"""Profiling of visitors, per visit method and kind of node"""
+from time import perf_counter_ns
+from types import GeneratorType
+
+from . import visitors
+
+
+class MethodStats:
+    """The statistics of the visits of one kind of node by one visitor
+    class.
+
+    Attributes
+    ----------
+    calls : int
+    cumulative_ns : int
+        The time spent in the visits, including the visits of their
+        children, in nanoseconds. Recursive visits of the same kind are
+        only counted once, by the outermost.
+    self_ns : int
+        The time spent in the visits, excluding the visits of their
+        children, in nanoseconds.
+    output : int
+        The number of characters of code that the visits wrote out, or
+        returned, excluding that of their children. The lines of an
+        emitter are counted with their newlines but without their
+        indentation.
+    """
+
+    __slots__ = ("calls", "cumulative_ns", "self_ns", "output")
+
+    def __init__(self):
+        self.calls = 0
+        self.cumulative_ns = 0
+        self.self_ns = 0
+        self.output = 0
+
+    def __repr__(self):
+        return "MethodStats(calls={}, cumulative_ns={}, self_ns={}, output={})".format(
+            self.calls, self.cumulative_ns, self.self_ns, self.output)
+
+
+class _CountedLine:
+    """Stands in for the line() of an emitter, counting what it writes."""
+
+    __slots__ = ("profile", "line")
+
+    def __init__(self, profile, line):
+        self.profile = profile
+        self.line = line
+
+    def __call__(self, s):
+        self.profile._written += len(s) + 1
+        self.line(s)
+
+
+# the indices of the items of a frame, which is a list for speed
+_KEY, _PATH, _START, _CHILD_NS, _WRITTEN, _CHILD_WRITTEN, _CHILD_RETURNED = range(7)
+
+
+class Profile:
+    """Context manager that profiles the visitors that are used within it.
+
+    The visit method of each kind is wrapped when it is bound, which is the
+    first time that a visitor visits that kind, so visitors that are not
+    used while a Profile is active run exactly as they do without it. Only
+    visitors whose methods are bound while the Profile is active are
+    profiled: those that are created within the with block, as
+    ``tobash()`` and ``NodeToDict().visit()`` do, or that see a kind for
+    the first time in it. Visitors that are profiled and are still used
+    after the with block stop recording but keep a small overhead.
+
+    The visits of each visitor class and kind are keyed by a name such as
+    ``"ToBash.visit_If"``, whether the kind has its own visit method or is
+    visited by ``visit_default()``. The times include the overhead of the
+    profiling itself, which is about the same for every visit.
+
+    Profiles may be nested, in which case visitors are profiled by the
+    innermost one only. For example::
+
+        with Profile() as prof:
+            tobash(tree)
+        print(prof)
+        with open("tobash.folded", "w") as f:
+            f.write(prof.collapsed())
+
+    Attributes
+    ----------
+    stats : dict
+        Maps names to MethodStats.
+    """
+
+    def __init__(self):
+        self.stats = {}
+        self.active = False
+        self._previous = None
+        self._stack = []
+        # active[name] is the number of visits of name on the stack
+        self._active = {}
+        # paths of the stack are interned as ids, (parent id, name) -> id,
+        # and self_ns of each path is kept per id
+        self._paths = {}
+        self._path_ns = [0]
+        self._path_names = [None]
+        self._written = 0
+
+    def __enter__(self):
+        self._previous = visitors._profiler
+        visitors._profiler = self
+        self.active = True
+        return self
+
+    def __exit__(self, *exc):
+        visitors._profiler = self._previous
+        self._previous = None
+        self.active = False
+        self._stack.clear()
+        self._active.clear()
+
+    def _wrap(self, visitor, kind, meth):
+        """Returns a visit method that profiles meth, which is called by
+        Visitor._bind() while the Profile is active."""
+        name = type(visitor).__name__ + ".visit_" + visitor._kind_name(kind)
+        line = visitor.__dict__.get("line")
+        if line is not None and not (line.__class__ is _CountedLine and line.profile is self):
+            visitor.line = _CountedLine(self, line)
+        enter = self._enter
+        exit = self._exit
+        unwind = self._unwind
+        resume = self._resume
+
+        def visit_profiled(tree):
+            if not self.active:
+                return meth(tree)
+            frame = enter(name)
+            try:
+                rtn = meth(tree)
+            except BaseException:
+                unwind(frame)
+                raise
+            if rtn.__class__ is GeneratorType:
+                return resume(rtn, frame)
+            exit(frame, rtn)
+            return rtn
+
+        return visit_profiled
+
+    def _resume(self, gen, frame):
+        try:
+            rtn = yield from gen
+        except BaseException:
+            self._unwind(frame)
+            raise
+        self._exit(frame, rtn)
+        return rtn
+
+    def _enter(self, name):
+        stack = self._stack
+        parent = stack[-1][_PATH] if stack else 0
+        paths = self._paths
+        path = paths.get((parent, name))
+        if path is None:
+            path = paths[parent, name] = len(self._path_ns)
+            self._path_ns.append(0)
+            self._path_names.append((parent, name))
+        active = self._active
+        active[name] = active.get(name, 0) + 1
+        frame = [name, path, 0, 0, self._written, 0, 0]
+        stack.append(frame)
+        frame[_START] = perf_counter_ns()
+        return frame
+
+    def _exit(self, frame, rtn):
+        elapsed = perf_counter_ns() - frame[_START]
+        stack = self._stack
+        if not stack or stack[-1] is not frame:
+            # the frames above it were abandoned by an exception
+            self._unwind(frame)
+            return
+        stack.pop()
+        name = frame[_KEY]
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = MethodStats()
+        own = elapsed - frame[_CHILD_NS]
+        written = self._written - frame[_WRITTEN]
+        returned = len(rtn) if rtn.__class__ is str else 0
+        stats.calls += 1
+        stats.self_ns += own
+        stats.output += written - frame[_CHILD_WRITTEN] + returned - frame[_CHILD_RETURNED]
+        active = self._active
+        depth = active[name] - 1
+        active[name] = depth
+        if not depth:
+            stats.cumulative_ns += elapsed
+        self._path_ns[frame[_PATH]] += own
+        if stack:
+            parent = stack[-1]
+            parent[_CHILD_NS] += elapsed
+            parent[_CHILD_WRITTEN] += written
+            parent[_CHILD_RETURNED] += returned
+
+    def _unwind(self, frame):
+        """Drops a frame that raised, and those above it, without recording
+        them."""
+        stack = self._stack
+        for i in range(len(stack) - 1, -1, -1):
+            if stack[i] is frame:
+                break
+        else:
+            return
+        active = self._active
+        for f in stack[i:]:
+            active[f[_KEY]] -= 1
+        del stack[i:]
+
+    def _path(self, path):
+        names = []
+        path_names = self._path_names
+        while path:
+            path, name = path_names[path]
+            names.append(name)
+        names.reverse()
+        return names
+
+    def collapsed(self):
+        """Returns the self time of each stack of visit methods, in the
+        collapsed stack format of flamegraph.pl and speedscope, one
+        ``name;name;name nanoseconds`` line per stack.
+        """
+        lines = []
+        for path, ns in enumerate(self._path_ns):
+            if ns > 0:
+                lines.append(";".join(self._path(path)) + " " + str(ns))
+        lines.sort()
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def __str__(self):
+        lines = ["{:>9} {:>12} {:>12} {:>10}  {}".format(
+            "calls", "cumulative", "self", "output", "method")]
+        items = sorted(self.stats.items(), key=lambda item: -item[1].self_ns)
+        for name, s in items:
+            lines.append("{:>9} {:>10.6f} s {:>10.6f} s {:>10}  {}".format(
+                s.calls, s.cumulative_ns / 1e9, s.self_ns / 1e9, s.output, name))
+        return "\n".join(lines)
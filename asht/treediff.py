@@ -0,0 +1,291 @@
+"""Structural differences between node trees, and patching"""
+from difflib import SequenceMatcher
+
+from .nodes import Node, _MISSING
+
+
+class Edit:
+    """An edit of a node tree, as made by diff() and applied by patch().
+
+    A path is a tuple of the steps from the root of the tree to a place in
+    it, where each step is a field name or an index into a list field, such
+    as ``("body", 3, "test")``. The empty path is the root itself.
+
+    The edits of a list are made one after the other, so the indices of an
+    edit are those of the list as it is after the edits before it.
+
+    Attributes
+    ----------
+    op : str
+        "replace" sets the field, list item, or root at path to value;
+        "delete" deletes the field or list item at path; "insert" inserts
+        value into a list before the index at the end of path; "move" moves
+        the list item at path to the index at the end of to, which is in
+        the same list.
+    path : tuple
+    value : Node, list, or value
+    to : tuple or None
+    """
+
+    __slots__ = ("op", "path", "value", "to")
+
+    def __init__(self, op, path, value=None, to=None):
+        self.op = op
+        self.path = path
+        self.value = value
+        self.to = to
+
+    def __eq__(self, other):
+        if not isinstance(other, Edit):
+            return NotImplemented
+        return (self.op, self.path, self.to) == (other.op, other.path, other.to) \
+            and self.value == other.value
+
+    def __repr__(self):
+        args = [repr(self.op), repr(self.path)]
+        if self.value is not None:
+            args.append(repr(self.value))
+        if self.to is not None:
+            args.append("to=" + repr(self.to))
+        return "Edit(" + ", ".join(args) + ")"
+
+
+def _value_key(val):
+    # keyed by type as well, so that True and 1 are kept apart
+    return val if val.__class__ is str else (val.__class__, val)
+
+
+def _codes(tree, table):
+    """Numbers the subtrees of a node tree, bottom up, so that subtrees
+    with the same structure and values get the same number. The key of
+    each node, in the table, is made of its class name, its values, and
+    the numbers of its children, so this is linear in the size of the tree
+    and, unlike a digest, exact. Line and column numbers are not included.
+
+    Parameters
+    ----------
+    tree : Node
+    table : dict
+        Maps keys to numbers, and is shared by the trees to be compared.
+
+    Returns
+    -------
+    codes : dict
+        Maps the ids of the nodes to their numbers.
+    """
+    codes = {}
+    # a node is pushed twice, first alone, to push its children, and then
+    # with the values of its fields, to be numbered once they have been
+    stack = [tree]
+    push = stack.append
+    pop = stack.pop
+    setdefault = table.setdefault
+    str_ = str
+    while stack:
+        item = pop()
+        if item.__class__ is not tuple:
+            vals = [getattr(item, f, _MISSING) for f in item.fields]
+            push((item, vals))
+            for val in vals:
+                if isinstance(val, Node):
+                    push(val)
+                elif isinstance(val, (list, tuple)):
+                    for x in val:
+                        if isinstance(x, Node):
+                            push(x)
+            continue
+        node, vals = item
+        key = [node.__class__.__name__]
+        append = key.append
+        for val in vals:
+            cls = val.__class__
+            if cls is str_:
+                append(val)
+            elif isinstance(val, Node):
+                append(codes[id(val)])
+            elif isinstance(val, (list, tuple)):
+                append(tuple([codes[id(x)] if isinstance(x, Node) else _value_key(x)
+                              for x in val]))
+            elif val is _MISSING:
+                append(_MISSING)
+            else:
+                append((cls, val))
+        codes[id(node)] = setdefault(tuple(key), len(table))
+    return codes
+
+
+def _diff_list(u, v, path, da, db, edits, pairs):
+    """Adds the edits that turn the list u into the list v, and the pairs
+    of items that are kept but differ within, to be diffed in turn.
+    """
+    ku = [da[id(x)] if isinstance(x, Node) else _value_key(x) for x in u]
+    kv = [db[id(x)] if isinstance(x, Node) else _value_key(x) for x in v]
+    # only the middle, between the common prefix and suffix, is matched
+    lo = 0
+    n = min(len(u), len(v))
+    while lo < n and ku[lo] == kv[lo]:
+        lo += 1
+    hi_u = len(u)
+    hi_v = len(v)
+    while hi_u > lo and hi_v > lo and ku[hi_u - 1] == kv[hi_v - 1]:
+        hi_u -= 1
+        hi_v -= 1
+    if lo == hi_u and lo == hi_v:
+        return
+    # maps each item of the middle of v to the item of u that it is made from
+    matched = {}
+    blocks = []
+    matcher = SequenceMatcher(None, ku[lo:hi_u], kv[lo:hi_v], autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            for k in range(i2 - i1):
+                matched[lo + j1 + k] = lo + i1 + k
+        elif tag == "replace":
+            blocks.append((lo + i1, lo + i2, lo + j1, lo + j2))
+    # identical items that were removed from one place and added at
+    # another are moved
+    used = set(matched.values())
+    free = {}
+    for i in range(hi_u - 1, lo - 1, -1):
+        if i not in used:
+            free.setdefault(ku[i], []).append(i)
+    for j in range(lo, hi_v):
+        if j not in matched:
+            left = free.get(kv[j])
+            if left:
+                i = matched[j] = left.pop()
+                used.add(i)
+    # the rest of the items that were replaced are paired in order, and
+    # diffed within, if they are nodes of the same class
+    changed = []
+    for i1, i2, j1, j2 in blocks:
+        xs = [i for i in range(i1, i2) if i not in used]
+        ys = [j for j in range(j1, j2) if j not in matched]
+        for i, j in zip(xs, ys):
+            x = u[i]
+            y = v[j]
+            if (isinstance(x, Node) and isinstance(y, Node)
+                    and x.__class__.__name__ == y.__class__.__name__):
+                matched[j] = i
+                used.add(i)
+                changed.append((i, j))
+    for i in range(hi_u - 1, lo - 1, -1):
+        if i not in used:
+            edits.append(Edit("delete", path + (i,)))
+    # the items of u that are kept, in their order, which are put in the
+    # order of v by inserting and moving
+    order = [i for i in range(lo, hi_u) if i in used]
+    for j in range(lo, hi_v):
+        pos = j - lo
+        i = matched.get(j)
+        if i is None:
+            edits.append(Edit("insert", path + (j,), v[j]))
+            order.insert(pos, None)
+        elif order[pos] != i:
+            k = order.index(i, pos)
+            edits.append(Edit("move", path + (lo + k,), to=path + (j,)))
+            del order[k]
+            order.insert(pos, i)
+    for i, j in changed:
+        pairs.append((u[i], v[j], path + (j,)))
+
+
+def diff(a, b):
+    """Returns the edits that turn the node tree a into the node tree b.
+
+    All of the subtrees of both trees are hashed first, in linear time, by
+    numbering them so that identical subtrees have the same number. Then
+    subtrees with the same number are skipped without being compared, and
+    items of lists are matched by number, so that items that are kept, and
+    items that are moved, are not compared either. Only the nodes on the
+    paths to the changes are visited.
+
+    Line and column numbers are not compared.
+
+    Parameters
+    ----------
+    a, b : Node
+
+    Returns
+    -------
+    edits : list of Edit
+        The edits, in the order that they are to be applied by patch().
+        Nodes and values that are inserted or replaced are those of b,
+        not copies.
+    """
+    table = {}
+    da = _codes(a, table)
+    db = _codes(b, table)
+    edits = []
+    stack = [(a, b, ())]
+    while stack:
+        x, y, path = stack.pop()
+        if da[id(x)] == db[id(y)]:
+            continue
+        if x.__class__.__name__ != y.__class__.__name__:
+            edits.append(Edit("replace", path, y))
+            continue
+        for field in y.fields:
+            u = getattr(x, field, _MISSING)
+            v = getattr(y, field, _MISSING)
+            fpath = path + (field,)
+            if v is _MISSING:
+                if u is not _MISSING:
+                    edits.append(Edit("delete", fpath))
+            elif isinstance(u, Node) and isinstance(v, Node):
+                stack.append((u, v, fpath))
+            elif isinstance(u, (list, tuple)) and isinstance(v, (list, tuple)):
+                _diff_list(u, v, fpath, da, db, edits, stack)
+            elif u.__class__ is not v.__class__ or u != v:
+                edits.append(Edit("replace", fpath, v))
+    return edits
+
+
+def _resolve(tree, path):
+    obj = tree
+    for step in path:
+        obj = obj[step] if step.__class__ is int else getattr(obj, step)
+    return obj
+
+
+def patch(tree, edits):
+    """Applies the edits made by diff() to a node tree, in place.
+
+    Parameters
+    ----------
+    tree : Node
+    edits : iterable of Edit
+
+    Returns
+    -------
+    tree : Node
+        The patched tree, which is a new node only if the root was replaced.
+    """
+    for edit in edits:
+        op = edit.op
+        path = edit.path
+        if not path:
+            if op != "replace":
+                raise ValueError("cannot " + op + " the root of a tree")
+            tree = edit.value
+            continue
+        parent = _resolve(tree, path[:-1])
+        last = path[-1]
+        if op == "replace":
+            if last.__class__ is int:
+                parent[last] = edit.value
+            else:
+                setattr(parent, last, edit.value)
+        elif op == "delete":
+            if last.__class__ is int:
+                del parent[last]
+            else:
+                delattr(parent, last)
+        elif op == "insert":
+            parent.insert(last, edit.value)
+        elif op == "move":
+            item = parent.pop(last)
+            _resolve(tree, edit.to[:-1]).insert(edit.to[-1], item)
+        else:
+            raise ValueError("unknown edit: " + repr(op))
+    return tree
@@ -1,35 +1,464 @@
 """Node and dictionary visitors"""
+import ast
+import inspect
+import textwrap
+import weakref
+from types import GeneratorType
+
 from . import nodes
+from .nodes import TrackedList
 
 
 STDIN_DICT = {"StdIn": {}}
 STDOUT_DICT = {"StdOut": {}}
 STDERR_DICT = {"StdErr": {}}
 
-class NodeVisitor:
-    """Base node visitor class"""
+# the asht.profiling.Profile that is active, if any, whose methods are
+# wrapped around the visit methods that are bound while it is
+_profiler = None
+
+# the direct variants of visit functions, for visiting nodes and for being
+# delegated to, or None for those that have none, see _direct_func()
+_DIRECT_FUNCS = weakref.WeakKeyDictionary()
+_DIRECT_HELPERS = weakref.WeakKeyDictionary()
+# the prefix of the names of the bound direct variants of the methods that
+# direct variants delegate to, see Visitor.__getattr__()
+_DIRECT_PREFIX = "_direct_"
+
+# the code that the body of the direct variant of a visit method is put in,
+# which hands the node to the explicit stack if it is too deep
+_DIRECT_PROLOGUE = """
+if self._direct_depth >= self.max_direct_depth:
+    return self._visit_deeper(node)
+self._direct_depth += 1
+try:
+    pass
+finally:
+    self._direct_depth -= 1
+"""
+
+
+class _Direct(ast.NodeTransformer):
+    """Rewrites the body of a visit generator function so that it visits
+    the children that it would yield with calls instead.
+    """
+
+    def __init__(self, self_name):
+        self.self_name = self_name
+
+    def _attr(self, name):
+        return ast.Attribute(ast.Name(self.self_name, ast.Load()), name, ast.Load())
+
+    def visit_Yield(self, node):
+        value = ast.Constant(None) if node.value is None else self.visit(node.value)
+        call = ast.Call(self._attr("_visit_direct"), [value], [])
+        return ast.copy_location(call, node)
+
+    def visit_YieldFrom(self, node):
+        value = self.visit(node.value)
+        func = value.func if isinstance(value, ast.Call) else None
+        if (isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name)
+                and func.value.id == self.self_name):
+            # delegating to another method, such as _block()
+            call = ast.Call(self._attr(_DIRECT_PREFIX + func.attr), value.args, value.keywords)
+        else:
+            call = ast.Call(self._attr("_visit_from"), [value], [])
+        return ast.copy_location(call, node)
+
+    def _nested(self, node):
+        # the yields of nested functions are their own
+        return node
+
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_Lambda = visit_ClassDef = _nested
+
+
+def _derive_direct(func, node):
+    code = func.__code__
+    if code.co_freevars:
+        # such as the __class__ cell of zero argument super()
+        return None
+    try:
+        tree = ast.parse(textwrap.dedent(inspect.getsource(func)))
+    except (OSError, TypeError, SyntaxError):
+        return None
+    fdef = tree.body[0] if len(tree.body) == 1 else None
+    if not (isinstance(fdef, ast.FunctionDef) and fdef.name == code.co_name
+            and not fdef.decorator_list and len(fdef.args.args) >= 1 + node):
+        return None
+    args = fdef.args
+    body = [_Direct(args.args[0].arg).visit(stmt) for stmt in fdef.body]
+    if node:
+        prologue = ast.parse(_DIRECT_PROLOGUE.replace("self", args.args[0].arg)
+                             .replace("node", args.args[1].arg)).body
+        prologue[-1].body = body
+        body = prologue
+    fdef.body = body
+    # the defaults are taken from func, rather than evaluated again
+    args.defaults = []
+    args.kw_defaults = [None] * len(args.kwonlyargs)
+    ast.fix_missing_locations(tree)
+    ast.increment_lineno(tree, code.co_firstlineno - 1)
+    ns = {}
+    exec(compile(tree, code.co_filename, "exec"), func.__globals__, ns)
+    direct = ns[fdef.name]
+    direct.__defaults__ = func.__defaults__
+    direct.__kwdefaults__ = func.__kwdefaults__
+    direct.__qualname__ = func.__qualname__
+    direct.__doc__ = func.__doc__
+    return direct
+
+
+def _direct_func(func, node=True):
+    """Returns the direct variant of a visit function: a plain function
+    that does what the function does, but visits the children that it
+    would yield, and runs the methods that it would delegate to, with
+    recursive calls. Functions that are not generators are their own
+    direct variants. Returns None if the variant cannot be derived, such
+    as when the source of the function is not available.
+
+    The variant is compiled from the source of the function, with each
+    ``yield x`` replaced by ``self._visit_direct(x)`` and each
+    ``yield from self.f(...)`` by ``self._direct_f(...)``. If node is
+    true, the variant is that of a visit method, which visits the node
+    with the explicit stack instead once the tree is too deep.
+    """
+    funcs = _DIRECT_FUNCS if node else _DIRECT_HELPERS
+    try:
+        return funcs[func]
+    except KeyError:
+        pass
+    except TypeError:
+        return None
+    code = getattr(func, "__code__", None)
+    if code is None:
+        direct = None
+    elif not code.co_flags & inspect.CO_GENERATOR:
+        direct = func
+    else:
+        direct = _derive_direct(func, node)
+    funcs[func] = direct
+    return direct
+
+
+class Visitor:
+    """Base visitor class, which dispatches to visit_<kind>() methods.
+
+    The method that visits each kind is resolved once per visitor subclass,
+    the first time that kind is seen, and is bound once per visitor into a
+    kind-to-method table. Methods that are added to a visitor class after
+    it has been used will therefore not be seen by existing visitors.
+
+    A visit method that does not need to visit children simply returns
+    its result. A visit method that does is written as a generator: it
+    yields each child (or a list or tuple of children) and receives the
+    child's result (or a list of results) back from the yield. Code before
+    the first yield runs in pre-order, code after the last yield runs in
+    post-order, and the generator's return value is the result for the
+    node. For example::
+
+        def visit_And(self, node):
+            lhs = yield node.lhs
+            rhs = yield node.rhs
+            return lhs + " && " + rhs
+
+    Other visit methods may be delegated to with ``yield from``.
+
+    The nodes of the top max_direct_depth levels of a tree are visited
+    with recursive calls of the direct variants of their visit methods,
+    which are compiled from their source (see _direct_func()), since
+    driving a generator costs several times as much as a call. Deeper
+    subtrees, and nodes whose visit methods have no direct variant, are
+    visited by driving the generators with an explicit stack instead, so
+    that arbitrarily deep trees may be visited without hitting the
+    recursion limit.
+    """
+
+    # the depth of nodes below which the explicit stack takes over
+    max_direct_depth = 50
+
+    _visit_funcs = {}
+    _table = None
+    _direct_table = None
+    # the depth of the node being visited with recursive calls
+    _direct_depth = 0
 
     def __init__(self, root=None):
         """
         Parameters
         ----------
-        node : Node or None
+        root : tree or None
         """
         self.root = root
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._visit_funcs = {}
+
+    @staticmethod
+    def _kind_name(kind):
+        """Returns the name of a kind, as used in visit_<name>()."""
+        raise NotImplementedError
+
+    @staticmethod
+    def _kind_of(tree):
+        """Returns the kind of a tree, which is used to key the table."""
+        raise NotImplementedError
+
+    @classmethod
+    def _resolve(cls, kind):
+        """Returns the unbound visit function for a kind."""
+        funcs = cls._visit_funcs
+        func = funcs.get(kind)
+        if func is None:
+            func = getattr(cls, "visit_" + cls._kind_name(kind), cls.visit_default)
+            funcs[kind] = func
+        return func
+
+    def _wrap_method(self, kind, meth):
+        """Returns a bound visit method for a kind as it is put in a table,
+        which subclasses may wrap."""
+        if _profiler is not None:
+            meth = _profiler._wrap(self, kind, meth)
+        return meth
+
+    def _bind(self, kind):
+        """Adds the bound visit method for a kind to the table and returns it."""
+        table = self._table
+        if table is None:
+            table = self._table = {}
+        meth = self._resolve(kind).__get__(self, type(self))
+        meth = table[kind] = self._wrap_method(kind, meth)
+        return meth
+
+    def _bind_direct(self, kind):
+        """Adds the bound direct variant of the visit method for a kind to
+        the direct table and returns it. Kinds whose visit methods have no
+        direct variant are visited with the explicit stack."""
+        table = self._direct_table
+        if table is None:
+            table = self._direct_table = {}
+        if kind is list or kind is tuple or kind is TrackedList:
+            meth = self._visit_list
+        else:
+            direct = _direct_func(self._resolve(kind))
+            if direct is None:
+                meth = self._visit_deep
+            else:
+                meth = self._wrap_method(kind, direct.__get__(self, type(self)))
+        table[kind] = meth
+        return meth
+
+    def _visit_direct(self, tree):
+        """Visits a tree, or a list or tuple of trees, with the direct
+        variant of its visit method. Direct variants visit their children
+        with this method."""
+        cls = tree.__class__
+        if cls is list or cls is tuple or cls is TrackedList:
+            return self._visit_list(tree)
+        kind = self._kind_of(tree)
+        try:
+            meth = self._direct_table[kind]
+        except (KeyError, TypeError):
+            # TypeError is raised when the table has not been created yet.
+            meth = self._bind_direct(kind)
+        rtn = meth(tree)
+        if rtn.__class__ is GeneratorType:
+            # returned by a visit method that is not a generator itself
+            rtn = self._drive_direct(rtn)
+        return rtn
+
+    def _visit_list(self, trees):
+        return list(map(self._visit_direct, trees))
+
+    def _visit_deep(self, tree):
+        """Visits a tree with the explicit stack."""
+        kind = self._kind_of(tree)
+        try:
+            meth = self._table[kind]
+        except (KeyError, TypeError):
+            meth = self._bind(kind)
+        rtn = meth(tree)
+        if rtn.__class__ is GeneratorType:
+            rtn = self._run(rtn)
+        return rtn
+
+    def _visit_deeper(self, node):
+        """Visits a node that its direct variant found too deep with the
+        explicit stack. Its own visit method is not wrapped again, since
+        the variant was."""
+        rtn = self._resolve(self._kind_of(node)).__get__(self, type(self))(node)
+        if rtn.__class__ is GeneratorType:
+            rtn = self._run(rtn)
+        return rtn
+
+    def _drive_direct(self, gen):
+        """Drives a generator that a visit method returned, as that of a
+        node one level deeper."""
+        depth = self._direct_depth
+        if depth >= self.max_direct_depth:
+            return self._run(gen)
+        self._direct_depth = depth + 1
+        try:
+            return self._visit_from(gen)
+        finally:
+            self._direct_depth = depth
+
+    def _visit_from(self, gen):
+        """Drives a visit generator, visiting the children that it yields
+        with _visit_direct(), and returns its result."""
+        visit = self._visit_direct
+        value = None
+        while True:
+            try:
+                child = gen.send(value)
+            except StopIteration as stop:
+                return stop.value
+            value = visit(child)
+
+    def __getattr__(self, name):
+        # only called for attributes that are not set, such as the bound
+        # direct variants of methods, which are then kept on the instance
+        if not name.startswith(_DIRECT_PREFIX):
+            raise AttributeError(
+                repr(type(self).__name__) + " object has no attribute " + repr(name)
+            )
+        meth = getattr(self, name[len(_DIRECT_PREFIX):])
+        direct = _direct_func(meth.__func__, False) if inspect.ismethod(meth) else None
+        if direct is None:
+            def direct(*args, **kwargs):
+                return self._visit_from(meth(*args, **kwargs))
+        else:
+            direct = direct.__get__(self, type(self))
+        setattr(self, name, direct)
+        return direct
+
+    def _run(self, gen):
+        """Drives a visit generator, and those of all of the nodes that it
+        yields, to completion with an explicit stack. Returns the result
+        of the outermost generator.
+
+        The stack holds the generators that are waiting on the results of
+        their children, and (results, iterator) pairs for lists of children
+        that are partway through being visited. Children whose visit
+        methods are not generators are visited without touching the stack.
+        """
+        table = self._table
+        if table is None:
+            table = self._table = {}
+        bind = self._bind
+        kind_of = self._kind_of
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        value = None
+        while True:
+            try:
+                child = gen.send(value)
+            except StopIteration as stop:
+                if not stack:
+                    return stop.value
+                value = stop.value
+                frame = pop()
+                if frame.__class__ is GeneratorType:
+                    gen = frame
+                    continue
+                # the finished generator was an element of a list of children
+                results, items = frame
+                results.append(value)
+            else:
+                cls = child.__class__
+                if cls is not list and cls is not tuple and cls is not TrackedList:
+                    kind = kind_of(child)
+                    try:
+                        meth = table[kind]
+                    except KeyError:
+                        meth = bind(kind)
+                    value = meth(child)
+                    if value.__class__ is GeneratorType:
+                        push(gen)
+                        gen = value
+                        value = None
+                    continue
+                push(gen)
+                results = []
+                items = iter(child)
+            # visit the rest of a list of children, until one needs a generator
+            for item in items:
+                kind = kind_of(item)
+                try:
+                    meth = table[kind]
+                except KeyError:
+                    meth = bind(kind)
+                value = meth(item)
+                if value.__class__ is GeneratorType:
+                    push((results, items))
+                    gen = value
+                    value = None
+                    break
+                results.append(value)
+            else:
+                value = results
+                gen = pop()
+
+    def visit(self, tree=None):
+        """Visit the tree"""
+        return self._visit_direct(self.root if tree is None else tree)
+
+
+class NodeVisitor(Visitor):
+    """Base node visitor class"""
+
+    _kind_of = staticmethod(type)
+
+    @staticmethod
+    def _kind_name(kind):
+        return kind.__name__
+
     def visit(self, node=None):
         """Visit the tree or node"""
-        node = self.root if node is None else node
-        meth_name = "visit_" + node.__class__.__name__
-        meth = getattr(self, meth_name, self.visit_default)
+        return self._visit_direct(self.root if node is None else node)
+
+    def _visit_direct(self, node):
+        # lists are in the direct table too, since the kind is the class
+        try:
+            meth = self._direct_table[node.__class__]
+        except (KeyError, TypeError):
+            # TypeError is raised when the table has not been created yet.
+            meth = self._bind_direct(node.__class__)
         rtn = meth(node)
+        if rtn.__class__ is GeneratorType:
+            # returned by a visit method that is not a generator itself
+            rtn = self._drive_direct(rtn)
         return rtn
 
     def visit_default(self, node):
         raise NotImplementedError(
             self.__class__.__name__ +
             " does not implement visit_default() or visit_" +
+            node.__class__.__name__ +
+            "()."
+        )
+
+
+def _first_key(dct):
+    for key in dct:
+        return key
+
+
+class DictVisitor(Visitor):
+    """Base dict visitor class"""
+
+    _kind_of = staticmethod(_first_key)
+
+    @staticmethod
+    def _kind_name(kind):
+        return kind
+
+    def visit_default(self, dct):
+        raise NotImplementedError(
             self.__class__.__name__ +
+            " does not implement visit_default() or visit_" +
+            next(iter(dct)) +
             "()."
         )
 
@@ -38,13 +467,13 @@ class NodeToDict(NodeVisitor):
     """Creates a dictionary representation of nodes."""
 
     def visit_Script(self, node):
-        return {"Script": {"body": list(map(self.visit, node.body))}}
+        return {"Script": {"body": (yield node.body)}}
 
     def visit_Comment(self, node):
         return {"Comment": {"value": node.value}}
 
     def visit_String(self, node):
-        return {"String": {"parts": list(map(self.visit, node.parts))}}
+        return {"String": {"parts": (yield node.parts)}}
 
     def visit_RawString(self, node):
         return {"RawString": {"value": node.value}}
@@ -66,39 +495,42 @@ class NodeToDict(NodeVisitor):
 
     def visit_Command(self, node):
         return {"Command": {
-            "args": list(map(self.visit, node.args)),
-            "stdin": self.visit(node.stdin),
-            "stdout": self.visit(node.stdout),
-            "stderr": self.visit(node.stderr),
+            "args": (yield node.args),
+            "stdin": (yield node.stdin),
+            "stdout": (yield node.stdout),
+            "stderr": (yield node.stderr),
             "background": node.background,
         }}
 
+    def visit_CapturedCommand(self, node):
+        return {"CapturedCommand": (yield from self.visit_Command(node))["Command"]}
+
     def visit_BinOp(self, node):
         return {node.__class__.__name__: {
-            "lhs": node.lhs,
-            "rhs": node.rhs,
+            "lhs": (yield node.lhs),
+            "rhs": (yield node.rhs),
         }}
 
     visit_And = visit_BinOp
     visit_Or = visit_BinOp
 
     def visit_Not(self, node):
-        return {"Not": {"node": self.visit(node)}}
+        return {"Not": {"node": (yield node.node)}}
 
     def visit_Statement(self, node):
-        return {"Statement": {"node": self.visit(node)}}
+        return {"Statement": {"node": (yield node.node)}}
 
     def visit_Assign(self, node):
         return {"Assign": {
             "name": node.name,
-            "value": self.visit(node.value),
+            "value": (yield node.value),
             "scope": node.scope,
         }}
 
     def visit_EnvAssign(self, node):
         return {"EnvAssign": {
             "name": node.name,
-            "value": self.visit(node.value),
+            "value": (yield node.value),
         }}
 
     def visit_Delete(self, node):
@@ -107,58 +539,191 @@ class NodeToDict(NodeVisitor):
     def visit_EnvDelete(self, node):
         return {"EnvDelete": {"name": node.name}}
 
+    def visit_AliasAssign(self, node):
+        return {"AliasAssign": {
+            "name": node.name,
+            "value": (yield node.value),
+        }}
+
+    def visit_AliasDelete(self, node):
+        return {"AliasDelete": {"name": node.name}}
+
     def visit_Pass(self, node):
         return {"Pass": {}}
 
     def visit_If(self, node):
         return {"If": {
-            "test": self.visit(node.test),
-            "body": list(map(self.visit, node.body)),
-            "orelse": list(map(self.visit, node.orelse)),
+            "test": (yield node.test),
+            "body": (yield node.body),
+            "orelse": (yield node.orelse),
         }}
 
     def visit_For(self, node):
         return {"For": {
-            "target": self.visit(node.target),
-            "iter": self.visit(node.iter),
-            "body": list(map(self.visit, node.body)),
+            "target": (yield node.target),
+            "iter": (yield node.iter),
+            "body": (yield node.body),
         }}
 
+    def visit_Function(self, node):
+        return {"Function": {
+            "name": node.name,
+            "body": (yield node.body),
+        }}
 
-class DictVisitor:
-    """Base dict visitor class"""
 
-    def __init__(self, root=None):
-        """
-        Parameters
-        ----------
-        root : dict or None
-        """
-        self.root = root
+class NodeToFrozen(NodeVisitor):
+    """Creates a frozen copy of a node tree, optionally with its nodes
+    interned.
 
-    def visit(self, dct=None):
-        """Visit the tree or dict"""
-        dct = self.root if dct is None else dct
-        meth_name = "visit_" + next(iter(dct))
-        meth = getattr(self, meth_name, self.visit_default)
-        rtn = meth(dct)
-        return rtn
+    Parameters
+    ----------
+    root : node or None
+    interner : nodes.Interner or None
+        The interner to share identical nodes with, if any.
+    """
 
-    def visit_default(self, dct):
-        raise NotImplementedError(
-            self.__class__.__name__ +
-            " does not implement visit_default() or visit_" +
-            next(iter(dct)) +
-            "()."
+    def __init__(self, root=None, interner=None):
+        self.root = root
+        self.interner = interner
+
+    def visit_default(self, node):
+        if node._frozen and self.interner is None:
+            return node
+        args = []
+        for field in node.fields:
+            val = getattr(node, field, nodes._MISSING)
+            if isinstance(val, nodes.Node):
+                val = yield val
+            elif isinstance(val, (list, tuple)):
+                val = tuple((yield val))
+            args.append(val)
+        node = nodes.frozen(node.__class__)(
+            *args, lineno=node.lineno, column=node.column)
+        if self.interner is not None:
+            node = self.interner.intern(node)
+        return node
+
+
+class LazyNode(nodes.Node):
+    """Base class of the lazy variants of node classes, which are created
+    with lazy(). A lazy node is a view of the dict tree that it was made
+    from. Its fields that hold child nodes are converted from the dict only
+    when they are first accessed, and are then kept, so that only the parts
+    of a large dict tree that are looked at are ever converted. Lazy nodes
+    compare equal to eager nodes, and format the same way.
+    """
+
+    _lazy = True
+    # the eager node class that a lazy node class is a variant of
+    _eager = nodes.Node
+
+    def __getattr__(self, name):
+        # only called for fields that have not been set yet
+        if name in self.attrs:
+            try:
+                val = self._dct[name]
+            except KeyError:
+                pass
+            else:
+                val = _lazy_value(val)
+                setattr(self, name, val)
+                return val
+        raise AttributeError(
+            repr(self.__class__.__name__) + " object has no attribute " + repr(name)
         )
 
 
+_LAZY_CLASSES = {}
+
+# fields that DictToNode fills in when they are not in the dict
+_DICT_DEFAULTS = {("If", "orelse"): list}
+
+
+def lazy(cls):
+    """Returns the lazy variant of a node class. This is a subclass that
+    has the same name, so that visitors dispatch on it in the same way.
+    """
+    if cls._lazy:
+        return cls
+    try:
+        return _LAZY_CLASSES[cls]
+    except KeyError:
+        pass
+    namespace = {
+        "__slots__": ("_dct",),
+        "attrs": cls.fields,
+        "__module__": cls.__module__,
+        "__qualname__": "lazy(" + cls.__qualname__ + ")",
+        "__doc__": cls.__doc__,
+        "__reduce__": nodes._reduce,
+        "_eager": cls,
+    }
+    lazy_cls = nodes.NodeMeta(cls.__name__, (LazyNode, cls), namespace)
+    _LAZY_CLASSES[cls] = lazy_cls
+    return lazy_cls
+
+
+def _lazy_node(dct):
+    """Creates a lazy node from a dict tree, setting only the fields that
+    do not hold child nodes.
+    """
+    name = _first_key(dct)
+    cls = getattr(nodes, name, None)
+    if not (isinstance(cls, type) and issubclass(cls, nodes.Node)):
+        # let the eager visitor raise the error
+        return DictToNode().visit(dct)
+    attrs = dct[name]
+    lazy_cls = lazy(cls)
+    node = lazy_cls.__new__(lazy_cls)
+    node._dct = attrs
+    defaults = cls._defaults
+    node.lineno = defaults["lineno"]
+    node.column = defaults["column"]
+    for field in cls.fields:
+        if field in attrs:
+            val = attrs[field]
+            if val.__class__ is not dict and val.__class__ is not list:
+                setattr(node, field, val)
+        elif field in defaults:
+            setattr(node, field, defaults[field])
+        elif (name, field) in _DICT_DEFAULTS:
+            setattr(node, field, _DICT_DEFAULTS[name, field]())
+    return node
+
+
+def _lazy_value(val):
+    if val.__class__ is list:
+        return [_lazy_node(x) for x in val]
+    elif val.__class__ is dict:
+        return _lazy_node(val)
+    return val
+
+
 class DictToNode(DictVisitor):
-    """Creates a node tree representation from a dict"""
+    """Creates a node tree representation from a dict
+
+    Parameters
+    ----------
+    root : dict or None
+    lazy : bool
+        If true, visit() returns a lazy node, whose children are converted
+        from the dict only when they are accessed. See LazyNode.
+    """
+
+    def __init__(self, root=None, lazy=False):
+        self.root = root
+        self.lazy = lazy
+
+    def visit(self, tree=None):
+        """Visit the tree"""
+        if self.lazy:
+            return _lazy_node(self.root if tree is None else tree)
+        return super().visit(tree)
 
     def visit_Script(self, dct):
         return nodes.Script(
-            body=list(map(self.visit, dct["Script"]["body"])),
+            body=(yield dct["Script"]["body"]),
         )
 
     def visit_Comment(self, dct):
@@ -166,7 +731,7 @@ class DictToNode(DictVisitor):
 
     def visit_String(self, dct):
         return nodes.String(
-            parts=list(map(self.visit, dct["String"]["parts"])),
+            parts=(yield dct["String"]["parts"]),
         )
 
     def visit_RawString(self, dct):
@@ -188,43 +753,46 @@ class DictToNode(DictVisitor):
         return nodes.StdErr()
 
     def visit_Command(self, dct):
-        attrs = dct["Command"]
+        name, attrs = next(iter(dct.items()))
+        cls = getattr(nodes, name, nodes.Command)
         kwargs = {}
         if "stdin" in attrs:
-            kwargs["stdin"] = self.visit(attrs["stdin"])
+            kwargs["stdin"] = (yield attrs["stdin"])
         if "stdout" in attrs:
-            kwargs["stdout"] = self.visit(attrs["stdout"])
+            kwargs["stdout"] = (yield attrs["stdout"])
         if "stderr" in attrs:
-            kwargs["stderr"] = self.visit(attrs["stdout"])
+            kwargs["stderr"] = (yield attrs["stderr"])
         if "background" in attrs:
-            kwargs["background"] = self.visit(attrs["background"])
-        return nodes.Command(
-            args=list(map(self.visit, attrs["args"])),
+            kwargs["background"] = attrs["background"]
+        return cls(
+            args=(yield attrs["args"]),
             **kwargs
         )
 
+    visit_CapturedCommand = visit_Command
+
     def visit_BinOp(self, dct):
         name, attrs = next(iter(dct.items()))
         cls = getattr(nodes, name, nodes.BinOp)
         return cls(
-            lhs=self.visit(attrs["lhs"]),
-            rhs=self.visit(attrs["rhs"]),
+            lhs=(yield attrs["lhs"]),
+            rhs=(yield attrs["rhs"]),
         )
 
     visit_And = visit_BinOp
     visit_Or = visit_BinOp
 
     def visit_Not(self, dct):
-        return nodes.Not(node=self.visit(dct["Not"]["node"]))
+        return nodes.Not(node=(yield dct["Not"]["node"]))
 
     def visit_Statement(self, dct):
-        return nodes.Statement(node=self.visit(dct["Statement"]["node"]))
+        return nodes.Statement(node=(yield dct["Statement"]["node"]))
 
     def visit_Assign(self, dct):
         attrs = dct["Assign"]
         return nodes.Assign(
             name=attrs["name"],
-            value=self.visit(attrs["value"]),
+            value=(yield attrs["value"]),
             scope=attrs["scope"],
         )
 
@@ -232,14 +800,24 @@ class DictToNode(DictVisitor):
         attrs = dct["EnvAssign"]
         return nodes.EnvAssign(
             name=attrs["name"],
-            value=self.visit(attrs["value"]),
+            value=(yield attrs["value"]),
         )
 
     def visit_Delete(self, dct):
-        return nodes.Delete(name=self.visit(dct["Delete"]["name"]))
+        return nodes.Delete(name=dct["Delete"]["name"])
 
     def visit_EnvDelete(self, dct):
-        return nodes.EnvDelete(name=self.visit(dct["EnvDelete"]["name"]))
+        return nodes.EnvDelete(name=dct["EnvDelete"]["name"])
+
+    def visit_AliasAssign(self, dct):
+        attrs = dct["AliasAssign"]
+        return nodes.AliasAssign(
+            name=attrs["name"],
+            value=(yield attrs["value"]),
+        )
+
+    def visit_AliasDelete(self, dct):
+        return nodes.AliasDelete(name=dct["AliasDelete"]["name"])
 
     def visit_Pass(self, dct):
         return nodes.Pass()
@@ -247,15 +825,22 @@ class DictToNode(DictVisitor):
     def visit_If(self, dct):
         attrs = dct["If"]
         return nodes.If(
-            test=self.visit(attrs["test"]),
-            body=list(map(self.visit, attrs["body"])),
-            orelse=list(map(self.visit, attrs["orelse"])),
+            test=(yield attrs["test"]),
+            body=(yield attrs["body"]),
+            orelse=(yield attrs.get("orelse", [])),
         )
 
     def visit_For(self, dct):
         attrs = dct["For"]
         return nodes.For(
-            target=self.visit(attrs["target"]),
-            iter=self.visit(attrs["iter"]),
-            body=list(map(self.visit, attrs["body"])),
+            target=(yield attrs["target"]),
+            iter=(yield attrs["iter"]),
+            body=(yield attrs["body"]),
+        )
+
+    def visit_Function(self, dct):
+        attrs = dct["Function"]
+        return nodes.Function(
+            name=attrs["name"],
+            body=(yield attrs["body"]),
         )
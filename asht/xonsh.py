@@ -1,19 +1,26 @@
 """Xonsh tools."""
-from .nodes import Node
-from .visitors import DictVisitor, STDIN_DICT, STDOUT_DICT, STDERR_DICT, NodeToDict
+from .nodes import Node, StdIn, StdOut, StdErr, If, Var, EnvVar
+from .visitors import NodeVisitor, DictVisitor, STDIN_DICT, STDOUT_DICT, STDERR_DICT
+from .emitters import Emitter
 
 
-class ToXonshFromDict(DictVisitor):
+_BOOL_OPS = {"And": " and ", "Or": " or "}
+
+
+class ToXonshFromDict(Emitter, DictVisitor):
     """Converts dict tree to Xonsh code."""
 
+    shell = "xonsh"
+    indent = "    "
+
     def visit_Script(self, dct):
-        return "".join(map(self.visit, dct["Script"]["body"]))
+        yield from self._statements(dct["Script"]["body"])
 
     def visit_Comment(self, dct):
-        return "# " + dct["Comment"]["value"] + "\n"
+        self.line("# " + dct["Comment"]["value"])
 
     def visit_String(self, dct):
-        s = '"' + "".join(map(self.visit, dct["String"]["parts"])) + '"'
+        s = '"' + "".join((yield dct["String"]["parts"])) + '"'
         return s
 
     def visit_RawString(self, dct):
@@ -27,73 +34,69 @@ class ToXonshFromDict(DictVisitor):
 
     def visit_Command(self, dct):
         attrs = next(iter(dct.values()))
-        s = " ".join(map(self.visit, attrs["args"]))
+        s = " ".join((yield attrs["args"]))
         if "stderr" in attrs and attrs["stderr"] != STDERR_DICT:
-            s += " e> " + self.visit(attrs["stderr"])
+            s += " e> " + (yield attrs["stderr"])
         if "stdout" in attrs and attrs["stdout"] != STDOUT_DICT:
-            s += " > " + self.visit(attrs["stdout"])
+            s += " > " + (yield attrs["stdout"])
         if "stdin" in attrs and attrs["stdin"] != STDIN_DICT:
-            s += " < " + self.visit(attrs["stdin"])
+            s += " < " + (yield attrs["stdin"])
         if "background" in attrs and attrs["background"]:
             s += " &"
         return "![" + s + "]"
 
     def visit_CapturedCommand(self, dct):
-        return "$(" + self.visit_Command(dct)[2:-1] + ")"
+        return "$(" + (yield from self.visit_Command(dct))[2:-1] + ")"
 
     def visit_And(self, dct):
-        s = self.visit(dct["And"]["lhs"]) + " and " + self.visit(dct["And"]["rhs"])
-        return s
+        return (yield from self._chain(dct, _BOOL_OPS))
 
-    def visit_Or(self, dct):
-        s = self.visit(dct["Or"]["lhs"]) + " or " + self.visit(dct["Or"]["rhs"])
-        return s
+    visit_Or = visit_And
 
     def visit_Not(self, dct):
-        return "not " + self.visit(dct["Not"]["node"])
+        return "not " + (yield dct["Not"]["node"])
 
     def visit_Statement(self, dct):
-        return self.visit(dct["Statement"]["node"]) + "\n"
+        self.line((yield dct["Statement"]["node"]))
 
     def visit_Assign(self, dct):
         attrs = dct["Assign"]
-        return attrs["name"] + " = " + self.visit(attrs["value"]) + "\n"
+        self.line(attrs["name"] + " = " + (yield attrs["value"]))
 
     def visit_Delete(self, dct):
-        return "del " + dct["Delete"]["name"] + "\n"
+        self.line("del " + dct["Delete"]["name"])
 
     def visit_EnvAssign(self, dct):
         attrs = dct["EnvAssign"]
-        s = "$" + attrs["name"] + " = " + self.visit(attrs["value"]) + "\n"
-        return s
+        self.line("$" + attrs["name"] + " = " + (yield attrs["value"]))
 
     def visit_EnvDelete(self, dct):
-        return "del $" + dct["EnvDelete"]["name"] + "\n"
+        self.line("del $" + dct["EnvDelete"]["name"])
 
     def visit_AliasAssign(self, dct):
         attrs = dct["AliasAssign"]
-        s = 'aliases["' + attrs["name"] + '"] = ' + self.visit(attrs["value"]) + "\n"
-        return s
+        self.line('aliases["' + attrs["name"] + '"] = ' + (yield attrs["value"]))
 
     def visit_AliasDelete(self, dct):
-        return 'del aliases["' + dct["AliasDelete"]["name"] + '"]\n'
+        self.line('del aliases["' + dct["AliasDelete"]["name"] + '"]')
 
     def visit_Pass(self, dct):
-        return "pass\n"
+        self.line("pass")
 
     def visit_If(self, dct):
         attrs = dct["If"]
-        s = "if " + self.visit(attrs["test"]) + ":\n"
-        s += "    " + "    ".join(map(self.visit, attrs["body"]))
+        line = self.line
+        line("if " + (yield attrs["test"]) + ":")
+        yield from self._block(attrs["body"])
         orelse = attrs.get("orelse", None)
-        if not orelse:
-            pass
-        elif len(orelse) == 1 and next(iter(orelse[0].keys())) == "If":
-            s += "el" + self.visit_If(orelse[0])
-        else:
-            s += "else:\n"
-            s += "    " + "    ".join(map(self.visit, orelse))
-        return s
+        while orelse and len(orelse) == 1 and next(iter(orelse[0].keys())) == "If":
+            attrs = orelse[0]["If"]
+            line("elif " + (yield attrs["test"]) + ":")
+            yield from self._block(attrs["body"])
+            orelse = attrs.get("orelse", None)
+        if orelse:
+            line("else:")
+            yield from self._block(orelse)
 
     def visit_For(self, dct):
         attrs = dct["For"]
@@ -106,21 +109,134 @@ class ToXonshFromDict(DictVisitor):
         else:
             raise ValueError("For loop must assign to a variable name (Var)"
                              "or environment variable name (EnvVar).")
-        s = "for " + target_assign + " in "
-        s += self.visit(attrs["iter"]) + ":\n"
-        s += "    " + "    ".join(map(self.visit, attrs["body"]))
-        return s
+        self.line("for " + target_assign + " in " + (yield attrs["iter"]) + ":")
+        yield from self._block(attrs["body"])
 
     def visit_Function(self, dct):
-        s = "def " + dct["Function"]["name"] + "():\n"
-        s += "    " + "    ".join(map(self.visit, dct["Function"]["body"]))
-        return s
+        self.line("def " + dct["Function"]["name"] + "():")
+        yield from self._block(dct["Function"]["body"])
+
+
+class ToXonsh(Emitter, NodeVisitor):
+    """Converts node tree to Xonsh code directly, without an intermediate
+    dict tree. The output is identical to that of ToXonshFromDict.
+    """
+
+    shell = "xonsh"
+    indent = "    "
+
+    def visit_Script(self, node):
+        yield from self._statements(node.body)
+
+    def visit_Comment(self, node):
+        self.line("# " + node.value)
+
+    def visit_String(self, node):
+        return '"' + "".join((yield node.parts)) + '"'
+
+    def visit_RawString(self, node):
+        return node.value
+
+    def visit_Var(self, node):
+        return node.name
+
+    def visit_EnvVar(self, node):
+        return "$" + node.name
+
+    def visit_Command(self, node):
+        s = " ".join((yield node.args))
+        if not isinstance(node.stderr, StdErr):
+            s += " e> " + (yield node.stderr)
+        if not isinstance(node.stdout, StdOut):
+            s += " > " + (yield node.stdout)
+        if not isinstance(node.stdin, StdIn):
+            s += " < " + (yield node.stdin)
+        if node.background:
+            s += " &"
+        return "![" + s + "]"
+
+    def visit_CapturedCommand(self, node):
+        return "$(" + (yield from self.visit_Command(node))[2:-1] + ")"
+
+    def visit_And(self, node):
+        return (yield from self._chain(node, _BOOL_OPS))
+
+    visit_Or = visit_And
+
+    def visit_Not(self, node):
+        return "not " + (yield node.node)
+
+    def visit_Statement(self, node):
+        self.line((yield node.node))
+
+    def visit_Assign(self, node):
+        self.line(node.name + " = " + (yield node.value))
+
+    def visit_Delete(self, node):
+        self.line("del " + node.name)
+
+    def visit_EnvAssign(self, node):
+        self.line("$" + node.name + " = " + (yield node.value))
+
+    def visit_EnvDelete(self, node):
+        self.line("del $" + node.name)
+
+    def visit_AliasAssign(self, node):
+        self.line('aliases["' + node.name + '"] = ' + (yield node.value))
+
+    def visit_AliasDelete(self, node):
+        self.line('del aliases["' + node.name + '"]')
+
+    def visit_Pass(self, node):
+        self.line("pass")
+
+    def visit_If(self, node):
+        line = self.line
+        line("if " + (yield node.test) + ":")
+        yield from self._block(node.body)
+        orelse = node.orelse
+        while orelse and len(orelse) == 1 and isinstance(orelse[0], If):
+            node = orelse[0]
+            line("elif " + (yield node.test) + ":")
+            yield from self._block(node.body)
+            orelse = node.orelse
+        if orelse:
+            line("else:")
+            yield from self._block(orelse)
+
+    def visit_For(self, node):
+        target = node.target
+        if isinstance(target, Var):
+            target_assign = target.name
+        elif isinstance(target, EnvVar):
+            target_assign = "$" + target.name
+        else:
+            raise ValueError("For loop must assign to a variable name (Var)"
+                             "or environment variable name (EnvVar).")
+        self.line("for " + target_assign + " in " + (yield node.iter) + ":")
+        yield from self._block(node.body)
+
+    def visit_Function(self, node):
+        self.line("def " + node.name + "():")
+        yield from self._block(node.body)
+
+
+def toxonsh(tree, cache=None):
+    """Converts a tree to Xonsh. Node trees may be given an EmitCache."""
+    if isinstance(tree, Node):
+        visitor = ToXonsh(cache=cache)
+    else:
+        visitor = ToXonshFromDict(cache=cache)
+    return visitor.emit(tree)
 
 
-def toxonsh(tree):
-    """Converts a tree to Xonsh."""
+def iter_xonsh(tree, cache=None):
+    """Yields Xonsh code for a tree in chunks, one per top-level statement.
+    The tree may be a Script whose body is a generator. Node trees may be
+    given an EmitCache.
+    """
     if isinstance(tree, Node):
-        todict = NodeToDict()
-        tree = todict.visit(tree)
-    visitor = ToXonshFromDict()
-    return visitor.visit(tree)
+        visitor = ToXonsh(cache=cache)
+    else:
+        visitor = ToXonshFromDict(cache=cache)
+    return visitor.iter(tree)
@@ -0,0 +1,3 @@
+"""Performance benchmarks for asht. Run the modules with ``python -m``
+from the repository root, e.g. ``python -m benchmarks.bench_emit``.
+"""
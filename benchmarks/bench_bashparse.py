@@ -0,0 +1,39 @@
+"""Measures the throughput of the Bash parser, in MB of source per second,
+over corpora of emitted activation scripts, for tokenizing alone and for
+parsing into node trees.
+
+Run with ``python -m benchmarks.bench_bashparse``.
+"""
+import time
+
+from asht.bash import tobash
+from asht.bashparser import parse, tokenize
+
+from .trees import wide_script
+
+SIZES = (10000, 100000, 1000000)
+
+
+def best(f, repeat=3):
+    t = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        f()
+        t = min(t, time.perf_counter() - t0)
+    return t
+
+
+def main():
+    print("{:>9} {:>10} {:>14} {:>14}".format(
+        "nodes", "size [MB]", "tokenize MB/s", "parse MB/s"))
+    for size in SIZES:
+        source = tobash(wide_script(size))
+        mb = len(source.encode()) / 1e6
+        t_tok = best(lambda: tokenize(source))
+        t_parse = best(lambda: parse(source))
+        print("{:>9} {:>10.2f} {:>14.2f} {:>14.2f}".format(
+            size, mb, mb / t_tok, mb / t_parse))
+
+
+if __name__ == "__main__":
+    main()
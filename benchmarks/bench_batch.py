@@ -0,0 +1,49 @@
+"""Measures the throughput of translate_many() with different numbers of
+worker processes, against calling tobash() and toxonsh() one at a time,
+and the size of pickled trees.
+
+Run with ``python -m benchmarks.bench_batch``.
+"""
+import os
+import pickle
+import time
+
+from asht import nodes
+from asht.bash import tobash
+from asht.xonsh import toxonsh
+from asht.batch import BatchStats, translate_many
+
+from .trees import _statements
+
+ENVIRONMENTS = 5000
+BLOCKS = 4
+
+
+def environments():
+    """Activation scripts for many environments."""
+    return [
+        nodes.Script(body=[stmt for j in range(BLOCKS) for stmt in _statements(i + j)])
+        for i in range(ENVIRONMENTS)
+    ]
+
+
+def main():
+    trees = environments()
+    size = len(pickle.dumps(trees, pickle.HIGHEST_PROTOCOL))
+    print("{} trees, {:.0f} pickled bytes per tree, {} CPUs".format(
+        len(trees), size / len(trees), os.cpu_count()))
+    t0 = time.perf_counter()
+    serial = [(tobash(tree), toxonsh(tree)) for tree in trees]
+    t = time.perf_counter() - t0
+    print("{:<24} {:>10.3f} s {:>10.0f} trees/s".format("serial calls", t, len(trees) / t))
+    jobs = [1, 2, 4, os.cpu_count() or 1]
+    for n in sorted(set(jobs)):
+        stats = BatchStats()
+        results = translate_many(trees, jobs=n, stats=stats)
+        assert results == serial
+        print("{:<24} {:>10.3f} s {:>10.0f} trees/s".format(
+            "translate_many(jobs={})".format(n), stats.seconds, stats.trees_per_second))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Compares the binary format with JSON, by way of NodeToDict and
+DictToNode, for the size of the archive and the time and peak memory taken
+to load it.
+
+Run with ``python -m benchmarks.bench_binary``.
+"""
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from asht.binary import dumpb, loadb_mmap
+from asht.visitors import DictToNode, NodeToDict
+
+from .trees import wide_script, count_nodes
+
+SIZES = (10000, 100000, 1000000)
+
+
+def measure(f):
+    """Returns the time and peak memory taken by f(), separately, since
+    tracing slows it down."""
+    t0 = time.perf_counter()
+    f()
+    t = time.perf_counter() - t0
+    tracemalloc.start()
+    f()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return t, peak
+
+
+def load_json(path):
+    with open(path) as f:
+        return DictToNode().visit(json.load(f))
+
+
+def main():
+    print("{:>9} {:>11} {:>11} {:>10} {:>10} {:>11} {:>11}".format(
+        "nodes", "json [MB]", "bin [MB]", "json [s]", "bin [s]",
+        "json [MB]", "bin [MB]"))
+    print("{:>9} {:>23} {:>21} {:>23}".format("", "size", "load time", "load peak"))
+    with tempfile.TemporaryDirectory() as d:
+        jpath = os.path.join(d, "tree.json")
+        bpath = os.path.join(d, "tree.asht")
+        for size in SIZES:
+            tree = wide_script(size)
+            n = count_nodes(tree)
+            with open(jpath, "w") as f:
+                json.dump(NodeToDict().visit(tree), f)
+            with open(bpath, "wb") as f:
+                f.write(dumpb(tree))
+            assert loadb_mmap(bpath) == tree
+            t_json, m_json = measure(lambda: load_json(jpath))
+            t_bin, m_bin = measure(lambda: loadb_mmap(bpath))
+            print("{:>9} {:>11.2f} {:>11.2f} {:>10.3f} {:>10.3f} {:>11.1f} {:>11.1f}".format(
+                n, os.path.getsize(jpath) / 1e6, os.path.getsize(bpath) / 1e6,
+                t_json, t_bin, m_json / 1e6, m_bin / 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Measures emitting many scripts that share large Function bodies, with
+and without an emission cache.
+
+Each script defines the same library of functions, built afresh for each
+script as a generator would, followed by a few statements of its own.
+
+Run with ``python -m benchmarks.bench_cache``.
+"""
+import gc
+import time
+
+from asht import nodes
+from asht.bash import tobash
+from asht.xonsh import toxonsh
+from asht.cache import EmitCache
+
+from .trees import _statements
+
+SCRIPTS = 200
+FUNCTIONS = 20
+FUNCTION_BLOCKS = 10
+
+
+def library():
+    """A list of large functions, the same for every script."""
+    return [
+        nodes.Function(name="lib" + str(i), body=[
+            stmt for j in range(FUNCTION_BLOCKS) for stmt in _statements(j)
+        ])
+        for i in range(FUNCTIONS)
+    ]
+
+
+def scripts():
+    return [nodes.Script(body=library() + _statements(i)) for i in range(SCRIPTS)]
+
+
+def timed(f):
+    gc.disable()
+    try:
+        t0 = time.perf_counter()
+        rtn = f()
+        return time.perf_counter() - t0, rtn
+    finally:
+        gc.enable()
+
+
+def main():
+    trees = scripts()
+    interner = nodes.Interner()
+    frozen = [interner.freeze(tree) for tree in trees]
+    print("{} scripts of {} functions".format(SCRIPTS, FUNCTIONS))
+    print("{:<7} {:<16} {:>10} {:>9} {:>9} {:>8}".format(
+        "shell", "trees", "cache", "time [s]", "hits", "misses"))
+    for shell, tocode in (("bash", tobash), ("xonsh", toxonsh)):
+        t, exp = timed(lambda: [tocode(tree) for tree in trees])
+        print("{:<7} {:<16} {:>10} {:>9.4f} {:>9} {:>8}".format(
+            shell, "mutable", "none", t, "-", "-"))
+        for name, ts in (("mutable", trees), ("frozen/interned", frozen)):
+            cache = EmitCache()
+            t, out = timed(lambda: [tocode(tree, cache=cache) for tree in ts])
+            assert out == exp
+            print("{:<7} {:<16} {:>10} {:>9.4f} {:>9} {:>8}".format(
+                shell, name, "EmitCache", t, cache.hits, cache.misses))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Measures how many nodes per second can be constructed with the
+generated __init__() of each node class, against a generic __init__()
+that loops over its keyword arguments.
+
+Run with ``python -m benchmarks.bench_construct``.
+"""
+import gc
+import time
+
+from asht import nodes
+
+from .trees import wide_script, count_nodes
+
+N = 200000
+
+
+def loop_init(self, **kwargs):
+    """The generic keyword loop that node classes used before"""
+    attrs = self.attrs
+    for key, value in kwargs.items():
+        if key in attrs or key in nodes.LINE_COL:
+            setattr(self, key, value)
+        else:
+            raise RuntimeError("unknown attributes of node")
+    for key, value in self._defaults.items():
+        if key not in kwargs:
+            setattr(self, key, value)
+
+
+def _loop_classes():
+    classes = {}
+    for name in dir(nodes):
+        cls = getattr(nodes, name)
+        if isinstance(cls, type) and issubclass(cls, nodes.Node):
+            classes[cls] = type(name, (cls,), {"__slots__": (), "__init__": loop_init})
+    return classes
+
+
+LOOP_CLASSES = _loop_classes()
+
+ARGS = [nodes.RawString("ls"), nodes.RawString("-l")]
+VAR = nodes.Var("x")
+
+CASES = [
+    ("Var(name=)", nodes.Var, (), {"name": "x"}),
+    ("Var()", nodes.Var, ("x",), {}),
+    ("Command(args=)", nodes.Command, (), {"args": ARGS}),
+    ("Command()", nodes.Command, (ARGS,), {}),
+    ("Assign(...=)", nodes.Assign, (), {"name": "x", "value": VAR, "scope": "local"}),
+    ("Assign()", nodes.Assign, ("x", VAR, "local"), {}),
+]
+
+
+def rate(f, n=N, repeat=3):
+    """Returns the best number of calls of f per second."""
+    best = float("inf")
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            for _ in range(n):
+                f()
+            best = min(best, time.perf_counter() - t0)
+    finally:
+        gc.enable()
+    return n / best
+
+
+def main():
+    print("{:<16} {:>14} {:>14} {:>8}".format(
+        "constructor", "loop [1/s]", "generated [1/s]", "speedup"))
+    for name, cls, args, kwargs in CASES:
+        loop_cls = LOOP_CLASSES[cls]
+        if args:
+            r_loop = None
+        else:
+            r_loop = rate(lambda: loop_cls(**kwargs))
+        r_gen = rate(lambda: cls(*args, **kwargs))
+        if r_loop is None:
+            print("{:<16} {:>14} {:>14.0f} {:>8}".format(name, "-", r_gen, "-"))
+        else:
+            print("{:<16} {:>14.0f} {:>14.0f} {:>8.2f}".format(
+                name, r_loop, r_gen, r_gen / r_loop))
+    tree = wide_script(N)
+    n = count_nodes(tree)
+    gc.disable()
+    t0 = time.perf_counter()
+    wide_script(N)
+    t = time.perf_counter() - t0
+    gc.enable()
+    print("wide_script({}): {:.0f} nodes/s".format(N, n / t))
+
+
+if __name__ == "__main__":
+    main()
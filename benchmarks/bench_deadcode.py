@@ -0,0 +1,32 @@
+"""Measures what dead code elimination removes from a generated script,
+in which no Function is ever called, and how long the pass takes.
+
+Run with ``python -m benchmarks.bench_deadcode``.
+"""
+import time
+
+from asht.bash import tobash
+from asht.optimize import OptimizeReport, remove_dead_code
+
+from .trees import wide_script, count_nodes
+
+SIZES = (10000, 100000, 1000000)
+
+
+def main():
+    print("{:>9} {:>9} {:>10} {:>10} {:>10}".format(
+        "nodes", "removed", "bash in", "bash out", "pass"))
+    for size in SIZES:
+        tree = wide_script(size)
+        n = count_nodes(tree)
+        report = OptimizeReport()
+        t0 = time.perf_counter()
+        out = remove_dead_code(tree, keep=["f0"], report=report)
+        t = time.perf_counter() - t0
+        print("{:>9} {:>9} {:>10} {:>10} {:>8.3f} s".format(
+            n, report.total, len(tobash(tree)), len(tobash(out)), t))
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Times diffing two large scripts that differ by a few small edits, and
+patching one into the other, against comparing two equal copies with ==,
+which has to visit every node.
+
+Run with ``python -m benchmarks.bench_diff``.
+"""
+import pickle
+import time
+
+from asht import nodes
+from asht.treediff import diff, patch
+
+from .trees import wide_script, count_nodes
+
+SIZES = (10000, 100000, 1000000)
+
+
+def timed(f):
+    t0 = time.perf_counter()
+    rtn = f()
+    return time.perf_counter() - t0, rtn
+
+
+def main():
+    print("{:>9} {:>12} {:>12} {:>12} {:>6}".format(
+        "nodes", "== (equal)", "diff", "patch", "edits"))
+    for size in SIZES:
+        a = wide_script(size)
+        b = pickle.loads(pickle.dumps(a))
+        n = count_nodes(a)
+        t_eq, _ = timed(lambda: a == b)
+        body = b.body
+        body[len(body) // 2].value = "changed"
+        del body[len(body) // 3]
+        body.insert(len(body) // 4, body.pop())
+        body.append(nodes.Pass())
+        t_diff, edits = timed(lambda: diff(a, b))
+        t_patch, rtn = timed(lambda: patch(a, edits))
+        assert rtn == b
+        print("{:>9} {:>10.4f} s {:>10.4f} s {:>10.4f} s {:>6}".format(
+            n, t_eq, t_diff, t_patch, len(edits)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Measures visits per second of the dispatch table in NodeVisitor and
+DictVisitor against the original getattr() based dispatch, on a tree
+with about a million nodes. As with timeit, the garbage collector is
+disabled while timing so that collections of the large tree do not drown
+out the cost of dispatching.
+
+Run with ``python -m benchmarks.bench_dispatch``.
+"""
+import gc
+import time
+
+from asht.visitors import NodeToDict, DictToNode
+
+from .trees import wide_script, count_nodes
+
+SIZE = 10**6
+
+
+class GetattrNodeToDict(NodeToDict):
+    """NodeToDict with the original dispatch."""
+
+    def visit(self, node=None):
+        node = self.root if node is None else node
+        meth_name = "visit_" + node.__class__.__name__
+        meth = getattr(self, meth_name, self.visit_default)
+        rtn = meth(node)
+        return rtn
+
+
+class GetattrDictToNode(DictToNode):
+    """DictToNode with the original dispatch."""
+
+    def visit(self, dct=None):
+        dct = self.root if dct is None else dct
+        meth_name = "visit_" + next(iter(dct))
+        meth = getattr(self, meth_name, self.visit_default)
+        rtn = meth(dct)
+        return rtn
+
+
+def rate(visitor, tree, n, repeat=3):
+    """Returns the best visits per second over repeat runs."""
+    best = float("inf")
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            visitor().visit(tree)
+            best = min(best, time.perf_counter() - t0)
+    finally:
+        gc.enable()
+    return n / best
+
+
+def main():
+    tree = wide_script(SIZE)
+    n = count_nodes(tree)
+    dct = NodeToDict().visit(tree)
+    print("{} nodes".format(n))
+    print("{:<12} {:>16} {:>16} {:>8}".format(
+        "visitor", "getattr [1/s]", "table [1/s]", "speedup"))
+    for name, before, after, inp in [
+            ("NodeToDict", GetattrNodeToDict, NodeToDict, tree),
+            ("DictToNode", GetattrDictToNode, DictToNode, dct)]:
+        r_before = rate(before, inp, n)
+        r_after = rate(after, inp, n)
+        print("{:<12} {:>16,.0f} {:>16,.0f} {:>7.2f}x".format(
+            name, r_before, r_after, r_after / r_before))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Compares emitting shell code from node trees directly against the
+NodeToDict round trip.
+
+Run with ``python -m benchmarks.bench_emit``.
+"""
+import time
+
+from asht.visitors import NodeToDict
+from asht.bash import ToBash, ToBashFromDict
+from asht.xonsh import ToXonsh, ToXonshFromDict
+
+from .trees import wide_script, count_nodes
+
+SIZES = (1000, 10000, 100000)
+
+
+def best_of(f, repeat=3):
+    """Returns the best wall time of calling f() repeat times."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        f()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    backends = [
+        ("bash", ToBash, ToBashFromDict),
+        ("xonsh", ToXonsh, ToXonshFromDict),
+    ]
+    print("{:<6} {:>8} {:>12} {:>12} {:>8}".format(
+        "shell", "nodes", "dict [s]", "direct [s]", "speedup"))
+    for size in SIZES:
+        tree = wide_script(size)
+        n = count_nodes(tree)
+        for shell, direct, fromdict in backends:
+            assert direct().emit(tree) == fromdict().emit(NodeToDict().visit(tree))
+            t_dict = best_of(lambda: fromdict().emit(NodeToDict().visit(tree)))
+            t_direct = best_of(lambda: direct().emit(tree))
+            print("{:<6} {:>8} {:>12.5f} {:>12.5f} {:>7.2f}x".format(
+                shell, n, t_dict, t_direct, t_dict / t_direct))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Compares the traversal engine against the baseline visitors that it
+replaced, which visit children with recursive calls, on wide trees and on
+deep ones. The engine is timed twice: as it runs by default, with the
+top levels of the tree visited by the direct variants of the visit
+methods, and with max_direct_depth = 0, so that every node is visited on
+the explicit stack.
+
+Run with ``python -m benchmarks.bench_engine``.
+"""
+import gc
+import sys
+import time
+
+from asht.visitors import NodeToDict, DictToNode
+from asht.bash import ToBash
+
+from .trees import wide_script, nested_blocks, and_chain, count_nodes
+
+WIDE_SIZES = (10000, 100000)
+DEEP_SIZES = (10**4, 10**5, 10**6)
+# the output of nested blocks grows quadratically with depth, from indentation
+BLOCK_DEPTHS = (1000, 5000)
+
+
+class BaselineNodeToDict(NodeToDict):
+    """NodeToDict as it was before the engine, with visit methods that
+    call visit() on their children and return directly, so that the
+    engine never drives a generator for them.
+    """
+
+    def visit_Script(self, node):
+        return {"Script": {"body": list(map(self.visit, node.body))}}
+
+    def visit_String(self, node):
+        return {"String": {"parts": list(map(self.visit, node.parts))}}
+
+    def visit_Command(self, node):
+        return {"Command": {
+            "args": list(map(self.visit, node.args)),
+            "stdin": self.visit(node.stdin),
+            "stdout": self.visit(node.stdout),
+            "stderr": self.visit(node.stderr),
+            "background": node.background,
+        }}
+
+    def visit_CapturedCommand(self, node):
+        return {"CapturedCommand": self.visit_Command(node)["Command"]}
+
+    def visit_BinOp(self, node):
+        return {node.__class__.__name__: {
+            "lhs": self.visit(node.lhs),
+            "rhs": self.visit(node.rhs),
+        }}
+
+    visit_And = visit_BinOp
+    visit_Or = visit_BinOp
+
+    def visit_Not(self, node):
+        return {"Not": {"node": self.visit(node.node)}}
+
+    def visit_Statement(self, node):
+        return {"Statement": {"node": self.visit(node.node)}}
+
+    def visit_Assign(self, node):
+        return {"Assign": {
+            "name": node.name,
+            "value": self.visit(node.value),
+            "scope": node.scope,
+        }}
+
+    def visit_EnvAssign(self, node):
+        return {"EnvAssign": {
+            "name": node.name,
+            "value": self.visit(node.value),
+        }}
+
+    def visit_AliasAssign(self, node):
+        return {"AliasAssign": {
+            "name": node.name,
+            "value": self.visit(node.value),
+        }}
+
+    def visit_If(self, node):
+        return {"If": {
+            "test": self.visit(node.test),
+            "body": list(map(self.visit, node.body)),
+            "orelse": list(map(self.visit, node.orelse)),
+        }}
+
+    def visit_For(self, node):
+        return {"For": {
+            "target": self.visit(node.target),
+            "iter": self.visit(node.iter),
+            "body": list(map(self.visit, node.body)),
+        }}
+
+    def visit_Function(self, node):
+        return {"Function": {
+            "name": node.name,
+            "body": list(map(self.visit, node.body)),
+        }}
+
+
+class StackNodeToDict(NodeToDict):
+    """NodeToDict that visits every node on the explicit stack."""
+
+    max_direct_depth = 0
+
+
+class StackToBash(ToBash):
+    """ToBash that visits every node on the explicit stack."""
+
+    max_direct_depth = 0
+
+
+def timed(f, repeat=3):
+    """Returns the best wall time of f(), or None if it hits the recursion
+    limit. The garbage collector is disabled while timing.
+    """
+    best = float("inf")
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            try:
+                f()
+            except RecursionError:
+                return None
+            best = min(best, time.perf_counter() - t0)
+    finally:
+        gc.enable()
+    return best
+
+
+def fmt(t):
+    return "RecursionError" if t is None else "{:.5f}".format(t)
+
+
+ROW = "{:<22} {:>8} {:>14} {:>14} {:>14}"
+
+
+def main():
+    print("recursion limit: {}".format(sys.getrecursionlimit()))
+    print(ROW.format("case", "nodes", "baseline [s]", "stack [s]", "engine [s]"))
+    cases = []
+    for size in WIDE_SIZES:
+        cases.append(("wide NodeToDict", wide_script(size)))
+    for size in DEEP_SIZES:
+        cases.append(("deep And NodeToDict", and_chain(size)))
+    for name, tree in cases:
+        n = count_nodes(tree)
+        t_base = timed(lambda: BaselineNodeToDict().visit(tree))
+        t_stack = timed(lambda: StackNodeToDict().visit(tree))
+        t_eng = timed(lambda: NodeToDict().visit(tree))
+        print(ROW.format(name, n, fmt(t_base), fmt(t_stack), fmt(t_eng)))
+    # the baseline emitters are not kept, so only the engine is timed
+    trees = [("wide ToBash", wide_script(size)) for size in WIDE_SIZES]
+    trees += [("deep blocks ToBash", nested_blocks(depth)) for depth in BLOCK_DEPTHS]
+    for name, tree in trees:
+        t_stack = timed(lambda: StackToBash().visit(tree))
+        t_eng = timed(lambda: ToBash().visit(tree))
+        print(ROW.format(name, count_nodes(tree), "-", fmt(t_stack), fmt(t_eng)))
+    tree = and_chain(DEEP_SIZES[-1])
+    dct = NodeToDict().visit(tree)
+    t = timed(lambda: DictToNode().visit(dct), repeat=1)
+    print(ROW.format("deep And DictToNode", count_nodes(tree), "-", "-", fmt(t)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Compares flat trees with node trees, for the memory they hold and the
+time taken by queries over them.
+
+Run with ``python -m benchmarks.bench_flat``.
+"""
+import gc
+import time
+import tracemalloc
+
+from asht import nodes
+from asht.flat import FlatTree, np
+
+from .trees import wide_script, count_nodes
+
+SIZES = (10000, 100000, 1000000)
+
+
+def held(f):
+    """Returns the result of f() and the memory it still holds afterwards."""
+    gc.collect()
+    tracemalloc.start()
+    rtn = f()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return rtn, size
+
+
+def timed(f):
+    t0 = time.perf_counter()
+    f()
+    return time.perf_counter() - t0
+
+
+def walk(tree):
+    """Iterates over the nodes of a node tree, in pre-order."""
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        yield node
+        for field in reversed(node.fields):
+            val = getattr(node, field, None)
+            if isinstance(val, nodes.Node):
+                stack.append(val)
+            elif isinstance(val, list):
+                stack.extend(reversed(val))
+
+
+def tree_queries(tree):
+    names = [n.name for n in walk(tree) if isinstance(n, nodes.EnvAssign)]
+    counts = {id(f): sum(isinstance(n, nodes.Command) for n in walk(f))
+              for f in walk(tree) if isinstance(f, nodes.Function)}
+    return names, counts
+
+
+def flat_queries(flat):
+    return flat.attr("EnvAssign", "name"), flat.count_within("Command", "Function")
+
+
+def main():
+    modes = [False] if np is None else [False, True]
+    print("{:>9} {:>12} {:>12} {:>10} {:>10}  {}".format(
+        "nodes", "tree [B/n]", "flat [B/n]", "tree [s]", "flat [s]", "numpy"))
+    for size in SIZES:
+        tree, m_tree = held(lambda: wide_script(size))
+        n = count_nodes(tree)
+        t_tree = timed(lambda: tree_queries(tree))
+        for numpy in modes:
+            flat, m_flat = held(lambda: FlatTree.from_node(tree, numpy=numpy))
+            flat.ends()
+            t_flat = timed(lambda: flat_queries(flat))
+            print("{:>9} {:>12.1f} {:>12.1f} {:>10.4f} {:>10.4f}  {}".format(
+                n, m_tree / n, m_flat / n, t_tree, t_flat, numpy))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Counts the subshells that a generated script spawns before and after
+hoisting its captured commands, and times the pass.
+
+Run with ``python -m benchmarks.bench_hoist``.
+"""
+import time
+
+from asht import nodes
+from asht.optimize import OptimizeReport, hoist_commands, _walk
+
+from .trees import wide_script, count_nodes
+
+SIZES = (10000, 100000, 1000000)
+PURE = ("which", "uname")
+
+
+def captured(tree):
+    return sum(isinstance(x, nodes.CapturedCommand) for x in _walk(tree))
+
+
+def main():
+    print("{:>9} {:>10} {:>10} {:>10}".format("nodes", "$() in", "$() out", "pass"))
+    for size in SIZES:
+        tree = wide_script(size)
+        n = count_nodes(tree)
+        report = OptimizeReport()
+        t0 = time.perf_counter()
+        out = hoist_commands(tree, PURE, report)
+        t = time.perf_counter() - t0
+        print("{:>9} {:>10} {:>10} {:>8.3f} s".format(n, captured(tree), captured(out), t))
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
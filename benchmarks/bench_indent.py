@@ -0,0 +1,32 @@
+"""Checks that emitting deeply nested blocks takes time linear in the size
+of the output, which itself grows with the depth since every line carries
+its own indentation.
+
+Run with ``python -m benchmarks.bench_indent``.
+"""
+import sys
+
+from asht.bash import tobash
+from asht.xonsh import toxonsh
+
+from .bench_emit import best_of
+from .trees import nested_blocks
+
+DEPTHS = (250, 500, 1000, 2000, 4000)
+
+
+def main():
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10 * max(DEPTHS)))
+    print("{:<6} {:>6} {:>10} {:>10} {:>10}".format(
+        "shell", "depth", "bytes", "time [s]", "ns/byte"))
+    for shell, tocode in (("bash", tobash), ("xonsh", toxonsh)):
+        for depth in DEPTHS:
+            tree = nested_blocks(depth)
+            nbytes = len(tocode(tree))
+            t = best_of(lambda: tocode(tree))
+            print("{:<6} {:>6} {:>10} {:>10.5f} {:>10.3f}".format(
+                shell, depth, nbytes, t, 1e9 * t / nbytes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Measures the memory held by interned frozen trees against mutable
+trees, and the time to compare large trees for equality.
+
+Run with ``python -m benchmarks.bench_intern``.
+"""
+import gc
+import time
+import tracemalloc
+
+from asht import nodes
+from asht.visitors import NodeToFrozen
+
+from .trees import wide_script, repeated_script, count_nodes
+
+SIZES = (10000, 100000, 1000000)
+
+
+def held(f):
+    """Returns the result of f() and the memory it still holds afterwards."""
+    gc.collect()
+    tracemalloc.start()
+    rtn = f()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return rtn, size
+
+
+def best(f, repeat=3):
+    t = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        f()
+        t = min(t, time.perf_counter() - t0)
+    return t
+
+
+def changed(tree):
+    """Returns a copy of a wide script whose last statement differs."""
+    body = list(tree.body)
+    body[-1] = nodes.Pass()
+    return nodes.Script(body=body)
+
+
+def main():
+    print("{:<9} {:>9} {:>13} {:>13} {:>9} {:>12} {:>12} {:>12}".format(
+        "tree", "nodes", "mutable [B/n]", "interned [B/n]", "distinct", "mutable==",
+        "frozen==", "interned=="))
+    cases = [(name, make, size) for size in SIZES
+             for name, make in (("wide", wide_script), ("repeated", repeated_script))]
+    for name, make, size in cases:
+        tree, m_mut = held(lambda: make(size))
+        n = count_nodes(tree)
+        interner = nodes.Interner()
+        frozen, m_int = held(lambda: interner.freeze(tree))
+        other = changed(tree)
+        frozen_a = NodeToFrozen().visit(tree)
+        frozen_b = NodeToFrozen().visit(other)
+        interned_b = interner.freeze(other)
+        t_mut = best(lambda: tree == other)
+        t_frozen = best(lambda: frozen_a == frozen_b)
+        t_int = best(lambda: frozen == interned_b)
+        print("{:<9} {:>9} {:>13.1f} {:>13.1f} {:>9} {:>10.6f} s {:>10.6f} s {:>10.6f} s".format(
+            name, n, m_mut / n, m_int / n, len(interner), t_mut, t_frozen, t_int))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Compares loading a JSON tree with json.load() and DictToNode against
+the incremental loader, for time and peak memory, both building the whole
+tree and iterating over the statements of the script one at a time.
+
+Run with ``python -m benchmarks.bench_jsonload``.
+"""
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from asht.jsonload import load, iter_statements
+from asht.visitors import DictToNode, NodeToDict
+
+from .trees import wide_script, count_nodes
+
+SIZES = (10000, 100000, 1000000)
+
+
+def measure(f):
+    """Returns the time and peak memory taken by f(), separately, since
+    tracing slows it down."""
+    t0 = time.perf_counter()
+    f()
+    t = time.perf_counter() - t0
+    tracemalloc.start()
+    f()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return t, peak
+
+
+def main():
+    print("{:>9} {:>10}  {:<16} {:>9} {:>10}".format(
+        "nodes", "json [MB]", "loader", "time [s]", "peak [MB]"))
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "tree.json")
+        for size in SIZES:
+            tree = wide_script(size)
+            n = count_nodes(tree)
+            with open(path, "w") as f:
+                json.dump(NodeToDict().visit(tree), f)
+            del tree
+
+            def json_load():
+                with open(path) as f:
+                    return DictToNode().visit(json.load(f))
+
+            def incremental():
+                with open(path, "rb") as f:
+                    return load(f)
+
+            def streamed():
+                with open(path, "rb") as f:
+                    for _ in iter_statements(f):
+                        pass
+
+            mb = os.path.getsize(path) / 1e6
+            for name, f in (("json.load", json_load), ("load", incremental),
+                            ("iter_statements", streamed)):
+                t, peak = measure(f)
+                print("{:>9} {:>10.2f}  {:<16} {:>9.3f} {:>10.1f}".format(
+                    n, mb, name, t, peak / 1e6))
+
+
+if __name__ == "__main__":
+    main()
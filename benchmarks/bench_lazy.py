@@ -0,0 +1,47 @@
+"""Compares eager and lazy conversion of dict trees, both when only the
+first few statements of a script are looked at and when all of it is.
+
+Run with ``python -m benchmarks.bench_lazy``.
+"""
+import time
+
+from asht.bash import tobash
+from asht.visitors import DictToNode, NodeToDict
+
+from .trees import wide_script, count_nodes
+
+SIZES = (10000, 100000, 1000000)
+
+
+def best(f, repeat=3):
+    t = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        f()
+        t = min(t, time.perf_counter() - t0)
+    return t
+
+
+def peek(lazy, dct):
+    tree = DictToNode(lazy=lazy).visit(dct)
+    return [tobash(stmt) for stmt in tree.body[:3]]
+
+
+def full(lazy, dct):
+    return tobash(DictToNode(lazy=lazy).visit(dct))
+
+
+def main():
+    print("{:>9} {:>12} {:>12} {:>12} {:>12}".format(
+        "nodes", "peek eager", "peek lazy", "full eager", "full lazy"))
+    for size in SIZES:
+        tree = wide_script(size)
+        n = count_nodes(tree)
+        dct = NodeToDict().visit(tree)
+        times = [best(lambda: f(lazy, dct)) for f in (peek, full)
+                 for lazy in (False, True)]
+        print("{:>9} {:>10.4f} s {:>10.4f} s {:>10.4f} s {:>10.4f} s".format(n, *times))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Measures the memory used per node by slotted node classes against
+node classes that keep their attributes in an instance __dict__, as the
+node classes did before they were given __slots__.
+
+Run with ``python -m benchmarks.bench_memory``.
+"""
+import gc
+import tracemalloc
+
+from asht import nodes
+
+from .trees import wide_script, count_nodes
+
+SIZES = (10000, 100000, 1000000)
+
+
+class DictNode:
+    """Stand in for the node classes before they had __slots__"""
+
+    attrs = frozenset()
+    lineno = 1
+    column = 1
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+
+def _dict_classes():
+    classes = {}
+    for name in dir(nodes):
+        cls = getattr(nodes, name)
+        if isinstance(cls, type) and issubclass(cls, nodes.Node):
+            ns = dict(cls._defaults)
+            ns["attrs"] = cls.attrs
+            classes[cls] = type(name, (DictNode,), ns)
+    return classes
+
+
+DICT_CLASSES = _dict_classes()
+
+
+def copy_tree(tree, factory):
+    """Copies a node tree, creating each node with factory(cls, kwargs).
+    Strings and other leaf values are shared with the original tree, so
+    only the nodes and their lists are allocated.
+    """
+    if isinstance(tree, list):
+        return [copy_tree(x, factory) for x in tree]
+    kwargs = {}
+    for attr in tree.attrs:
+        val = getattr(tree, attr, None)
+        if isinstance(val, (nodes.Node, list)):
+            val = copy_tree(val, factory)
+        if val is not tree._defaults.get(attr):
+            kwargs[attr] = val
+    return factory(tree.__class__, kwargs)
+
+
+def slotted(cls, kwargs):
+    return cls(**kwargs)
+
+
+def dicted(cls, kwargs):
+    return DICT_CLASSES[cls](**kwargs)
+
+
+def allocated(f):
+    """Returns the result of f() and the memory it still holds afterwards."""
+    gc.collect()
+    tracemalloc.start()
+    rtn = f()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return rtn, size
+
+
+def main():
+    print("{:>9} {:>16} {:>16} {:>8}".format(
+        "nodes", "__dict__ [B/node]", "__slots__ [B/node]", "ratio"))
+    for size in SIZES:
+        tree = wide_script(size)
+        n = count_nodes(tree)
+        copy, m_dict = allocated(lambda: copy_tree(tree, dicted))
+        del copy
+        copy, m_slots = allocated(lambda: copy_tree(tree, slotted))
+        del copy
+        print("{:>9} {:>16.1f} {:>16.1f} {:>8.2f}".format(
+            n, m_dict / n, m_slots / n, m_dict / m_slots))
+
+
+if __name__ == "__main__":
+    main()
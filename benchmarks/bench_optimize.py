@@ -0,0 +1,32 @@
+"""Measures what the peephole optimizer removes from a generated script,
+how much shorter the code becomes, and how long the pass takes.
+
+Run with ``python -m benchmarks.bench_optimize``.
+"""
+import time
+
+from asht.bash import tobash
+from asht.optimize import OptimizeReport, peephole
+
+from .trees import wide_script, count_nodes
+
+SIZES = (10000, 100000, 1000000)
+
+
+def main():
+    print("{:>9} {:>9} {:>10} {:>10} {:>10}".format(
+        "nodes", "removed", "bash in", "bash out", "pass"))
+    for size in SIZES:
+        tree = wide_script(size)
+        n = count_nodes(tree)
+        report = OptimizeReport()
+        t0 = time.perf_counter()
+        out = peephole(tree, report)
+        t = time.perf_counter() - t0
+        print("{:>9} {:>9} {:>10} {:>10} {:>8.3f} s".format(
+            n, report.total, len(tobash(tree)), len(tobash(out)), t))
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
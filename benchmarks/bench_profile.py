@@ -0,0 +1,55 @@
+"""Measures the overhead of profiling visitors, with asht.profiling.Profile,
+compared with the same visits without it.
+
+Run with ``python -m benchmarks.bench_profile``.
+"""
+import time
+
+from asht.bash import tobash
+from asht.profiling import Profile
+from asht.visitors import NodeToDict, DictToNode
+
+from .trees import wide_script, deep_script, count_nodes
+
+SIZES = (10000, 100000, 1000000)
+
+
+def best(f, repeat=3):
+    t = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        f()
+        t = min(t, time.perf_counter() - t0)
+    return t
+
+
+def profiled(f):
+    def run():
+        with Profile():
+            f()
+    return run
+
+
+def main():
+    print("{:<7} {:>9} {:<10} {:>12} {:>12} {:>12}".format(
+        "shape", "nodes", "operation", "off", "on", "after"))
+    for shape, make in (("wide", wide_script), ("deep", deep_script)):
+        for size in SIZES:
+            if shape == "deep" and size > 10000:
+                break
+            tree = make(size)
+            dct = NodeToDict().visit(tree)
+            n = count_nodes(tree)
+            for op, f in (("NodeToDict", lambda: NodeToDict().visit(tree)),
+                          ("DictToNode", lambda: DictToNode().visit(dct)),
+                          ("tobash", lambda: tobash(tree))):
+                off = best(f)
+                on = best(profiled(f))
+                # new visitors after profiling are not wrapped
+                after = best(f)
+                print("{:<7} {:>9} {:<10} {:>10.4f} s {:>10.4f} s {:>10.4f} s".format(
+                    shape, n, op, off, on, after))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Compares emitting a whole script again after a small edit with
+re-emitting only the statements that changed, with a Reemitter.
+
+Run with ``python -m benchmarks.bench_reemit``.
+"""
+import time
+
+from asht.bash import tobash
+from asht.emitters import Reemitter
+
+from .trees import wide_script, count_nodes
+
+SIZES = (10000, 100000, 1000000)
+
+
+def timed(f):
+    t0 = time.perf_counter()
+    rtn = f()
+    return time.perf_counter() - t0, rtn
+
+
+def main():
+    print("{:>9} {:>12} {:>12} {:>12} {:>8}".format(
+        "nodes", "first", "full", "reemit", "stmts"))
+    for size in SIZES:
+        tree = wide_script(size)
+        n = count_nodes(tree)
+        reemitter = Reemitter("bash")
+        t_first, _ = timed(lambda: reemitter.emit(tree))
+        t_full = t_reemit = float("inf")
+        for i in range(3):
+            # a small edit, deep within a statement in the middle
+            stmt = tree.body[len(tree.body) // 10 * 5 + i * 5 + 3]
+            stmt.body[0].node.args[0].value = "printf" + str(i)
+            t, code = timed(lambda: reemitter.emit(tree))
+            t_reemit = min(t_reemit, t)
+            t, exp = timed(lambda: tobash(tree))
+            t_full = min(t_full, t)
+            assert code == exp
+        print("{:>9} {:>10.4f} s {:>10.4f} s {:>10.4f} s {:>8}".format(
+            n, t_first, t_full, t_reemit, reemitter.emitted))
+
+
+if __name__ == "__main__":
+    main()
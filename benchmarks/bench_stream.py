@@ -0,0 +1,50 @@
+"""Measures peak memory of streaming emission from a generator Script body
+against building the whole tree and the whole output in memory.
+
+Run with ``python -m benchmarks.bench_stream``.
+"""
+import os
+import time
+import tracemalloc
+
+from asht import nodes
+from asht.bash import tobash
+from asht.emitters import dump
+
+from .trees import _statements
+
+SIZES = (1000, 10000)
+
+
+def statements(n):
+    """Generates n blocks of statements, one block at a time."""
+    for i in range(n):
+        yield from _statements(i)
+
+
+def measure(f):
+    """Returns the wall time and peak traced memory of calling f()."""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    f()
+    t = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return t, peak
+
+
+def main():
+    print("{:>8} {:>14} {:>14} {:>10} {:>10}".format(
+        "blocks", "eager peak [B]", "stream peak [B]", "eager [s]", "stream [s]"))
+    with open(os.devnull, "w") as devnull:
+        for size in SIZES:
+            t_eager, m_eager = measure(lambda: devnull.write(
+                tobash(nodes.Script(body=list(statements(size))))))
+            t_stream, m_stream = measure(lambda: dump(
+                nodes.Script(body=statements(size)), devnull, shell="bash"))
+            print("{:>8} {:>14} {:>14} {:>10.4f} {:>10.4f}".format(
+                size, m_eager, m_stream, t_eager, t_stream))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Benchmark suite for the hot paths of asht: converting between node and
+dict trees, emitting Bash and Xonsh, and pretty formatting, in full and
+with repr(). Each operation is timed, and its peak memory measured, on
+synthetic trees of several shapes, from 10 to 10**6 nodes, and the results
+may be saved as JSON and compared with those of another commit.
+
+Run with ``python -m benchmarks.bench_suite``, e.g.::
+
+    python -m benchmarks.bench_suite --output before.json
+    python -m benchmarks.bench_suite --output after.json --compare before.json
+
+Some of the operations scale worse than linearly on some shapes, such as
+emitting deeply nested blocks, whose indentation grows with the depth.
+Each run of an operation is stopped once it takes longer than the time
+limit, where the platform supports SIGALRM, and its result is recorded
+with no time. The growth of the memory of each operation is extrapolated
+from its last two sizes. An operation is not run on larger trees of a
+shape once it has timed out, or would use more memory than the limit.
+"""
+import argparse
+import datetime
+import gc
+import json
+import math
+import platform
+import signal
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import asht
+from asht.bash import tobash
+from asht.pretty import pformat
+from asht.visitors import DictToNode, NodeToDict
+from asht.xonsh import toxonsh
+
+from .trees import SHAPES, count_nodes
+
+SIZES = (10, 100, 1000, 10000, 100000, 1000000)
+
+# each operation takes the node tree and its dict tree, which are made
+# beforehand, and are not timed
+OPERATIONS = {
+    "NodeToDict": lambda tree, dct: NodeToDict().visit(tree),
+    "DictToNode": lambda tree, dct: DictToNode().visit(dct),
+    "tobash": lambda tree, dct: tobash(tree),
+    "toxonsh": lambda tree, dct: toxonsh(tree),
+    "pformat": lambda tree, dct: pformat(tree),
+    "repr": lambda tree, dct: repr(tree),
+}
+
+
+class Timeout(Exception):
+    pass
+
+
+def _alarm(signum, frame):
+    raise Timeout()
+
+
+def _timed(f, limit):
+    """Returns the time taken by f(), or raises Timeout once it has taken
+    longer than limit seconds."""
+    alarm = limit and hasattr(signal, "setitimer")
+    if alarm:
+        old = signal.signal(signal.SIGALRM, _alarm)
+        signal.setitimer(signal.ITIMER_REAL, limit)
+    try:
+        t0 = time.perf_counter()
+        f()
+        return time.perf_counter() - t0
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, old)
+
+
+def measure(f, limit=None, min_time=0.2, max_repeat=20):
+    """Returns the best time of f(), repeated until min_time has passed or
+    it has run max_repeat times, and the peak memory allocated by one more
+    run of it, which is traced separately, since tracing slows it down.
+    Raises Timeout if a run takes longer than limit seconds.
+    """
+    best = float("inf")
+    total = 0.0
+    for _ in range(max_repeat):
+        gc.collect()
+        t = _timed(f, limit)
+        best = min(best, t)
+        total += t
+        if total >= min_time:
+            break
+    gc.collect()
+    tracemalloc.start()
+    try:
+        f()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+            text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _predict(prev, cur, ratio):
+    """Extrapolates a measurement from its values at two sizes to a size
+    ratio times the second, assuming that it grows as a power of the size,
+    and no slower than linearly."""
+    (n0, y0), (n1, y1) = prev, cur
+    k = 1.0
+    if n1 > n0 and y0 > 0 and y1 > 0:
+        k = max(1.0, math.log(y1 / y0) / math.log(n1 / n0))
+    return y1 * ratio ** k
+
+
+def run(shapes, operations, sizes, limit, memory_limit, log=print):
+    """Runs the benchmarks and returns a list of result dicts. The seconds
+    and peak_bytes of the operations that timed out are None."""
+    results = []
+    sizes = sorted(sizes)
+    for shape in shapes:
+        make = SHAPES[shape]
+        slow = set()
+        # the last (nodes, peak) of each operation
+        last = {}
+        for i, size in enumerate(sizes):
+            todo = [op for op in operations if op not in slow]
+            if not todo:
+                break
+            tree = make(size)
+            dct = NodeToDict().visit(tree)
+            n = count_nodes(tree)
+            for op in todo:
+                func = OPERATIONS[op]
+                try:
+                    seconds, peak = measure(lambda: func(tree, dct), limit)
+                except Timeout:
+                    seconds = peak = None
+                results.append({
+                    "shape": shape,
+                    "size": size,
+                    "nodes": n,
+                    "operation": op,
+                    "seconds": seconds,
+                    "peak_bytes": peak,
+                })
+                if seconds is None:
+                    slow.add(op)
+                    log("{:<7} {:>9} {:<11} timed out after {} s".format(shape, n, op, limit))
+                    continue
+                log("{:<7} {:>9} {:<11} {:>12.6f} s {:>12.1f} KiB".format(
+                    shape, n, op, seconds, peak / 1024))
+                prev = last.get(op, (n / 10, peak / 10))
+                last[op] = (n, peak)
+                if i + 1 < len(sizes):
+                    m = _predict(prev, (n, peak), sizes[i + 1] / size)
+                    if m > memory_limit:
+                        slow.add(op)
+                        log("{:<7} {:>9} {:<11} skipped, would use ~{:.0f} MiB".format(
+                            shape, ">" + str(n), op, m / 2**20))
+            del tree, dct
+    return results
+
+
+def compare(results, baseline, threshold, log=print):
+    """Logs the ratio of each result to the same one in a baseline, and
+    returns the results that are slower, or use more memory, by more than
+    the threshold ratio.
+    """
+    base = {(r["shape"], r["size"], r["operation"]): r for r in baseline["results"]}
+    regressions = []
+    log("{:<7} {:>9} {:<11} {:>8} {:>8}".format("shape", "size", "operation", "time", "memory"))
+    for r in results:
+        b = base.get((r["shape"], r["size"], r["operation"]))
+        if b is None or b["seconds"] is None:
+            continue
+        if r["seconds"] is None:
+            regressions.append(r)
+            log("{:<7} {:>9} {:<11} timed out  <-- regression".format(
+                r["shape"], r["size"], r["operation"]))
+            continue
+        t = r["seconds"] / b["seconds"] if b["seconds"] else float("inf")
+        m = r["peak_bytes"] / b["peak_bytes"] if b["peak_bytes"] else float("inf")
+        flag = ""
+        if t > threshold or m > threshold:
+            regressions.append(r)
+            flag = "  <-- regression"
+        log("{:<7} {:>9} {:<11} {:>7.2f}x {:>7.2f}x{}".format(
+            r["shape"], r["size"], r["operation"], t, m, flag))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shapes", nargs="+", choices=sorted(SHAPES), default=list(SHAPES))
+    parser.add_argument("--operations", nargs="+", choices=list(OPERATIONS),
+                        default=list(OPERATIONS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES))
+    parser.add_argument("--limit", type=float, default=20.0,
+                        help="seconds that an operation may take on a tree")
+    parser.add_argument("--memory-limit", type=float, default=1024,
+                        help="MiB that an operation may use on a tree")
+    parser.add_argument("--output", help="file to save the results to, as JSON")
+    parser.add_argument("--compare", help="JSON results to compare with")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="ratio above which a result is a regression")
+    args = parser.parse_args(argv)
+    results = run(args.shapes, args.operations, args.sizes, args.limit,
+                  args.memory_limit * 2**20)
+    data = {
+        "meta": {
+            "asht": asht.__version__,
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(data, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
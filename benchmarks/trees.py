@@ -0,0 +1,139 @@
+"""Synthetic tree generators for benchmarks"""
+from asht import nodes
+
+
+def _string(*values):
+    return nodes.String(parts=[nodes.RawString(value=v) for v in values])
+
+
+def _statements(i):
+    """A block of typical activation script statements, numbered by i."""
+    name = "VAR" + str(i)
+    return [
+        nodes.Comment(value="statement block " + str(i)),
+        nodes.EnvAssign(
+            name=name,
+            value=nodes.String(parts=[
+                nodes.RawString(value="/opt/env/"),
+                nodes.EnvVar(name="HOME"),
+                nodes.RawString(value="/bin"),
+            ]),
+        ),
+        nodes.Assign(name="x" + str(i), value=_string("cd"), scope="global"),
+        nodes.If(
+            test=nodes.And(lhs=nodes.Var(name="x" + str(i)),
+                           rhs=nodes.Not(node=nodes.EnvVar(name=name))),
+            body=[
+                nodes.Statement(node=nodes.Command(args=[
+                    nodes.RawString(value="echo"),
+                    nodes.CapturedCommand(args=[
+                        nodes.RawString(value="which"),
+                        nodes.RawString(value="python"),
+                    ]),
+                ])),
+                nodes.Delete(name="x" + str(i)),
+            ],
+            orelse=[nodes.Pass()],
+        ),
+        nodes.Function(name="f" + str(i), body=[
+            nodes.AliasAssign(name="gg", value=_string("cd ", "/path/to/home")),
+            nodes.EnvDelete(name=name),
+        ]),
+    ]
+
+
+def wide_script(n):
+    """Creates a flat script with roughly n nodes."""
+    body = []
+    for i in range(max(1, n // _BLOCK_SIZE)):
+        body.extend(_statements(i))
+    return nodes.Script(body=body)
+
+
+def repeated_script(n):
+    """Creates a flat script with roughly n nodes, which repeats the same
+    block of statements. The nodes of each block are separate objects.
+    """
+    body = []
+    for i in range(max(1, n // _BLOCK_SIZE)):
+        body.extend(_statements(0))
+    return nodes.Script(body=body)
+
+
+def count_nodes(tree):
+    """Counts the nodes in a node tree, or list of node trees."""
+    n = 0
+    stack = [tree]
+    while stack:
+        val = stack.pop()
+        if isinstance(val, list):
+            stack.extend(val)
+        elif isinstance(val, nodes.Node):
+            n += 1
+            stack.extend(getattr(val, attr, None) for attr in val.attrs)
+    return n
+
+
+_BLOCK_SIZE = count_nodes(_statements(0))
+
+
+def nested_blocks(depth):
+    """Creates a script whose blocks are nested depth levels deep, cycling
+    through If, For, and Function blocks.
+    """
+    inner = [nodes.Pass()]
+    for i in range(depth):
+        body = [nodes.Delete(name="x" + str(i))] + inner
+        kind = i % 3
+        if kind == 0:
+            block = nodes.If(test=nodes.Var(name="x"), body=body, orelse=[])
+        elif kind == 1:
+            block = nodes.For(target=nodes.Var(name="x"),
+                              iter=nodes.Var(name="y"), body=body)
+        else:
+            block = nodes.Function(name="f" + str(i), body=body)
+        inner = [block]
+    return nodes.Script(body=inner)
+
+
+def and_chain(depth):
+    """Creates a left-deep chain of And nodes, depth nodes deep."""
+    tree = nodes.Var(name="x0")
+    for i in range(1, depth):
+        tree = nodes.And(lhs=tree, rhs=nodes.Var(name="x" + str(i)))
+    return tree
+
+
+_LEVEL_SIZE = count_nodes(nested_blocks(3)) / 3
+
+
+def deep_script(n):
+    """Creates a script with roughly n nodes, whose blocks are nested as
+    deep as they go."""
+    return nested_blocks(max(1, int(n / _LEVEL_SIZE)))
+
+
+def bool_chain(n):
+    """Creates a script with roughly n nodes, which is a single If whose
+    test is a left-deep chain of alternating And and Or nodes."""
+    test = nodes.Var(name="x0")
+    for i in range(1, max(1, (n - 3) // 2)):
+        cls = nodes.And if i % 2 else nodes.Or
+        test = cls(lhs=test, rhs=nodes.Var(name="x" + str(i)))
+    return nodes.Script(body=[nodes.If(test=test, body=[nodes.Pass()], orelse=[])])
+
+
+def long_string(n):
+    """Creates a script with roughly n nodes, which assigns a single String
+    of alternating RawString and EnvVar parts."""
+    parts = [nodes.RawString(value="/p" + str(i)) if i % 2 else nodes.EnvVar(name="V" + str(i))
+             for i in range(max(1, n - 3))]
+    return nodes.Script(body=[nodes.EnvAssign(name="PATH", value=nodes.String(parts=parts))])
+
+
+SHAPES = {
+    "wide": wide_script,
+    "deep": deep_script,
+    "chain": bool_chain,
+    "string": long_string,
+}
@@ -254,6 +254,73 @@ COMPOUND_DICT_CASES = {
 DICT_CASES.update(COMPOUND_DICT_CASES)
 
 
+#
+# Nested cases, with blocks inside of blocks
+#
+NESTED_DICT_CASES = [
+    {
+        "If": {
+            "test": {"Var": {"name": "x"}},
+            "body": [
+                {
+                    "If": {
+                        "test": {"Var": {"name": "y"}},
+                        "body": [{"Delete": {"name": "x"}}, {"Delete": {"name": "y"}}],
+                        "orelse": [{"Pass": {}}],
+                    }
+                },
+                {"Pass": {}},
+            ],
+            "orelse": [
+                {
+                    "If": {
+                        "test": {"Var": {"name": "y"}},
+                        "body": [
+                            {
+                                "For": {
+                                    "target": {"Var": {"name": "z"}},
+                                    "iter": {"Var": {"name": "y"}},
+                                    "body": [{"Pass": {}}, {"Pass": {}}],
+                                }
+                            }
+                        ],
+                        "orelse": [],
+                    }
+                }
+            ],
+        }
+    },
+    {
+        "Function": {
+            "name": "f",
+            "body": [
+                {
+                    "For": {
+                        "target": {"Var": {"name": "x"}},
+                        "iter": {"Var": {"name": "y"}},
+                        "body": [
+                            {
+                                "If": {
+                                    "test": {"Var": {"name": "x"}},
+                                    "body": [{"Delete": {"name": "x"}}, {"Pass": {}}],
+                                    "orelse": [],
+                                }
+                            },
+                            {"Comment": {"value": "I am a comment"}},
+                        ],
+                    }
+                },
+                {"Pass": {}},
+            ],
+        }
+    },
+]
+NESTED_DICT_CASES = {
+    "nested-" + next(iter(c.keys())).lower(): c for c in NESTED_DICT_CASES
+}
+DICT_CASES.update(NESTED_DICT_CASES)
+
+
 def zip_cases(expecteds):
     """zips input and expetced values for cases"""
     rtn = []
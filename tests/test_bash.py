@@ -1,7 +1,9 @@
 """Tests Bash functionality"""
 import pytest
 
-from asht.bash import tobash
+from asht import nodes
+from asht.bash import tobash, ToBashFromDict
+from asht.visitors import DictToNode, NodeToDict
 
 from .cases import zip_cases, mark_cases
 
@@ -79,6 +81,34 @@ function f {
   # I am a comment
   $x
 }
+""".lstrip(),
+    "nested-if": """
+if $x; then
+  if $y; then
+    unset x
+    unset y
+  else
+    :
+  fi
+  :
+elif $y; then
+  for z in $y; do
+    :
+    :
+  done
+fi
+""".lstrip(),
+    "nested-function": """
+function f {
+  for x in $y; do
+    if $x; then
+      unset x
+      :
+    fi
+    # I am a comment
+  done
+  :
+}
 """.lstrip(),
 }
 
@@ -87,3 +117,17 @@ function f {
 def test_tobash(inp, exp):
     obs = tobash(inp)
     assert obs == exp
+
+
+@mark_cases(TOBASH_EXP)
+def test_tobash_from_node(inp, exp):
+    tree = DictToNode().visit(inp)
+    obs = tobash(tree)
+    assert obs == exp
+    assert obs == ToBashFromDict().emit(NodeToDict().visit(tree))
+
+
+def test_tobash_string_text_unescaped():
+    # the RawString parts of Strings are written as they are
+    tree = nodes.String(parts=[nodes.RawString(value="/opt/bin:$PATH")])
+    assert tobash(tree) == '"/opt/bin:$PATH"'
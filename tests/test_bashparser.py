@@ -0,0 +1,143 @@
+"""Tests the Bash parser"""
+import pytest
+
+from asht import nodes
+from asht.bash import frombash, tobash
+from asht.bashparser import tokenize
+
+from .test_bash import TOBASH_EXP
+
+STATEMENT_CASES = {k: v for k, v in TOBASH_EXP.items() if v.endswith("\n")}
+EXPRESSION_CASES = {k: v for k, v in TOBASH_EXP.items()
+                    if v and not v.endswith("\n") and k != "empty-rawstring"}
+
+
+@pytest.mark.parametrize("key", sorted(STATEMENT_CASES))
+def test_roundtrip_statements(key):
+    code = STATEMENT_CASES[key]
+    assert tobash(frombash(code)) == code
+
+
+@pytest.mark.parametrize("key", sorted(EXPRESSION_CASES))
+def test_roundtrip_expressions(key):
+    code = EXPRESSION_CASES[key]
+    assert tobash(frombash(code)) == code + "\n"
+
+
+def test_tree():
+    code = 'x="cd"\nif $x; then\n  unset x\nfi\n'
+    exp = nodes.Script(body=[
+        nodes.Assign(name="x", value=nodes.String(parts=[nodes.RawString(value="cd")]),
+                     scope="global"),
+        nodes.If(test=nodes.Var(name="x"), body=[nodes.Delete(name="x")], orelse=[]),
+    ])
+    assert frombash(code) == exp
+
+
+def test_env_vars():
+    tree = frombash("export A=1\necho $A $B\nunset A\nunset B\n")
+    assert tree.body[0] == nodes.EnvAssign(name="A", value=nodes.RawString(value="1"))
+    assert tree.body[1].args[1:] == [nodes.EnvVar(name="A"), nodes.Var(name="B")]
+    assert tree.body[2] == nodes.EnvDelete(name="A")
+    assert tree.body[3] == nodes.Delete(name="B")
+
+
+def test_commands():
+    tree = frombash("cat < in > out 2> err &\n! a && b || c\n")
+    cmd = tree.body[0]
+    assert cmd.stdin == nodes.RawString(value="in")
+    assert cmd.stdout == nodes.RawString(value="out")
+    assert cmd.stderr == nodes.RawString(value="err")
+    assert cmd.background
+    # && and || are left associative, and ! binds tighter
+    test = tree.body[1]
+    assert isinstance(test, nodes.Or)
+    assert isinstance(test.lhs, nodes.And)
+    assert isinstance(test.lhs.lhs, nodes.Not)
+
+
+def test_words():
+    tree = frombash("""echo a"b c"'$d' --x=$HOME/bin "$(ls "$y")" \\$z""")
+    args = tree.body[0].args
+    assert args[1] == nodes.String(parts=[nodes.RawString(value="ab c\\$d")])
+    assert args[2] == nodes.String(parts=[
+        nodes.RawString(value="--x="), nodes.Var(name="HOME"),
+        nodes.RawString(value="/bin")])
+    sub = args[3].parts[0]
+    assert isinstance(sub, nodes.CapturedCommand)
+    assert sub.args[1] == nodes.String(parts=[nodes.Var(name="y")])
+    # the text of RawStrings in Strings is as it is within double quotes
+    assert args[4] == nodes.String(parts=[nodes.RawString(value="\\$z")])
+
+
+@pytest.mark.parametrize("code, exp", [
+    ("echo '$HOME'\n", 'echo "\\$HOME"\n'),
+    ('echo "\\$HOME"\n', 'echo "\\$HOME"\n'),
+    ("echo \\$HOME\n", 'echo "\\$HOME"\n'),
+    ('x="a\\"b"\n', 'x="a\\"b"\n'),
+    ("x='a\"b'\n", 'x="a\\"b"\n'),
+    ("echo 'a\\b' \"c\\\\d\"\n", 'echo "a\\\\b" "c\\\\d"\n'),
+    ("echo '`ls`' \"$HOME\"'$x'\n", 'echo "\\`ls\\`" "$HOME\\$x"\n'),
+])
+def test_roundtrip_quoting(code, exp):
+    tree = frombash(code)
+    assert tobash(tree) == exp
+    assert frombash(tobash(tree)) == tree
+    assert tobash(frombash(exp)) == exp
+
+
+def test_hash_within_word():
+    tree = frombash("echo $x#y; echo z\n")
+    assert len(tree.body) == 2
+    assert tree.body[0].args[1] == nodes.String(parts=[
+        nodes.Var(name="x"), nodes.RawString(value="#y")])
+    assert tobash(tree) == 'echo "$x#y"\necho z\n'
+
+
+def test_functions_and_loops():
+    tree = frombash("f() {\n  :\n}\nfunction g()\n{\n  :\n}\n"
+                    "for x in a b; do :; done\nfor $y in $z; do\n:\ndone\n")
+    assert [f.name for f in tree.body[:2]] == ["f", "g"]
+    assert tree.body[2].iter == nodes.RawString(value="a b")
+    assert tree.body[3].target == nodes.EnvVar(name="y")
+
+
+def test_positions():
+    code = "# hi\nif $x; then\n  echo  $y\nfi\n"
+    tree = frombash(code)
+    comment, node = tree.body
+    assert (comment.lineno, comment.column) == (1, 1)
+    assert (node.lineno, node.column) == (2, 1)
+    assert (node.test.lineno, node.test.column) == (2, 4)
+    cmd = node.body[0]
+    assert (cmd.lineno, cmd.column) == (3, 3)
+    assert (cmd.args[1].lineno, cmd.args[1].column) == (3, 9)
+
+
+def test_tokenize():
+    toks = [t[:2] for t in tokenize('a=$(b "c$(d)") && e # f')]
+    assert toks == [
+        ("lit", "a="), ("cmdsub", "$("), ("lit", "b"), ("dq", '"'), ("lit", "c"),
+        ("cmdsub", "$("), ("lit", "d"), ("cmdend", ")"), ("dqend", '"'),
+        ("cmdend", ")"), ("op", "&&"), ("lit", "e"), ("comment", " f"), ("eof", ""),
+    ]
+
+
+@pytest.mark.parametrize("code, lineno, column", [
+    ("a | b\n", 1, 3),
+    ("echo hi\nwhile x; do :; done\n", 2, 1),
+    ('echo "abc\n', 1, 6),
+    ("if x; then\n  :\n", 3, 1),
+    ("echo $(ls\n", 1, 10),
+    ("cat >> f\n", 1, 5),
+    ("x=1 }\n", 1, 5),
+    ('export PATH="/opt/bin${PATH:+:$PATH}"\n', 1, 22),
+    ('x="${HOME:-/tmp}"\n', 1, 4),
+    ("echo ${x:-y}\n", 1, 6),
+    ("IFS=$'\\n'\n", 1, 5),
+    ('echo $"a"\n', 1, 6),
+])
+def test_errors(code, lineno, column):
+    with pytest.raises(SyntaxError) as e:
+        frombash(code, filename="x.sh")
+    assert (e.value.filename, e.value.lineno, e.value.offset) == ("x.sh", lineno, column)
@@ -0,0 +1,47 @@
+"""Tests batch translation"""
+import pytest
+
+from asht import nodes
+from asht.bash import tobash
+from asht.xonsh import toxonsh
+from asht.batch import BatchStats, translate_many
+from asht.visitors import DictToNode
+
+from .cases import DICT_CASES
+
+
+TREES = [DictToNode().visit(DICT_CASES[key]) for key in sorted(DICT_CASES)]
+
+
+@pytest.mark.parametrize("jobs, chunksize", [(1, None), (1, 3), (2, None), (2, 1)])
+def test_translate_many(jobs, chunksize):
+    results = translate_many(TREES, jobs=jobs, chunksize=chunksize)
+    assert results == [(tobash(tree), toxonsh(tree)) for tree in TREES]
+
+
+def test_single_shell():
+    results = translate_many(TREES, shells="xonsh", jobs=2)
+    assert results == [toxonsh(tree) for tree in TREES]
+
+
+def test_iterable_and_dict_trees():
+    dicts = (DICT_CASES[key] for key in sorted(DICT_CASES))
+    results = translate_many(dicts, shells=["bash"], jobs=2)
+    assert results == [(tobash(tree),) for tree in TREES]
+
+
+def test_frozen_trees():
+    interner = nodes.Interner()
+    frozen = [interner.freeze(tree) for tree in TREES]
+    assert translate_many(frozen, shells="bash", jobs=2) == list(map(tobash, TREES))
+
+
+def test_stats():
+    stats = BatchStats()
+    results = translate_many(TREES, jobs=1, stats=stats)
+    assert stats.trees == len(TREES)
+    assert stats.outputs == 2 * len(TREES)
+    assert stats.chars == sum(len(a) + len(b) for a, b in results)
+    assert stats.seconds > 0
+    assert stats.trees_per_second > 0
+    assert "trees/s" in str(stats)
@@ -0,0 +1,96 @@
+"""Tests the binary serialization format"""
+import mmap
+
+import pytest
+
+from asht import nodes
+from asht.binary import dumpb, loadb, loadb_mmap
+from asht.visitors import DictToNode, NodeToDict, NodeToFrozen
+
+from .cases import DICT_CASES
+
+
+@pytest.mark.parametrize("key", sorted(DICT_CASES))
+def test_roundtrip(key):
+    tree = DictToNode().visit(DICT_CASES[key])
+    obs = loadb(dumpb(tree))
+    assert obs == tree
+    assert NodeToDict().visit(obs) == NodeToDict().visit(tree)
+
+
+@pytest.mark.parametrize("key", sorted(DICT_CASES))
+def test_dict_tree(key):
+    obs = loadb(dumpb(DICT_CASES[key]))
+    assert obs == DictToNode().visit(DICT_CASES[key])
+
+
+def test_frozen():
+    tree = DictToNode().visit(DICT_CASES["nested-function"])
+    obs = loadb(dumpb(NodeToFrozen().visit(tree)))
+    assert not obs._frozen
+    assert obs == tree
+
+
+def test_positions_and_unset():
+    tree = nodes.Script(body=[
+        nodes.Var(name="x", lineno=3, column=7),
+        nodes.If(test=nodes.Var(name="y")),
+    ])
+    obs = loadb(dumpb(tree))
+    assert (obs.body[0].lineno, obs.body[0].column) == (3, 7)
+    assert (obs.body[1].lineno, obs.body[1].column) == (1, 1)
+    assert not hasattr(obs.body[1], "body")
+    assert obs.body[1].test == tree.body[1].test
+
+
+def test_strings_deduplicated():
+    data = dumpb(nodes.Script(body=[nodes.Var(name="abcdefgh")] * 100))
+    assert data.count(b"abcdefgh") == 1
+
+
+def test_deep():
+    node = nodes.Not(node=nodes.Pass())
+    for _ in range(50000):
+        node = nodes.Not(node=node)
+    obs = loadb(dumpb(node))
+    for _ in range(50001):
+        obs = obs.node
+    assert isinstance(obs, nodes.Pass)
+
+
+def test_mmap(tmp_path):
+    tree = DictToNode().visit(DICT_CASES["compound-for"])
+    path = tmp_path / "tree.asht"
+    path.write_bytes(dumpb(tree))
+    assert loadb_mmap(path) == tree
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            assert loadb(mm) == tree
+    assert loadb(memoryview(path.read_bytes())) == tree
+
+
+def test_mmap_bad_data(tmp_path):
+    data = bytearray(dumpb(nodes.Script(body=[nodes.Pass(), nodes.Pass()])))
+    path = tmp_path / "tree.asht"
+    data[4] = 99
+    path.write_bytes(data)
+    with pytest.raises(ValueError, match="unsupported asht binary version"):
+        loadb_mmap(path)
+    data[4] = dumpb(nodes.Pass())[4]
+    path.write_bytes(data[:-2])
+    with pytest.raises(IndexError):
+        loadb_mmap(path)
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with pytest.raises(IndexError):
+            loadb(mm)
+        mm.close()
+
+
+def test_bad_data():
+    with pytest.raises(ValueError):
+        loadb(b"JSON{}")
+    data = bytearray(dumpb(nodes.Pass()))
+    data[4] = 99
+    with pytest.raises(ValueError):
+        loadb(data)
@@ -0,0 +1,137 @@
+"""Tests the emission cache"""
+import pytest
+
+from asht import nodes
+from asht.bash import tobash, ToBashFromDict
+from asht.xonsh import toxonsh
+from asht.cache import DEFAULT_KINDS, EmitCache, digest, subtree_digests
+from asht.emitters import dumps, iter_code
+from asht.visitors import DictToNode, NodeToDict, NodeToFrozen
+
+from .cases import DICT_CASES
+
+
+ALL_KINDS = frozenset(
+    name for name, cls in vars(nodes).items()
+    if isinstance(cls, type) and issubclass(cls, nodes.Node)
+)
+
+
+def function(name="f"):
+    return nodes.Function(name=name, body=[
+        nodes.Assign(name="x", value=nodes.Var(name="y"), scope="local"),
+        nodes.If(
+            test=nodes.And(lhs=nodes.Var(name="x"), rhs=nodes.Var(name="z")),
+            body=[nodes.Pass()],
+            orelse=[nodes.Delete(name="x")],
+        ),
+    ])
+
+
+@pytest.mark.parametrize("shell, tocode", [("bash", tobash), ("xonsh", toxonsh)])
+@pytest.mark.parametrize("key", sorted(DICT_CASES))
+def test_cached_matches(key, shell, tocode):
+    tree = DictToNode().visit(DICT_CASES[key])
+    exp = tocode(tree)
+    cache = EmitCache(kinds=ALL_KINDS)
+    assert tocode(tree, cache=cache) == exp
+    assert tocode(tree, cache=cache) == exp
+    assert dumps(tree, shell=shell, cache=cache) == exp
+    assert "".join(iter_code(tree, shell=shell, cache=cache)) == exp
+
+
+def test_hits_and_misses():
+    cache = EmitCache()
+    tree = nodes.Script(body=[function(), function()])
+    exp = tobash(tree)
+    assert tobash(tree, cache=cache) == exp
+    # Function, If, And are cached once, then the second Function hits
+    assert (cache.misses, cache.hits) == (3, 1)
+    assert tobash(nodes.Script(body=[function()]), cache=cache) == tobash(function())
+    assert (cache.misses, cache.hits) == (3, 2)
+    cache.clear()
+    assert (len(cache), cache.misses, cache.hits) == (0, 0, 0)
+
+
+@pytest.mark.parametrize("tocode", [tobash, toxonsh])
+def test_replay_at_other_depth(tocode):
+    cache = EmitCache()
+    tree = nodes.Script(body=[
+        function(),
+        nodes.If(test=nodes.Var(name="a"), body=[
+            nodes.For(target=nodes.Var(name="i"), iter=nodes.Var(name="b"),
+                      body=[function()]),
+        ], orelse=[]),
+        function(),
+    ])
+    assert tocode(tree, cache=cache) == tocode(tree)
+    assert cache.hits == 2
+
+
+def test_shells_are_separate():
+    cache = EmitCache()
+    tree = nodes.Script(body=[function()])
+    assert tobash(tree, cache=cache) == tobash(tree)
+    assert toxonsh(tree, cache=cache) == toxonsh(tree)
+    assert cache.hits == 0
+    assert len(cache) == 6
+
+
+def test_lru_eviction():
+    cache = EmitCache(maxsize=2, kinds=["Function"])
+    for name in ["f", "g", "f", "h", "g"]:
+        tobash(function(name), cache=cache)
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (1, 4)
+
+
+def test_digest():
+    assert digest(function()) == digest(function())
+    assert digest(function()) != digest(function("g"))
+    assert digest(nodes.Var(name="x", lineno=3)) == digest(nodes.Var(name="x"))
+    assert digest(nodes.Var(name="x")) != digest(nodes.EnvVar(name="x"))
+    assert digest(NodeToFrozen().visit(function())) == digest(function())
+    assert len(digest(function())) == 16
+
+
+def test_subtree_digests():
+    # nested subtrees are digested in the same pass, as they would be alone
+    tree = nodes.Script(body=[function(), function("g")])
+    digests = subtree_digests(tree, DEFAULT_KINDS)
+    fn, if_ = tree.body[0], tree.body[0].body[1]
+    alone = function()
+    assert digests[id(fn)] == subtree_digests(alone, DEFAULT_KINDS)[id(alone)]
+    assert digests[id(if_)] == subtree_digests(alone.body[1], DEFAULT_KINDS)[id(alone.body[1])]
+    assert digests[id(fn)] != digests[id(tree.body[1])]
+    assert id(tree.body[0].body[0]) not in digests
+    frozen = NodeToFrozen().visit(tree)
+    assert subtree_digests(frozen, DEFAULT_KINDS)[id(frozen)] == digests[id(tree)]
+    # known frozen digests are reused in larger trees
+    outer = NodeToFrozen().visit(nodes.Script(body=[function()]))
+    assert subtree_digests(outer, DEFAULT_KINDS)[id(outer.body[0])] == digests[id(fn)]
+
+
+def test_nested_misses():
+    tree = nodes.Pass()
+    for i in range(50):
+        tree = nodes.If(test=nodes.Var(name="x" + str(i)), body=[tree], orelse=None)
+    tree = nodes.Script(body=[tree])
+    cache = EmitCache()
+    assert tobash(tree, cache=cache) == tobash(tree)
+    assert (cache.misses, cache.hits) == (50, 0)
+    assert tobash(tree, cache=cache) == tobash(tree)
+    assert (cache.misses, cache.hits) == (50, 1)
+
+
+def test_frozen_trees_cached():
+    cache = EmitCache()
+    tree = nodes.Interner().freeze(nodes.Script(body=[function(), function()]))
+    assert tobash(tree, cache=cache) == tobash(tree)
+    assert cache.hits == 1
+
+
+def test_dict_emitters_not_cached():
+    with pytest.raises(TypeError):
+        ToBashFromDict(cache=EmitCache())
+    with pytest.raises(TypeError):
+        tobash(NodeToDict().visit(function()), cache=EmitCache())
@@ -0,0 +1,188 @@
+"""Tests streaming emission"""
+import gc
+import io
+
+import pytest
+
+from asht import nodes
+from asht.bash import tobash, iter_bash, ToBash, ToBashFromDict
+from asht.xonsh import toxonsh, iter_xonsh
+from asht.fish import tofish
+from asht.emitters import IndentWriter, Reemitter, dump, dumps, iter_code
+from asht.nodes import is_dirty
+from asht.visitors import DictToNode, NodeToDict
+
+from .cases import DICT_CASES
+
+
+def assign_stmts(n, log=None):
+    for i in range(n):
+        if log is not None:
+            log.append(i)
+        yield nodes.Assign(
+            name="x" + str(i),
+            value=nodes.String(parts=[nodes.RawString(value=str(i))]),
+            scope="global",
+        )
+
+
+@pytest.mark.parametrize("shell, tocode", [("bash", tobash), ("xonsh", toxonsh)])
+@pytest.mark.parametrize("key", sorted(DICT_CASES))
+def test_dump_matches(key, shell, tocode):
+    tree = DictToNode().visit(DICT_CASES[key])
+    exp = tocode(tree)
+    fp = io.StringIO()
+    dump(tree, fp, shell=shell)
+    assert fp.getvalue() == exp
+    assert dumps(tree, shell=shell) == exp
+    assert "".join(iter_code(tree, shell=shell)) == exp
+    assert "".join(iter_code(DICT_CASES[key], shell=shell)) == exp
+
+
+@pytest.mark.parametrize("iterfunc, exp", [
+    (iter_bash, 'x0="0"\n'),
+    (iter_xonsh, 'x0 = "0"\n'),
+])
+def test_iter_generator_body_is_lazy(iterfunc, exp):
+    log = []
+    tree = nodes.Script(body=assign_stmts(3, log=log))
+    chunks = iterfunc(tree)
+    assert log == []
+    assert next(chunks) == exp
+    assert log == [0]
+    assert len(list(chunks)) == 2
+    assert log == [0, 1, 2]
+
+
+def test_dump_generator_body():
+    fp = io.StringIO()
+    dump(nodes.Script(body=assign_stmts(3)), fp, shell="bash")
+    assert fp.getvalue() == 'x0="0"\nx1="1"\nx2="2"\n'
+
+
+def test_unknown_shell():
+    with pytest.raises(ValueError):
+        dumps(nodes.Script(body=[]), shell="not-a-shell")
+
+
+def test_indent_writer():
+    chunks = []
+    w = IndentWriter(chunks.append, indent="  ")
+    w.line("a")
+    w.push()
+    w.line("b")
+    w.push()
+    w.line("c")
+    w.pop()
+    w.line("d")
+    w.pop()
+    w.line("e")
+    assert "".join(chunks) == "a\n  b\n    c\n  d\ne\n"
+    # prefixes deeper than those kept are made as they are needed
+    for _ in range(IndentWriter.CACHED_DEPTHS + 5):
+        w.push()
+    w.line("f")
+    assert chunks[-1] == "  " * (IndentWriter.CACHED_DEPTHS + 5) + "f\n"
+    assert len(w._prefixes) == IndentWriter.CACHED_DEPTHS
+
+
+def test_deep_blocks_do_not_recurse():
+    depth = 3000
+    body = [nodes.Pass()]
+    for _ in range(depth):
+        body = [nodes.If(test=nodes.Var(name="x"), body=body, orelse=[])]
+    tree = nodes.Script(body=body)
+    lines = tobash(tree).splitlines()
+    assert len(lines) == 2 * depth + 1
+    assert lines[depth] == "  " * depth + ":"
+    lines = toxonsh(tree).splitlines()
+    assert len(lines) == depth + 1
+    assert lines[depth] == "    " * depth + "pass"
+
+
+@pytest.mark.parametrize("shell", ["bash", "xonsh", "fish"])
+def test_reemitter(shell):
+    loop = DictToNode().visit(DICT_CASES["compound-for"])
+    tree = nodes.Script(body=[loop, *assign_stmts(3)])
+    reemitter = Reemitter(shell)
+    assert reemitter.emit(tree) == dumps(tree, shell)
+    assert reemitter.emitted == len(tree.body)
+    assert reemitter.emit(tree) == dumps(tree, shell)
+    assert reemitter.emitted == 0
+    tree.body[-1].name = "changed"
+    assert reemitter.emit(tree) == dumps(tree, shell)
+    assert reemitter.emitted == 1
+    loop.body.append(nodes.Pass())
+    del tree.body[2]
+    tree.body[-1].value.parts[0].value = "new"
+    code = reemitter.emit(tree)
+    assert "new" in code and "x1" not in code
+    assert code == dumps(tree, shell)
+    assert reemitter.emitted == 2
+
+
+def test_reemitter_shared_leaf():
+    leaf = nodes.RawString(value="a")
+    tree = nodes.Script(body=[
+        nodes.Statement(node=nodes.Command(args=[nodes.RawString(value="echo"), leaf])),
+        nodes.Assign(name="x", value=nodes.String(parts=[leaf]), scope="global"),
+    ])
+    reemitter = Reemitter("bash")
+    assert reemitter.emit(tree) == 'echo a\nx="a"\n'
+    leaf.value = "b"
+    assert reemitter.emit(tree) == 'echo b\nx="b"\n'
+    assert reemitter.emitted == 2
+
+
+def test_reemitter_after_trees_are_freed():
+    # tracked trees that are freed while modified leave nothing behind
+    # that new nodes, which may get the same ids, could be confused with
+    for i in range(100):
+        tree = nodes.Script(body=[
+            nodes.If(test=nodes.Var(name="x"), body=[
+                nodes.Command(args=[nodes.RawString(value="echo"), nodes.RawString(value=str(j))])
+                for j in range(3)
+            ], orelse=[])
+            for _ in range(3)
+        ])
+        reemitter = Reemitter("bash")
+        assert reemitter.emit(tree) == tobash(tree)
+        fresh = [nodes.RawString(value=str(j)) for j in range(50)]
+        assert not any(map(is_dirty, fresh))
+        tree.body[i % 3].body[i % 2].args[1].value = "changed" + str(i)
+        assert reemitter.emit(tree) == tobash(tree)
+        tree.body[(i + 1) % 3].body[2].args[0].value = "printf"
+        del tree, reemitter, fresh
+        gc.collect()
+
+
+@pytest.mark.parametrize("key", sorted(DICT_CASES))
+def test_visit_returns_code(key):
+    dct = DICT_CASES[key]
+    exp = tobash(dct)
+    assert ToBashFromDict().visit(dct) == exp
+    assert ToBash().visit(DictToNode().visit(dct)) == exp
+
+
+@pytest.mark.parametrize("tocode, var, ops", [
+    (tobash, "$x", (" && ", " || ")),
+    (toxonsh, "x", (" and ", " or ")),
+    (tofish, "$x", (" && ", " || ")),
+])
+def test_long_bool_chain(tocode, var, ops):
+    # long enough that joining the code at each operator takes seconds
+    n = 100000
+    tree = nodes.Var(name="x0")
+    for i in range(1, n):
+        cls = nodes.And if i % 2 else nodes.Or
+        tree = cls(lhs=tree, rhs=nodes.Var(name="x" + str(i)))
+    # chains that nest on the right as well
+    tree = nodes.And(lhs=tree, rhs=nodes.Or(lhs=nodes.Var(name="y"), rhs=nodes.Var(name="z")))
+    exp = [var + "0"]
+    for i in range(1, n):
+        exp.append(ops[0] if i % 2 else ops[1])
+        exp.append(var + str(i))
+    exp += [ops[0], var[:-1] + "y", ops[1], var[:-1] + "z"]
+    exp = "".join(exp)
+    assert tocode(tree) == exp
+    assert tocode(NodeToDict().visit(tree)) == exp
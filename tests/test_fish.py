@@ -0,0 +1,157 @@
+"""Tests Fish functionality"""
+from asht import nodes
+from asht.fish import tofish, ToFishFromDict
+from asht.visitors import DictToNode, NodeToDict
+
+from .cases import mark_cases
+
+TOFISH_EXP = {
+    "empty-script": "",
+    "empty-comment": "# \n",
+    "empty-string": '""',
+    "empty-rawstring": "",
+    "empty-var": "$_",
+    "empty-envvar": "$_",
+    "empty-command": "echo",
+    "empty-capturedcommand": "(echo)",
+    "empty-and": "$_ && $_",
+    "empty-or": "$_ || $_",
+    "empty-not": "not $_",
+    "empty-assign": 'set -g _ ""\n',
+    "empty-delete": "set -e _\n",
+    "empty-envassign": 'set -gx _ ""\n',
+    "empty-envdelete": "set -e _\n",
+    "empty-aliasassign": 'alias _=""\n',
+    "empty-aliasdelete": "functions -e _\n",
+    "empty-pass": "true\n",
+    "empty-if": """
+if $_
+    true
+end
+""".lstrip(),
+    "empty-for": """
+for _ in ""
+    true
+end
+""".lstrip(),
+    "empty-function": """
+function f
+    true
+end
+""".lstrip(),
+    "minimal-script": "true\n",
+    "minimal-comment": "# I am a comment\n",
+    "minimal-string": '"cd"',
+    "minimal-rawstring": "ls",
+    "minimal-var": "$x",
+    "minimal-envvar": "$HOME",
+    "minimal-command": "echo Wow Mom",
+    "minimal-capturedcommand": "(echo Wow Mom)",
+    "minimal-and": "$x && $y",
+    "minimal-or": "$x || $y",
+    "minimal-not": "not $x",
+    "minimal-assign": 'set -g x "cd"\n',
+    "minimal-delete": "set -e x\n",
+    "minimal-envassign": 'set -gx HOME "/path/to/home"\n',
+    "minimal-envdelete": "set -e HOME\n",
+    "minimal-aliasassign": 'alias gg="cd /path/to/home"\n',
+    "minimal-aliasdelete": "functions -e gg\n",
+    "minimal-if": """
+if $x
+    true
+else
+    true
+end
+""".lstrip(),
+    "minimal-for": """
+for x in "cd"
+    true
+end
+""".lstrip(),
+    "minimal-function": """
+function f
+    $x
+end
+""".lstrip(),
+    "compound-script": """
+# I am a comment
+set -g x "cd"
+if $x
+    set -e x
+end
+""".lstrip(),
+    "compound-string": '"cd $HOME"',
+    "compound-command": 'echo "$HOME"',
+    "compound-capturedcommand": '(echo "$HOME")',
+    "compound-if": """
+if $x
+    set -e x
+    set -g x "cd"
+else if $y
+    set -e y
+    set -g y "ls"
+else
+    true
+end
+""".lstrip(),
+    "compound-for": """
+for x in "ls $HOME"
+    # I am a comment
+    set -g y "cd"
+end
+""".lstrip(),
+    "compound-function": """
+function f
+    # I am a comment
+    $x
+end
+""".lstrip(),
+    "nested-if": """
+if $x
+    if $y
+        set -e x
+        set -e y
+    else
+        true
+    end
+    true
+else if $y
+    for z in $y
+        true
+        true
+    end
+end
+""".lstrip(),
+    "nested-function": """
+function f
+    for x in $y
+        if $x
+            set -e x
+            true
+        end
+        # I am a comment
+    end
+    true
+end
+""".lstrip(),
+}
+
+
+@mark_cases(TOFISH_EXP)
+def test_tofish(inp, exp):
+    obs = tofish(inp)
+    assert obs == exp
+
+
+@mark_cases(TOFISH_EXP)
+def test_tofish_from_node(inp, exp):
+    tree = DictToNode().visit(inp)
+    obs = tofish(tree)
+    assert obs == exp
+    assert obs == ToFishFromDict().emit(NodeToDict().visit(tree))
+
+
+def test_tofish_assign_without_scope():
+    tree = nodes.Assign(name="x", value=nodes.Var(name="y"))
+    assert tofish(tree) == "set -g x $y\n"
+    assert tofish({"Assign": {"name": "x", "value": {"Var": {"name": "y"}}}}) == "set -g x $y\n"
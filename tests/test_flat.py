@@ -0,0 +1,85 @@
+"""Tests the flat tree representation"""
+import pytest
+
+from asht import nodes
+from asht.flat import FlatTree, np
+from asht.visitors import DictToNode, NodeToDict
+
+from .cases import DICT_CASES
+
+NUMPY = [False, pytest.param(True, marks=pytest.mark.skipif(
+    np is None, reason="NumPy is not available"))]
+
+
+def script():
+    cmd = lambda *args: nodes.Command(args=[nodes.RawString(value=a) for a in args])
+    return nodes.Script(body=[
+        nodes.EnvAssign(name="PATH", value=nodes.RawString(value="/bin")),
+        nodes.Function(name="f", body=[
+            cmd("ls"),
+            nodes.If(test=cmd("true"), body=[cmd("echo", "x")]),
+            nodes.Function(name="g", body=[cmd("pwd")]),
+        ]),
+        cmd("f"),
+        nodes.Function(name="h", body=[nodes.Pass()]),
+        nodes.EnvAssign(name="HOME", value=nodes.RawString(value="/root")),
+    ])
+
+
+@pytest.mark.parametrize("key", sorted(DICT_CASES))
+def test_roundtrip(key):
+    tree = DictToNode().visit(DICT_CASES[key])
+    flat = FlatTree.from_node(tree, numpy=False)
+    assert flat.to_node() == tree
+    assert flat.to_dict() == NodeToDict().visit(tree)
+    assert FlatTree.from_dict(DICT_CASES[key]).to_node() == tree
+
+
+def test_structure():
+    tree = script()
+    flat = FlatTree.from_node(tree, numpy=False)
+    assert flat.kind_names[flat.kinds[0]] == "Script"
+    assert flat.parents[0] == -1
+    first = flat.first_child[0]
+    assert flat.kind_names[flat.kinds[first]] == "EnvAssign"
+    assert flat.field_names[flat.slots[first]] == "body"
+    i, n = first, 0
+    while i >= 0:
+        assert flat.parents[i] == 0
+        i = flat.next_sibling[i]
+        n += 1
+    assert n == len(tree.body)
+    assert flat.ends()[0] == len(flat)
+    assert flat.ends()[first] == first + 2
+
+
+def test_positions():
+    tree = nodes.Script(body=[nodes.Pass(lineno=4, column=2)])
+    obs = FlatTree.from_node(tree, numpy=False).to_node()
+    assert (obs.body[0].lineno, obs.body[0].column) == (4, 2)
+
+
+def test_values_by_type():
+    tree = nodes.Script(body=[
+        nodes.Command(args=[nodes.RawString(value="1")], background=True),
+        nodes.Command(args=[nodes.RawString(value="1")], background=False),
+    ])
+    flat = FlatTree.from_node(tree, numpy=False)
+    assert flat.attr("Command", "background") == [True, False]
+    assert flat.to_node() == tree
+
+
+@pytest.mark.parametrize("numpy", NUMPY)
+def test_queries(numpy):
+    flat = FlatTree.from_node(script(), numpy=numpy)
+    funcs = [int(i) for i in flat.find("Function")]
+    assert [flat.kind_names[flat.kinds[i]] for i in funcs] == ["Function"] * 3
+    assert funcs == sorted(funcs)
+    assert list(flat.find("Missing")) == []
+    assert flat.attr("EnvAssign", "name") == ["PATH", "HOME"]
+    assert flat.attr("Function", "name") == ["f", "g", "h"]
+    assert flat.attr("Missing", "name") == []
+    assert flat.count_within("Command", "Function") == dict(zip(funcs, [4, 1, 0]))
+    assert flat.count_within("Command", "Script") == {0: 5}
+    with pytest.raises(ValueError):
+        flat.attr("EnvAssign", "value")
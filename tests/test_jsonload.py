@@ -0,0 +1,106 @@
+"""Tests the incremental JSON loader"""
+import io
+import json
+
+import pytest
+
+from asht import nodes
+from asht.jsonload import load, iter_statements
+from asht.visitors import DictToNode
+
+from .cases import DICT_CASES
+
+
+@pytest.mark.parametrize("chunksize", [1, 7, 1 << 16])
+@pytest.mark.parametrize("key", sorted(DICT_CASES))
+def test_load(key, chunksize):
+    text = json.dumps(DICT_CASES[key], indent=1)
+    exp = DictToNode().visit(DICT_CASES[key])
+    assert load(io.StringIO(text), chunksize=chunksize) == exp
+    assert load(io.BytesIO(text.encode()), chunksize=chunksize) == exp
+
+
+def test_unicode_and_escapes():
+    tree = {"Script": {"body": [
+        {"Comment": {"value": "café ☃ \U0001f600 \"q\" \\ \n"}},
+    ]}}
+    for text in (json.dumps(tree), json.dumps(tree, ensure_ascii=False)):
+        for chunksize in (1, 2, 3):
+            obs = load(io.BytesIO(text.encode()), chunksize=chunksize)
+            assert obs == DictToNode().visit(tree)
+
+
+class CountingReader(io.StringIO):
+    def __init__(self, text):
+        super().__init__(text)
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+
+@pytest.mark.parametrize("chunksize", [1, 2, 3, 16])
+def test_long_string(chunksize):
+    value = '\\ "q" \n x' * 10000
+    tree = {"Comment": {"value": value}}
+    f = CountingReader(json.dumps({"Script": {"body": [tree, tree]}}))
+    assert load(f, chunksize=chunksize) == nodes.Script(body=[
+        nodes.Comment(value=value), nodes.Comment(value=value)])
+    # a string spanning many chunks is read in ever larger chunks
+    assert f.reads < 100
+    with pytest.raises(ValueError):
+        load(io.StringIO(json.dumps(tree)[:-3]), chunksize=chunksize)
+
+
+@pytest.mark.parametrize("chunksize", [1, 5, 1 << 16])
+def test_iter_statements(chunksize):
+    tree = DICT_CASES["compound-script"]
+    exp = DictToNode().visit(tree).body
+    f = io.StringIO(json.dumps(tree))
+    obs = list(iter_statements(f, chunksize=chunksize))
+    assert obs == exp
+
+
+def test_iter_statements_streams():
+    def statements():
+        yield '{"Script": {"body": ['
+        for i in range(3):
+            yield ("," if i else "") + json.dumps({"Var": {"name": str(i)}})
+        yield "]}}"
+
+    class Reader:
+        def __init__(self):
+            self.chunks = statements()
+            self.read_count = 0
+
+        def read(self, size):
+            self.read_count += 1
+            return next(self.chunks, "")
+
+    reader = Reader()
+    it = iter_statements(reader)
+    assert next(it) == nodes.Var(name="0")
+    # the first statement is yielded before the rest have been read
+    assert reader.read_count <= 3
+    assert [v.name for v in it] == ["1", "2"]
+
+
+def test_iter_statements_not_script():
+    tree = DICT_CASES["compound-if"]
+    obs = list(iter_statements(io.StringIO(json.dumps(tree))))
+    assert obs == [DictToNode().visit(tree)]
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    '{"Script": {"body": []}',
+    '{"Script": {"body": []}} x',
+    '{"Var": {"name": "x"}, "Pass": {}}',
+    '{"Var": {"name": tru}}',
+    '{"Var" {"name": "x"}}',
+    '{"Var": {"name": "x}}',
+])
+def test_invalid(text):
+    with pytest.raises(ValueError):
+        load(io.StringIO(text), chunksize=4)
@@ -0,0 +1,302 @@
+"""Tests the node classes"""
+import gc
+import pickle
+
+import pytest
+
+from asht import nodes
+from asht.bash import tobash
+from asht.visitors import NodeToDict, NodeToFrozen
+
+
+def test_nodes_have_no_dict():
+    node = nodes.Command(args=[nodes.RawString(value="ls")])
+    assert not hasattr(node, "__dict__")
+    with pytest.raises(AttributeError):
+        node.not_an_attr = 42
+
+
+def test_slots_from_attrs():
+    # along with the state of tracked nodes, which others leave unset
+    assert set(nodes.Node.__slots__) == {"lineno", "column"}
+    assert set(nodes.Assign.__slots__) == {"name", "value", "scope"}
+    # inherited attrs are not slotted again
+    assert nodes.CapturedCommand.__slots__ == ()
+    assert nodes.And.__slots__ == ()
+
+
+def test_class_defaults():
+    node = nodes.CapturedCommand(args=[])
+    assert node.stdin == nodes.StdIn()
+    assert node.stdout == nodes.StdOut()
+    assert node.stderr == nodes.StdErr()
+    assert node.background is False
+    assert node.lineno == 1
+    assert node.column == 1
+    node = nodes.Command(args=[], stderr=nodes.RawString(value="x"),
+                         lineno=3, column=7)
+    assert node.stderr == nodes.RawString(value="x")
+    assert node.stdout == nodes.StdOut()
+    assert (node.lineno, node.column) == (3, 7)
+
+
+def test_unknown_attr():
+    with pytest.raises(RuntimeError, match="unknown attributes of node Var"):
+        nodes.Var(name="x", value="y")
+
+
+class Custom(nodes.Statement):
+    attrs = frozenset(["node", "flag"])
+    flag = "on"
+
+
+def test_subclass():
+    node = Custom(node=nodes.Pass())
+    assert node.flag == "on"
+    assert Custom.__slots__ == ("flag",)
+    assert Custom._defaults["flag"] == "on"
+    assert node == Custom(node=nodes.Pass(), flag="on")
+    assert node != Custom(node=nodes.Pass(), flag="off")
+
+
+def test_fields_order():
+    assert nodes.Command.fields == ("args", "stdin", "stdout", "stderr", "background")
+    assert nodes.CapturedCommand.fields == nodes.Command.fields
+    assert nodes.Command.attrs == frozenset(nodes.Command.fields)
+    # set attrs keep the base fields first and sort the rest
+    assert Custom.fields == ("node", "flag")
+
+
+def test_positional_and_keyword():
+    args = [nodes.RawString("ls"), nodes.RawString("-l")]
+    x = nodes.Command(args, nodes.StdIn(), stderr=nodes.StdOut(), lineno=2)
+    y = nodes.Command(args=args, stderr=nodes.StdOut(), lineno=2)
+    assert x == y
+    assert x.args is args
+    assert x.lineno == 2
+    assert x.column == 1
+    assert nodes.Assign("x", nodes.RawString("1"), "local").scope == "local"
+
+
+def test_too_many_positional():
+    with pytest.raises(TypeError):
+        nodes.Var("x", "y")
+    with pytest.raises(TypeError):
+        nodes.Var("x", 2)  # lineno is keyword only
+
+
+def test_missing_fields_unset():
+    node = nodes.If(test=nodes.Var("x"))
+    with pytest.raises(AttributeError):
+        node.body
+
+
+class Named(nodes.Var):
+
+    def __init__(self, name):
+        super().__init__(name=name.upper())
+
+
+class SubNamed(Named):
+    pass
+
+
+def test_custom_init_kept():
+    assert Named("x").name == "X"
+    assert SubNamed("y").name == "Y"
+
+
+def test_frozen_class():
+    cls = nodes.frozen(nodes.Command)
+    assert cls.__name__ == "Command"
+    assert issubclass(cls, nodes.Command)
+    assert issubclass(cls, nodes.FrozenNode)
+    assert nodes.frozen(nodes.Command) is cls
+    assert nodes.frozen(cls) is cls
+    assert cls.fields == nodes.Command.fields
+    node = cls([nodes.frozen(nodes.RawString)("ls")])
+    assert isinstance(node.args, tuple)
+    assert isinstance(node.stdin, nodes.frozen(nodes.StdIn))
+    with pytest.raises(AttributeError):
+        node.args = ()
+    with pytest.raises(AttributeError):
+        del node.args
+
+
+def test_frozen_hash_and_eq():
+    Var = nodes.frozen(nodes.Var)
+    Not = nodes.frozen(nodes.Not)
+    x = Not(Var("x"), lineno=2)
+    assert x == Not(Var("x"))
+    assert hash(x) == hash(Not(Var("x")))
+    assert x != Not(Var("y"))
+    assert x != nodes.Not(nodes.Var("x"))
+    assert nodes.Not(nodes.Var("x")) != x
+    assert len({x, Not(Var("x")), Not(Var("y"))}) == 2
+    with pytest.raises(TypeError):
+        hash(nodes.Var("x"))
+
+
+def test_interner():
+    intern = nodes.Interner()
+    x = intern(nodes.Var, "x")
+    assert intern(nodes.Var, name="x") is x
+    y = intern(nodes.Var, "y")
+    z = intern(nodes.Var, "x", lineno=3)
+    assert y is not x
+    assert z is not x
+    assert z == x
+    assert len(intern) == 3
+
+
+def test_interner_weak():
+    intern = nodes.Interner()
+    tree = intern.freeze(nodes.Not(nodes.Var("x")))
+    assert len(intern) == 2
+    del tree
+    gc.collect()
+    assert len(intern) == 0
+
+
+def test_freeze_shares_subtrees():
+    tree = nodes.Script(body=[
+        nodes.Statement(nodes.Command([nodes.RawString("echo")])),
+        nodes.Statement(nodes.Command([nodes.RawString("echo")])),
+    ])
+    intern = nodes.Interner()
+    frozen = intern.freeze(tree)
+    assert frozen == intern.freeze(tree)
+    assert frozen.body[0] is frozen.body[1]
+    assert isinstance(frozen.body, tuple)
+    assert tobash(frozen) == tobash(tree)
+    assert NodeToDict().visit(frozen) == NodeToDict().visit(tree)
+    unshared = NodeToFrozen().visit(tree)
+    assert unshared == frozen
+    assert unshared.body[0] is not unshared.body[1]
+
+
+@pytest.mark.parametrize("node", [
+    nodes.Command([nodes.RawString("ls")]),
+    nodes.Command([nodes.RawString("ls")], background=True, lineno=4, column=2),
+    nodes.If(test=nodes.Var("x")),
+    nodes.frozen(nodes.Not)(nodes.frozen(nodes.Var)("x"), lineno=2),
+    Custom(node=nodes.Pass(), flag="off"),
+    Named("x"),
+])
+def test_pickle(node):
+    for proto in range(2, pickle.HIGHEST_PROTOCOL + 1):
+        other = pickle.loads(pickle.dumps(node, proto))
+        assert type(other) is type(node)
+        assert (other.lineno, other.column) == (node.lineno, node.column)
+        for field in node.fields:
+            if hasattr(node, field):
+                assert getattr(other, field) == getattr(node, field)
+            else:
+                assert not hasattr(other, field)
+
+
+def test_pickle_is_positional():
+    node = nodes.Command([nodes.RawString("ls")])
+    assert node.__reduce__() == (nodes.Command, ([nodes.RawString("ls")],))
+
+
+def _tracked_script():
+    return nodes.track(nodes.Script(body=[
+        nodes.Assign(name="x", value=nodes.String(parts=[nodes.RawString("1")])),
+        nodes.If(test=nodes.Var("x"), body=[nodes.Delete(name="x")]),
+    ]))
+
+
+def test_track_in_place():
+    tree = nodes.Script(body=[nodes.Command(args=[nodes.RawString("ls")])])
+    plain = NodeToDict().visit(tree)
+    stmt = tree.body[0]
+    assert nodes.track(tree) is tree
+    assert tree.body[0] is stmt
+    assert type(stmt).__name__ == "Command" and stmt._tracked
+    assert isinstance(stmt, nodes.Command)
+    assert isinstance(tree.body, nodes.TrackedList)
+    assert tree == nodes.Script(body=[nodes.Command(args=[nodes.RawString("ls")])])
+    assert NodeToDict().visit(tree) == plain
+    assert tobash(tree) == "ls\n"
+    assert not nodes.is_dirty(tree)
+    nodes.untrack(tree)
+    assert type(stmt) is nodes.Command and type(tree.body) is list
+    assert not nodes.is_dirty(tree)
+
+
+def test_track_dirty_propagates():
+    tree = _tracked_script()
+    assign, if_ = tree.body
+    if_.body[0].name = "y"
+    assert nodes.is_dirty(if_.body[0])
+    assert nodes.is_dirty(if_) and nodes.is_dirty(tree)
+    assert not nodes.is_dirty(assign)
+    nodes.clean(tree)
+    assert not any(map(nodes.is_dirty, (tree, assign, if_, if_.body[0])))
+    assign.value.parts[0].value = "2"
+    assert nodes.is_dirty(assign.value) and nodes.is_dirty(assign)
+    assert nodes.is_dirty(tree) and not nodes.is_dirty(if_)
+
+
+def test_track_shared_leaf():
+    leaf = nodes.RawString("a")
+    first = nodes.Statement(node=nodes.Command(args=[leaf]))
+    second = nodes.Assign(name="x", value=nodes.String(parts=[leaf]), scope="global")
+    tree = nodes.track(nodes.Script(body=[first, second]))
+    assert first.node.args[0] is leaf and second.value.parts[0] is leaf
+    leaf.value = "b"
+    # both of the paths from the leaf to the root are marked
+    assert nodes.is_dirty(first) and nodes.is_dirty(second)
+    nodes.clean(tree)
+    assert not any(map(nodes.is_dirty, (tree, first, second, leaf)))
+    nodes.untrack(tree)
+    assert type(leaf) is nodes.RawString and not nodes.is_dirty(leaf)
+
+
+def test_track_list_changes():
+    tree = _tracked_script()
+    if_ = tree.body[1]
+    new = nodes.Pass()
+    if_.body.append(new)
+    assert nodes.is_dirty(if_) and nodes.is_dirty(tree)
+    assert new._tracked
+    nodes.clean(tree)
+    # nodes added to a tracked tree are tracked in turn
+    new.lineno = 3
+    assert not nodes.is_dirty(new)
+    if_.orelse = [nodes.Delete(name="x")]
+    assert isinstance(if_.orelse, nodes.TrackedList)
+    nodes.clean(tree)
+    if_.orelse[0].name = "z"
+    assert nodes.is_dirty(if_) and nodes.is_dirty(tree)
+    nodes.clean(tree)
+    del tree.body[0]
+    assert nodes.is_dirty(tree) and not nodes.is_dirty(if_)
+
+
+def test_track_copies_shared_defaults():
+    default = nodes.Command._defaults["stdin"]
+    tree = nodes.track(nodes.Script(body=[nodes.Command(args=[nodes.RawString("ls")])]))
+    cmd = tree.body[0]
+    assert cmd.stdin is not default and cmd.stdin._tracked
+    assert cmd.stdin == default and type(default) is nodes.StdIn
+    assert nodes.Command().stdin is default
+    cmd.stdout = nodes.Command._defaults["stdout"]
+    assert cmd.stdout is not nodes.Command._defaults["stdout"]
+    assert type(nodes.Command._defaults["stdout"]) is nodes.StdOut
+    nodes.clean(tree)
+    cmd.stdin.lineno = 2
+    assert not nodes.is_dirty(tree)
+
+
+def test_track_frozen_and_pickle():
+    frozen_var = nodes.frozen(nodes.Var)("x")
+    tree = nodes.track(nodes.Script(body=[nodes.Not(node=frozen_var)]))
+    assert tree.body[0].node is frozen_var and not frozen_var._tracked
+    other = pickle.loads(pickle.dumps(tree))
+    assert type(other) is nodes.Script and type(other.body) is list
+    assert type(other.body[0]) is nodes.Not
+    assert other == tree
+    with pytest.raises(TypeError):
+        nodes.tracked(type(frozen_var))
@@ -0,0 +1,352 @@
+"""Tests the optimization passes"""
+import shutil
+import subprocess
+
+import pytest
+
+from asht import nodes
+from asht.bash import tobash, frombash
+from asht.optimize import OptimizeReport, hoist_commands, peephole, remove_dead_code
+from asht.visitors import DictToNode, NodeToDict, NodeToFrozen
+
+from .cases import DICT_CASES
+
+
+def raw(*values):
+    return nodes.String([nodes.RawString(v) for v in values])
+
+
+def cmd(*args):
+    return nodes.Command([nodes.RawString(a) for a in args])
+
+
+def optimized(*stmts):
+    report = OptimizeReport()
+    tree = peephole(nodes.Script(body=list(stmts)), report)
+    return tree.body, report
+
+
+@pytest.mark.parametrize("key", sorted(DICT_CASES))
+def test_peephole_cases(key):
+    tree = DictToNode().visit(DICT_CASES[key])
+    report = OptimizeReport()
+    once = peephole(tree, report)
+    # the tree is not changed, and a second pass finds nothing to do
+    assert tree == DictToNode().visit(DICT_CASES[key])
+    if once is None:
+        # an If that does nothing
+        assert isinstance(tree, nodes.If) and report.removed["If"] == 1
+        return
+    again = OptimizeReport()
+    assert peephole(once, again) == once
+    assert again.total == 0
+
+
+def test_merge_raw_strings():
+    value = nodes.String([nodes.RawString("a"), nodes.RawString("b"),
+                          nodes.EnvVar("HOME"), nodes.RawString("c"),
+                          nodes.RawString("d"), nodes.RawString("e")])
+    body, report = optimized(nodes.EnvAssign("X", value))
+    assert body[0].value == nodes.String([nodes.RawString("ab"), nodes.EnvVar("HOME"),
+                                          nodes.RawString("cde")])
+    assert report.removed == {"RawString": 3}
+    assert report.total == 3
+
+
+def test_redundant_pass():
+    body, report = optimized(
+        nodes.Pass(),
+        nodes.Function("f", [nodes.Pass(), nodes.Statement(cmd("ls")), nodes.Pass()]),
+        nodes.Function("g", [nodes.Comment("nothing"), nodes.Pass(), nodes.Pass()]),
+    )
+    assert len(body) == 2
+    assert body[0].body == [nodes.Statement(cmd("ls"))]
+    assert body[1].body == [nodes.Comment("nothing"), nodes.Pass()]
+    assert report.removed == {"Pass": 4}
+
+
+def test_double_not():
+    test = nodes.Not(nodes.Not(nodes.Not(nodes.Var("x"))))
+    body, report = optimized(nodes.If(test, [nodes.Statement(cmd("ls"))], []))
+    assert body[0].test == nodes.Not(nodes.Var("x"))
+    assert report.removed == {"Not": 2}
+
+
+@pytest.mark.parametrize("second, removed", [
+    (nodes.EnvAssign("X", raw("2")), True),
+    (nodes.EnvDelete("X"), True),
+    (nodes.EnvAssign("Y", raw("2")), False),
+    (nodes.EnvAssign("X", nodes.String([nodes.EnvVar("X"), nodes.RawString(":2")])), False),
+    (nodes.EnvAssign("X", nodes.String([nodes.CapturedCommand([nodes.RawString("f")])])), False),
+])
+def test_overwritten_env_assign(second, removed):
+    first = nodes.EnvAssign("X", raw("1"))
+    body, report = optimized(first, second)
+    assert body == ([second] if removed else [first, second])
+    assert report.total == (3 if removed else 0)
+
+
+def test_overwritten_env_assign_with_command_kept():
+    first = nodes.EnvAssign("X", nodes.String([nodes.CapturedCommand([nodes.RawString("f")])]))
+    body, report = optimized(first, nodes.EnvDelete("X"))
+    assert len(body) == 2
+
+
+def test_overwritten_env_assign_chain():
+    body, report = optimized(*[nodes.EnvAssign("X", raw(str(i))) for i in range(4)])
+    assert body == [nodes.EnvAssign("X", raw("3"))]
+    assert report.rewrites == {"overwritten EnvAssign": 3}
+
+
+def test_empty_if_branches():
+    body, report = optimized(
+        nodes.If(nodes.Var("a"), [nodes.Statement(cmd("ls"))], [nodes.Pass()]),
+        nodes.If(nodes.Var("b"), [nodes.Pass()], [nodes.Delete("q")]),
+        nodes.If(nodes.Not(nodes.Var("c")), [], [nodes.Delete("q")]),
+        nodes.If(nodes.Var("d"), [], []),
+        nodes.If(cmd("true"), [nodes.Pass()], []),
+        nodes.If(nodes.String([nodes.CapturedCommand([nodes.RawString("f")])]), [], []),
+    )
+    assert body[0] == nodes.If(nodes.Var("a"), [nodes.Statement(cmd("ls"))], [])
+    assert body[1] == nodes.If(nodes.Not(nodes.Var("b")), [nodes.Delete("q")], [])
+    assert body[2] == nodes.If(nodes.Var("c"), [nodes.Delete("q")], [])
+    assert body[3] == nodes.Statement(cmd("true"))
+    assert isinstance(body[4], nodes.If)
+    assert len(body) == 5
+    assert tobash(nodes.Script(body)).startswith("if $a; then\n  ls\nfi\n")
+
+
+@pytest.mark.parametrize("stmt", [
+    nodes.Function("f", [nodes.If(nodes.Var("d"), [], [])]),
+    nodes.For(nodes.Var("i"), nodes.RawString("a b"),
+              [nodes.Comment("c"), nodes.If(nodes.Var("d"), [nodes.Pass()], [])]),
+    nodes.If(cmd("true"), [nodes.Comment("c"), nodes.If(nodes.Var("d"), [], [])], []),
+])
+def test_emptied_blocks(stmt):
+    body, report = optimized(stmt)
+    assert report.removed["If"] == 1
+    code = tobash(nodes.Script(body))
+    assert "  :\n" in code
+    if shutil.which("bash"):
+        subprocess.run(["bash", "-n"], input=code, text=True, check=True)
+
+
+def test_frozen_input():
+    tree = NodeToFrozen().visit(nodes.Script(body=[nodes.Pass(), nodes.Delete("x")]))
+    rtn = peephole(tree)
+    assert type(rtn) is nodes.Script and not rtn._frozen
+    assert rtn.body == [nodes.Delete("x")]
+
+
+def cc(*args):
+    return nodes.CapturedCommand([nodes.RawString(a) for a in args])
+
+
+def echo(*args):
+    return nodes.Statement(nodes.Command([nodes.RawString("echo"), *args]))
+
+
+def hoisted(*stmts, pure=("uname", "basename")):
+    report = OptimizeReport()
+    tree = hoist_commands(nodes.Script(body=list(stmts)), pure, report)
+    return tree.body, report
+
+
+def test_hoist_common():
+    body, report = hoisted(
+        nodes.EnvAssign("A", nodes.String([cc("uname", "-s")])),
+        echo(cc("date")),
+        nodes.EnvAssign("B", nodes.String([cc("uname", "-s"), nodes.RawString("/x")])),
+        echo(cc("date")),
+    )
+    assert body[0] == nodes.Assign("_asht_cc0", cc("uname", "-s"), "global")
+    assert body[1] == nodes.EnvAssign("A", nodes.String([nodes.Var("_asht_cc0")]))
+    assert body[3].value.parts[0] == nodes.Var("_asht_cc0")
+    # commands that are not allowed are left alone
+    assert body[2] == echo(cc("date")) and body[4] == echo(cc("date"))
+    assert report.rewrites == {"common CapturedCommand": 1}
+    assert report.removed["CapturedCommand"] == 1
+
+
+def test_hoist_not_across_writes():
+    arg = nodes.CapturedCommand([nodes.RawString("basename"), nodes.EnvVar("X")])
+    stmts = [
+        nodes.Assign("a", nodes.String([arg]), "global"),
+        nodes.EnvAssign("X", nodes.String([nodes.RawString("y")])),
+        nodes.Assign("b", nodes.String([arg]), "global"),
+    ]
+    body, report = hoisted(*stmts)
+    assert body == stmts
+    assert report.total == 0
+    # nor across commands that are not allowed, which may write anything
+    body, report = hoisted(stmts[0], echo(), stmts[2])
+    assert len(body) == 3 and report.total == 0
+    body, report = hoisted(stmts[0], stmts[2])
+    assert len(body) == 3 and report.rewrites == {"common CapturedCommand": 1}
+
+
+def test_hoist_not_impure_args_or_redirected():
+    nested = nodes.CapturedCommand([nodes.RawString("basename"), cc("date")])
+    redirected = cc("uname")
+    redirected.stderr = nodes.RawString("/dev/null")
+    stmts = [echo(nested), echo(nested), echo(redirected), echo(redirected)]
+    body, report = hoisted(*stmts)
+    assert body == stmts
+    assert report.total == 0
+
+
+def test_hoist_loop_invariant():
+    loop = nodes.For(nodes.Var("i"), nodes.String([nodes.RawString("a b")]), [
+        echo(cc("uname", "-m"), nodes.Var("i")),
+        echo(nodes.CapturedCommand([nodes.RawString("basename"), nodes.Var("i")])),
+    ])
+    body, report = hoisted(loop)
+    assert body[0] == nodes.Assign("_asht_cc0", cc("uname", "-m"), "global")
+    assert body[1].body[0] == echo(nodes.Var("_asht_cc0"), nodes.Var("i"))
+    assert isinstance(body[1].body[1].node.args[1], nodes.CapturedCommand)
+    assert report.rewrites == {"loop-invariant CapturedCommand": 1}
+    # the input is not changed
+    assert isinstance(loop.body[0].node.args[1], nodes.CapturedCommand)
+
+
+def test_hoist_in_function_is_local_and_names_are_fresh():
+    body, report = hoisted(
+        nodes.Assign("_asht_cc0", nodes.String([nodes.RawString("taken")]), "global"),
+        nodes.Function("f", [
+            nodes.Assign("q", nodes.String([cc("uname", "-r")]), "local"),
+            nodes.Assign("r", nodes.String([cc("uname", "-r")]), "local"),
+        ]),
+    )
+    assert body[1].body[0] == nodes.Assign("_asht_cc1", cc("uname", "-r"), "local")
+    assert len(body[1].body) == 3
+    code = tobash(nodes.Script(body=body))
+    assert "  local _asht_cc1=$(uname -r)\n" in code
+    # locals are only declared within functions
+    assert tobash(nodes.Assign("x", nodes.String([]), "local")) == 'x=""\n'
+
+
+def test_hoist_numbered_in_source_order():
+    loop = nodes.For(nodes.Var("i"), nodes.String([nodes.RawString("a b")]), [
+        echo(cc("uname", "-m"), nodes.Var("i")),
+    ])
+    body, report = hoisted(echo(cc("uname", "-s")), echo(cc("uname", "-s")), loop)
+    assert body[0] == nodes.Assign("_asht_cc0", cc("uname", "-s"), "global")
+    assert body[1] == echo(nodes.Var("_asht_cc0"))
+    assert body[3] == nodes.Assign("_asht_cc1", cc("uname", "-m"), "global")
+    assert body[4].body[0] == echo(nodes.Var("_asht_cc1"), nodes.Var("i"))
+
+
+@pytest.mark.parametrize("key", sorted(DICT_CASES))
+def test_hoist_cases(key):
+    tree = DictToNode().visit(DICT_CASES[key])
+    assert hoist_commands(tree, ["which", "ls", "echo"]) is not None
+
+
+def assign(name, *parts):
+    parts = [nodes.RawString(p) if isinstance(p, str) else p for p in parts]
+    return nodes.Assign(name, nodes.String(parts), "global")
+
+
+def call(name, *args):
+    return nodes.Statement(nodes.Command([nodes.RawString(name), *args]))
+
+
+def names(stmts):
+    return [getattr(x, "name", None) for x in stmts]
+
+
+def dead_code(*stmts, keep=()):
+    report = OptimizeReport()
+    tree = remove_dead_code(nodes.Script(body=list(stmts)), keep, report)
+    return tree.body, report
+
+
+def test_dead_code_use_def():
+    body, report = dead_code(
+        assign("a", "1"),
+        assign("b", nodes.Var("a")),
+        assign("unused", "x"),
+        nodes.Function("f", [call("g")]),
+        nodes.Function("g", [assign("z", "q")]),
+        nodes.Function("pub", [call("echo", nodes.Var("b"))]),
+        nodes.Delete("unused"),
+        keep=["pub"],
+    )
+    assert names(body) == ["a", "b", "pub", "unused"]
+    assert isinstance(body[-1], nodes.Delete)
+    assert report.rewrites == {"unused Assign": 1, "unused Function": 2}
+    # the Assign within g is counted with it
+    assert report.removed["Assign"] == 2
+    # the default StdIn, StdOut, and StdErr of the Command in f are shared,
+    # and are not counted
+    assert report.removed == {"Assign": 2, "Function": 2, "Statement": 1, "Command": 1,
+                              "RawString": 3, "String": 2}
+
+
+def test_dead_code_uses_in_strings_and_envvars():
+    body, report = dead_code(
+        assign("x", "1"),
+        assign("y", "2"),
+        nodes.Function("f", [nodes.Pass()]),
+        nodes.AliasAssign("ff", nodes.String([nodes.RawString("f --flag")])),
+        nodes.EnvAssign("E", nodes.String([nodes.EnvVar("x")])),
+        call("echo", nodes.RawString("${y}")),
+    )
+    assert report.total == 0
+
+
+def test_dead_code_keeps_commands_and_blocks_valid():
+    body, report = dead_code(
+        nodes.Assign("v", nodes.String([nodes.CapturedCommand([nodes.RawString("date")])]),
+                     "global"),
+        nodes.If(nodes.Var("v"), [nodes.Function("f", [nodes.Pass()])], []),
+    )
+    assert names(body) == ["v", None]
+    assert body[1].body == [nodes.Pass()]
+    assert report.rewrites == {"unused Function": 1}
+
+
+def test_dead_code_dynamic_commands():
+    f = nodes.Function("f", [nodes.Pass()])
+    body, report = dead_code(f, assign("x", "1"),
+                             nodes.Statement(nodes.Command([nodes.Var("cmd")])))
+    assert names(body) == ["f", None]
+    body, report = dead_code(f, assign("x", "1"), call("source", nodes.RawString("y.sh")))
+    assert report.total == 0 and len(body) == 3
+
+
+@pytest.mark.parametrize("key", sorted(DICT_CASES))
+def test_dead_code_cases(key):
+    tree = DictToNode().visit(DICT_CASES[key])
+    rtn = remove_dead_code(tree)
+    assert tobash(rtn) is not None
+
+
+def test_dead_code_keeps_what_the_shell_uses():
+    src = (
+        'PS1="(env) $PS1"\n'
+        'PROMPT_COMMAND=update_prompt\n'
+        'function update_prompt {\n  echo hi\n}\n'
+        'IFS=:\n'
+        'PATH="/opt/env/bin:$PATH"\n'
+        'function cleanup {\n  echo bye\n}\n'
+        'trap cleanup EXIT\n'
+        'function unused {\n  echo no\n}\n'
+    )
+    report = OptimizeReport()
+    tree = remove_dead_code(frombash(src), report=report)
+    assert tobash(tree) == src.replace('function unused {\n  echo no\n}\n', "")
+    assert report.rewrites == {"unused Function": 1}
+
+
+@pytest.mark.parametrize("optimize", [
+    peephole,
+    lambda tree: hoist_commands(tree, ("uname",)),
+    remove_dead_code,
+])
+def test_none_fields_kept(optimize):
+    assign = nodes.Assign("x", nodes.RawString("1"), None)
+    tree = nodes.Script(body=[assign, echo(nodes.Var("x"))])
+    rtn = optimize(tree)
+    assert rtn.body[0].scope is None
+    assert NodeToDict().visit(rtn) == NodeToDict().visit(tree)
@@ -0,0 +1,136 @@
+"""Tests the pretty formatters"""
+import io
+
+import pytest
+
+from asht import nodes
+from asht.pretty import NodePrettyFormatter, BoundedFormatter, pformat, pformat_bounded, pprint
+from asht.visitors import DictToNode, NodeToFrozen
+
+from .cases import DICT_CASES
+
+
+def test_pformat_node():
+    tree = nodes.Script(body=[
+        nodes.If(test=nodes.Var(name="x"), body=[nodes.Pass()], orelse=[]),
+        nodes.Assign(name="y", value=nodes.String(parts=[]), scope="local"),
+    ])
+    assert pformat(tree) == """\
+Script(
+ body=[
+  If(
+   test=Var(
+    name='x'
+   ),
+   body=[
+    Pass()
+   ],
+   orelse=[]
+  ),
+  Assign(
+   name='y',
+   value=String(
+    parts=[]
+   ),
+   scope='local'
+  )
+ ]
+)"""
+    assert str(tree) == pformat(tree)
+    assert pformat(nodes.Pass()) == "Pass()"
+    assert pformat(nodes.Var(name="x"), indent="    ") == "Var(\n    name='x'\n)"
+
+
+def test_pformat_unset_fields():
+    assert pformat(nodes.If(test=nodes.Var(name="x"))) == \
+        "If(\n test=Var(\n  name='x'\n )\n)"
+
+
+@pytest.mark.parametrize("case", sorted(DICT_CASES))
+def test_pformat_cases(case):
+    tree = DictToNode().visit(DICT_CASES[case])
+    s = pformat(tree)
+    # every node is on a line of its own, in the order of the fields
+    assert s.count("(\n") + s.count("()") == s.count("(")
+    assert s == pformat(NodeToFrozen().visit(tree))
+    f = io.StringIO()
+    pprint(tree, file=f)
+    assert f.getvalue() == s + "\n"
+
+
+def test_pformat_deep():
+    tree = nodes.Pass()
+    for _ in range(100000):
+        tree = nodes.Not(node=tree)
+    chunks = []
+    NodePrettyFormatter(write=chunks.append, indent="").visit(tree)
+    assert len(chunks) == 200001
+    assert chunks[0] == "Not(" and chunks[-1] == "\n)"
+
+
+def test_pprint_dict():
+    f = io.StringIO()
+    pprint({"Pass": {}}, file=f)
+    assert f.getvalue() == "{'Pass': {}}\n"
+
+
+def test_pformat_siblings():
+    tree = nodes.Script(body=[
+        nodes.Statement(node=nodes.Not(node=nodes.Var(name="x"))),
+        nodes.Pass(),
+        nodes.Delete(name="y"),
+    ])
+    assert pformat(tree) == """\
+Script(
+ body=[
+  Statement(
+   node=Not(
+    node=Var(
+     name='x'
+    )
+   )
+  ),
+  Pass(),
+  Delete(
+   name='y'
+  )
+ ]
+)"""
+
+
+def test_pformat_one_line():
+    tree = nodes.If(test=nodes.Var(name="x"), body=[nodes.Pass(), nodes.Pass()], orelse=[])
+    assert pformat(tree, indent=None) == \
+        "If(test=Var(name='x'), body=[Pass(), Pass()], orelse=[])"
+    assert repr(tree) == pformat(tree, indent=None)
+
+
+def test_pformat_bounded():
+    tree = nodes.Script(body=[nodes.Delete(name=str(i)) for i in range(10)])
+    assert pformat_bounded(tree, indent=None, max_items=2) == \
+        "Script(body=[Delete(name='0'), Delete(name='1'), ...<8 more>])"
+    assert pformat_bounded(tree, indent=None, max_chars=20) == "Script(body=[Delete(..."
+    deep = nodes.Not(node=nodes.Not(node=nodes.Var(name="x")))
+    assert pformat_bounded(deep, indent=None, max_depth=1) == "Not(node=Not(...))"
+    assert pformat_bounded(deep, max_depth=2) == "Not(\n node=Not(\n  node=Var(...)\n )\n)"
+    assert pformat_bounded(nodes.Var(name="x" * 100), max_chars=14) == "Var(\n name='xx..."
+    # nothing is left out of small trees
+    assert pformat_bounded(deep) == pformat(deep)
+    # nor of the output of the formatter once it is done
+    f = BoundedFormatter(indent=None, max_chars=5)
+    f.visit(deep)
+    f.visit(deep)
+    assert "".join(f.chunks) == "Not(n...Not(n..."
+
+
+def test_repr_giant_trees():
+    wide = nodes.Script(body=[nodes.Delete(name=str(i)) for i in range(100000)])
+    deep = nodes.Pass()
+    for _ in range(100000):
+        deep = nodes.Not(node=deep)
+    for tree in (wide, deep):
+        assert len(repr(tree)) <= 503
+        assert len(str(tree)) <= 4003
+    assert repr(wide).endswith("...<99990 more>])")
+    assert str(wide).endswith("...<99980 more>\n ]\n)")
+    assert str(deep).count("Not(") == 9 and "Not(...)" in str(deep)
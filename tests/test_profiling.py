@@ -0,0 +1,102 @@
+"""Tests profiling of visitors"""
+import pytest
+
+from asht import nodes, visitors
+from asht.bash import tobash
+from asht.profiling import Profile
+from asht.visitors import NodeToDict, DictToNode, NodeVisitor
+
+from .cases import DICT_CASES
+
+
+def _count_kinds(dct, counts):
+    if isinstance(dct, dict):
+        kind, attrs = next(iter(dct.items()))
+        counts[kind] = counts.get(kind, 0) + 1
+        for val in attrs.values():
+            _count_kinds(val, counts)
+    elif isinstance(dct, list):
+        for x in dct:
+            _count_kinds(x, counts)
+    return counts
+
+
+def _indentation(code):
+    return sum(len(line) - len(line.lstrip(" ")) for line in code.splitlines())
+
+
+@pytest.mark.parametrize("case", sorted(DICT_CASES))
+def test_profile_counts_and_output(case):
+    dct = DICT_CASES[case]
+    tree = DictToNode().visit(dct)
+    with Profile() as prof:
+        code = tobash(tree)
+        assert tobash(dct) == code
+    counts = _count_kinds(dct, {})
+    for cls in ("ToBash", "ToBashFromDict"):
+        stats = {name.split(".visit_")[1]: s for name, s in prof.stats.items()
+                 if name.startswith(cls + ".")}
+        # the default StdIn, StdOut, and StdErr of a Command are not visited
+        assert set(stats) <= set(counts)
+        for kind, s in stats.items():
+            assert s.calls <= counts[kind]
+            assert 0 <= s.self_ns <= s.cumulative_ns
+        # the output of all of the visits adds up to the code
+        assert sum(s.output for s in stats.values()) == len(code) - _indentation(code)
+
+
+def test_profile_nesting_and_collapsed():
+    tree = DictToNode().visit(DICT_CASES["compound-script"])
+    with Profile() as outer:
+        with Profile() as inner:
+            NodeToDict().visit(tree)
+        assert visitors._profiler is outer
+        tobash(tree)
+    assert visitors._profiler is None
+    assert all(name.startswith("NodeToDict.") for name in inner.stats)
+    assert all(name.startswith("ToBash.") for name in outer.stats)
+    lines = outer.collapsed().splitlines()
+    assert lines
+    total = 0
+    for line in lines:
+        stack, ns = line.rsplit(" ", 1)
+        assert stack.split(";")[0] == "ToBash.visit_Script"
+        total += int(ns)
+    assert total == sum(s.self_ns for s in outer.stats.values())
+    assert outer.stats["ToBash.visit_Script"].cumulative_ns >= total
+    assert "ToBash.visit_Script" in str(outer)
+
+
+def test_profile_only_visitors_bound_within():
+    visitor = NodeToDict()
+    tree = nodes.Var(name="x")
+    visitor.visit(tree)
+    with Profile() as prof:
+        visitor.visit(tree)
+        visitor.visit(nodes.Pass())
+    assert list(prof.stats) == ["NodeToDict.visit_Pass"]
+    # a visitor used after the block is no longer recorded
+    visitor.visit(nodes.Pass())
+    assert prof.stats["NodeToDict.visit_Pass"].calls == 1
+
+
+class Failing(NodeVisitor):
+
+    def visit_Not(self, node):
+        return (yield node.node)
+
+    def visit_Var(self, node):
+        if node.name == "fail":
+            raise ValueError(node.name)
+        return node.name
+
+
+def test_profile_exceptions():
+    with Profile() as prof:
+        with pytest.raises(ValueError):
+            Failing().visit(nodes.Not(node=nodes.Not(node=nodes.Var(name="fail"))))
+        assert prof._stack == []
+        assert Failing().visit(nodes.Not(node=nodes.Var(name="x"))) == "x"
+    assert prof.stats["Failing.visit_Not"].calls == 1
+    assert prof.stats["Failing.visit_Var"].calls == 1
+    assert prof.collapsed().splitlines()[0].startswith("Failing.visit_Not")
@@ -0,0 +1,111 @@
+"""Tests structural diffs and patches of node trees"""
+import itertools
+import pickle
+import random
+
+import pytest
+
+import asht
+from asht import nodes
+from asht.treediff import Edit, diff, patch
+from asht.visitors import DictToNode
+
+from .cases import DICT_CASES
+
+
+def copy(tree):
+    return pickle.loads(pickle.dumps(tree))
+
+
+def stmts(*names):
+    return [nodes.Assign(name=n, value=nodes.String(parts=[nodes.RawString(n)]),
+                         scope="global")
+            for n in names]
+
+
+def check(a, b):
+    edits = diff(a, b)
+    patched = patch(copy(a), edits)
+    assert patched == b
+    return edits
+
+
+def test_reexported():
+    assert asht.diff is diff
+    assert asht.patch is patch
+
+
+@pytest.mark.parametrize("key", sorted(DICT_CASES))
+def test_identical(key):
+    a = DictToNode().visit(DICT_CASES[key])
+    b = DictToNode().visit(DICT_CASES[key])
+    assert diff(a, b) == []
+
+
+@pytest.mark.parametrize("ka, kb", list(itertools.combinations(
+    sorted(k for k in DICT_CASES if not k.startswith("empty")), 2)))
+def test_patch_between_cases(ka, kb):
+    a = DictToNode().visit(DICT_CASES[ka])
+    b = DictToNode().visit(DICT_CASES[kb])
+    check(a, b)
+    check(b, a)
+
+
+def test_value_change_is_local():
+    a = nodes.Script(body=stmts("a", "b", "c"))
+    b = nodes.Script(body=stmts("a", "b", "c"))
+    b.body[1].value.parts[0].value = "changed"
+    edits = check(a, b)
+    assert edits == [Edit("replace", ("body", 1, "value", "parts", 0, "value"), "changed")]
+
+
+def test_insert_delete_move():
+    a = nodes.Script(body=stmts("a", "b", "c", "d", "e"))
+    b = nodes.Script(body=stmts("new", "a", "d", "c", "e"))
+    edits = check(a, b)
+    assert [e.op for e in edits] == ["delete", "insert", "move"]
+    assert edits[0] == Edit("delete", ("body", 1))
+
+
+def test_field_set_and_deleted():
+    a = nodes.If(test=nodes.Var("x"), body=[])
+    b = nodes.If(test=nodes.Var("x"), body=[], orelse=[nodes.Pass()])
+    assert check(a, b) == [Edit("replace", ("orelse",), [nodes.Pass()])]
+    edits = diff(b, a)
+    assert edits == [Edit("delete", ("orelse",))]
+    assert not hasattr(patch(copy(b), edits), "orelse")
+
+
+def test_replace_root():
+    a = nodes.Var("x")
+    b = nodes.EnvVar("x")
+    assert check(a, b) == [Edit("replace", (), b)]
+    with pytest.raises(ValueError):
+        patch(a, [Edit("delete", ())])
+
+
+def test_large_small_change():
+    a = nodes.Script(body=stmts(*map(str, range(5000))))
+    b = copy(a)
+    b.body[2500].name = "y"
+    del b.body[10]
+    assert len(check(a, b)) == 2
+
+
+def test_random_list_edits():
+    rng = random.Random(0)
+    for _ in range(200):
+        names = [str(rng.randrange(8)) for _ in range(rng.randrange(10))]
+        a = nodes.Script(body=stmts(*names))
+        b = copy(a)
+        for _ in range(rng.randrange(4)):
+            op = rng.randrange(4)
+            if op == 0:
+                b.body.insert(rng.randrange(len(b.body) + 1), *stmts("new"))
+            elif b.body and op == 1:
+                del b.body[rng.randrange(len(b.body))]
+            elif b.body and op == 2:
+                b.body.insert(rng.randrange(len(b.body)), b.body.pop())
+            elif b.body:
+                b.body[rng.randrange(len(b.body))].name = "changed"
+        check(a, b)
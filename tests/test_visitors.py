@@ -0,0 +1,193 @@
+"""Tests the visitor framework"""
+import pickle
+
+import pytest
+
+from asht import nodes
+from asht.bash import tobash, ToBash
+from asht.pretty import pformat
+from asht.visitors import (NodeVisitor, DictVisitor, NodeToDict, DictToNode,
+                           NodeToFrozen, LazyNode)
+
+from .cases import DICT_CASES
+
+
+class Names(NodeVisitor):
+
+    def visit_Var(self, node):
+        return "var:" + node.name
+
+    def visit_default(self, node):
+        return "default:" + node.__class__.__name__
+
+
+class EnvNames(Names):
+
+    def visit_EnvVar(self, node):
+        return "env:" + node.name
+
+
+class Kinds(DictVisitor):
+
+    def visit_Var(self, dct):
+        return "var:" + dct["Var"]["name"]
+
+    def visit_default(self, dct):
+        return "default:" + next(iter(dct))
+
+
+def test_node_dispatch_overrides_and_default():
+    v, e = nodes.Var(name="x"), nodes.EnvVar(name="HOME")
+    assert Names().visit(v) == "var:x"
+    assert Names().visit(e) == "default:EnvVar"
+    assert EnvNames().visit(e) == "env:HOME"
+    assert EnvNames().visit(v) == "var:x"
+    # tables are per subclass and are not shared with the base class
+    assert Names().visit(e) == "default:EnvVar"
+    assert Names._visit_funcs is not EnvNames._visit_funcs
+
+
+def test_dict_dispatch_overrides_and_default():
+    assert Kinds().visit({"Var": {"name": "x"}}) == "var:x"
+    assert Kinds().visit({"Pass": {}}) == "default:Pass"
+
+
+def test_missing_visit_default():
+    with pytest.raises(NotImplementedError, match="visit_Var"):
+        NodeVisitor().visit(nodes.Var(name="x"))
+    with pytest.raises(NotImplementedError, match="visit_Var"):
+        DictVisitor().visit({"Var": {"name": "x"}})
+
+
+@pytest.mark.parametrize("key", sorted(DICT_CASES))
+def test_dict_node_round_trip(key):
+    tree = DictToNode().visit(DICT_CASES[key])
+    assert DictToNode().visit(NodeToDict().visit(tree)) == tree
+
+
+class Depth(NodeVisitor):
+
+    def visit_Var(self, node):
+        return 0
+
+    def visit_Not(self, node):
+        return 1 + (yield node.node)
+
+    def visit_And(self, node):
+        lhs, rhs = yield (node.lhs, node.rhs)
+        return 1 + max(lhs, rhs)
+
+    def visit_Or(self, node):
+        return (yield from self.visit_And(node))
+
+
+def not_chain(depth):
+    tree = nodes.Var(name="x")
+    for _ in range(depth):
+        tree = nodes.Not(node=tree)
+    return tree
+
+
+def test_generator_visit_methods():
+    tree = nodes.And(
+        lhs=nodes.Not(node=nodes.Var(name="x")),
+        rhs=nodes.Or(lhs=nodes.Var(name="y"), rhs=not_chain(3)),
+    )
+    assert Depth().visit(tree) == 5
+
+
+def test_deep_trees_do_not_recurse():
+    depth = 100000
+    tree = not_chain(depth)
+    assert Depth().visit(tree) == depth
+    dct = NodeToDict().visit(tree)
+    assert DictToNode().visit(dct) == tree
+    assert tree != not_chain(depth - 1)
+
+
+class StackDepth(Depth):
+
+    max_direct_depth = 0
+
+
+class StackToDict(NodeToDict):
+
+    max_direct_depth = 0
+
+
+class StackToBash(ToBash):
+
+    max_direct_depth = 0
+
+
+class SuperDepth(Depth):
+
+    def visit_Not(self, node):
+        return (yield from super().visit_Not(node))
+
+
+@pytest.mark.parametrize("depth", [0, 1, 49, 50, 51, 300])
+def test_direct_variants_match_stack(depth):
+    tree = nodes.And(
+        lhs=not_chain(depth),
+        rhs=nodes.Or(lhs=not_chain(2), rhs=nodes.Var(name="y")),
+    )
+    expected = StackDepth().visit(tree)
+    assert expected == 1 + max(depth, 3)
+    assert Depth().visit(tree) == expected
+    # variants are not derived for methods that use zero argument super()
+    assert SuperDepth().visit(tree) == expected
+    assert StackToDict().visit(tree) == NodeToDict().visit(tree)
+    assert StackToBash().emit(tree) == tobash(tree)
+
+
+@pytest.mark.parametrize("key", sorted(DICT_CASES))
+def test_lazy_matches_eager(key):
+    eager = DictToNode().visit(DICT_CASES[key])
+    view = DictToNode(lazy=True).visit(DICT_CASES[key])
+    assert isinstance(view, LazyNode)
+    assert isinstance(view, type(eager))
+    assert view == eager
+    assert eager == view
+    assert pformat(view) == pformat(eager)
+    assert tobash(DictToNode(lazy=True).visit(DICT_CASES[key])) == tobash(eager)
+    assert NodeToDict().visit(view) == NodeToDict().visit(eager)
+
+
+def test_lazy_converts_on_access():
+    dct = DICT_CASES["compound-script"]
+    view = DictToNode(lazy=True).visit(dct)
+    with pytest.raises(AttributeError):
+        object.__getattribute__(view, "body")
+    first = view.body[0]
+    assert view.body is view.body
+    assert isinstance(first, LazyNode)
+    # children of the first statement have not been converted yet
+    for field in first.fields:
+        val = first._dct.get(field)
+        if isinstance(val, (dict, list)):
+            with pytest.raises(AttributeError):
+                object.__getattribute__(first, field)
+    assert first == DictToNode().visit(dct["Script"]["body"][0])
+
+
+def test_lazy_unequal_and_unset():
+    view = DictToNode(lazy=True).visit({"Var": {"name": "x"}})
+    assert view != nodes.Var(name="y")
+    assert view != nodes.EnvVar(name="x")
+    assert view.lineno == 1
+    with pytest.raises(AttributeError):
+        view.missing
+    view = DictToNode(lazy=True).visit({"If": {"test": {"Var": {"name": "x"}},
+                                              "body": []}})
+    assert view.orelse == []
+
+
+def test_lazy_pickle_and_freeze():
+    view = DictToNode(lazy=True).visit(DICT_CASES["compound-script"])
+    eager = DictToNode().visit(DICT_CASES["compound-script"])
+    obs = pickle.loads(pickle.dumps(view))
+    assert type(obs) is nodes.Script
+    assert obs == eager
+    view = DictToNode(lazy=True).visit(DICT_CASES["compound-script"])
+    assert NodeToFrozen().visit(view) == NodeToFrozen().visit(eager)
@@ -1,7 +1,8 @@
 """Tests Xonsh functionality"""
 import pytest
 
-from asht.xonsh import toxonsh
+from asht.xonsh import toxonsh, ToXonshFromDict
+from asht.visitors import DictToNode, NodeToDict
 
 from .cases import zip_cases, mark_cases
 
@@ -75,6 +76,28 @@ for x in "ls $HOME":
 def f():
     # I am a comment
     x
+""".lstrip(),
+    "nested-if": """
+if x:
+    if y:
+        del x
+        del y
+    else:
+        pass
+    pass
+elif y:
+    for z in y:
+        pass
+        pass
+""".lstrip(),
+    "nested-function": """
+def f():
+    for x in y:
+        if x:
+            del x
+            pass
+        # I am a comment
+    pass
 """.lstrip(),
 }
 
@@ -83,3 +106,11 @@ def f():
 def test_toxonsh(inp, exp):
     obs = toxonsh(inp)
     assert obs == exp
+
+
+@mark_cases(TOXONSH_EXP)
+def test_toxonsh_from_node(inp, exp):
+    tree = DictToNode().visit(inp)
+    obs = toxonsh(tree)
+    assert obs == exp
+    assert obs == ToXonshFromDict().emit(NodeToDict().visit(tree))